@@ -88,4 +88,18 @@ def test_exibir_saldos():
 
     output = captured_output.getvalue()
 
-    assert output != ""
\ No newline at end of file
+    assert output != ""
+
+def test_alimentar_usa_centavos_e_categorias_sem_alterar_a_entrada():
+    dados = criar_dados_exemplo().assign(credito=[0.1, 0.2, 1000.555], debito=[0, 0, 0])
+    original = dados.copy()
+    conta = Conta("João", "1234567-1")
+
+    conta.alimentar(dados)
+    conta.recalcular_saldo_do_banco(conta.dados)
+
+    pd.testing.assert_frame_equal(dados, original)
+    assert conta.dados['credito_centavos'].tolist() == [10, 20, 100056]
+    assert isinstance(conta.dados['tipo'].dtype, pd.CategoricalDtype)
+    assert 'mes' not in conta.dados.columns
+    assert conta.saldos_mensais['total_credito'].tolist() == [0.3, 1000.56]
@@ -0,0 +1,192 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import base64
+import gzip
+import json
+
+import pandas as pd
+import pytest
+from app_api import create_app
+from infrastructure.database import Base, engine
+from models.main import Conta
+from repositories.repository import ContaRepository
+
+
+# -------------------------------------------------
+# Cliente da API com banco SQLite em memória
+# -------------------------------------------------
+@pytest.fixture
+def cliente():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    app = create_app()
+    app.config["JWT_SECRET_KEY"] = "chave-de-teste-com-pelo-menos-32-bytes"
+    return app.test_client()
+
+
+@pytest.fixture
+def cabecalhos(cliente):
+    cliente.post("/api/registro", json={"nome": "João", "numero": "1234567-1", "senha": "senha"})
+    token = cliente.post("/api/login", json={"numero": "1234567-1", "senha": "senha"}).json["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_get_condicional_responde_304_ate_a_proxima_escrita(cliente, cabecalhos):
+    conta = Conta()
+    conta.alimentar(pd.DataFrame({
+        "data": [pd.Timestamp("2024-01-10")], "tipo": ["Pix"], "detalhe": ["Cliente A"],
+        "credito": [1000.0], "debito": [0.0],
+    }))
+    ContaRepository().salvar_transacoes(conta, 1)
+
+    primeira = cliente.get("/api/transacoes", headers=cabecalhos)
+    etag = primeira.headers["ETag"]
+    assert primeira.status_code == 200
+
+    repetida = cliente.get("/api/transacoes", headers={**cabecalhos, "If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.get_data() == b""
+
+    outra_rota = cliente.get("/api/dashboard", headers={**cabecalhos, "If-None-Match": etag})
+    assert outra_rota.status_code == 200
+
+    transacao_id = primeira.json["itens"][0]["id"]
+    cliente.post("/api/categorizar/lote", headers=cabecalhos,
+                 json={"itens": [{"transacao_id": transacao_id, "categoria": "Receita"}]})
+    depois = cliente.get("/api/transacoes", headers={**cabecalhos, "If-None-Match": etag})
+    assert depois.status_code == 200
+    assert depois.headers["ETag"] != etag
+    assert depois.json["itens"][0]["categoria"] == "Receita"
+
+
+def test_sync_entrega_o_historico_e_depois_so_as_alteracoes(cliente, cabecalhos):
+    conta = Conta()
+    conta.alimentar(pd.DataFrame({
+        "data": pd.to_datetime(["2024-01-10", "2024-01-15"]), "tipo": ["Pix", "Boleto"],
+        "detalhe": ["Cliente A", "Internet"], "credito": [1000.0, 0.0], "debito": [0.0, 100.0],
+    }))
+    ContaRepository().salvar_transacoes(conta, 1)
+
+    inicial = cliente.get("/api/sync", headers=cabecalhos).json
+    assert len(inicial["itens"]) == 2 and not inicial["tem_mais"]
+
+    sem_mudancas = cliente.get(f"/api/sync?desde={inicial['cursor']}", headers=cabecalhos).json
+    assert sem_mudancas["itens"] == [] and sem_mudancas["cursor"] == inicial["cursor"]
+
+    cliente.post("/api/categorizar/lote", headers=cabecalhos,
+                 json={"itens": [{"transacao_id": inicial["itens"][0]["id"], "categoria": "Receita"}]})
+    delta = cliente.get(f"/api/sync?desde={inicial['cursor']}", headers=cabecalhos).json
+    assert [(row["id"], row["categoria"]) for row in delta["itens"]] == [(inicial["itens"][0]["id"], "Receita")]
+
+    assert cliente.get("/api/sync?desde=invalido", headers=cabecalhos).status_code == 400
+
+
+def test_etag_vem_do_banco_e_vale_para_todos_os_workers(cliente, cabecalhos):
+    conta = Conta()
+    conta.alimentar(pd.DataFrame({
+        "data": [pd.Timestamp("2024-01-10")], "tipo": ["Pix"], "detalhe": ["Cliente A"],
+        "credito": [1000.0], "debito": [0.0],
+    }))
+    ContaRepository().salvar_transacoes(conta, 1)
+    # Outro worker: mesmo banco, cache próprio na memória do processo
+    outro_app = create_app()
+    outro_app.config["JWT_SECRET_KEY"] = "chave-de-teste-com-pelo-menos-32-bytes"
+    outro_worker = outro_app.test_client()
+
+    primeira = outro_worker.get("/api/transacoes", headers=cabecalhos)
+    etag = primeira.headers["ETag"]
+    assert outro_worker.get("/api/transacoes", headers={**cabecalhos, "If-None-Match": etag}).status_code == 304
+
+    cliente.post("/api/categorizar/lote", headers=cabecalhos,
+                 json={"itens": [{"transacao_id": primeira.json["itens"][0]["id"], "categoria": "Receita"}]})
+    depois = outro_worker.get("/api/transacoes", headers={**cabecalhos, "If-None-Match": etag})
+    assert depois.status_code == 200
+    assert depois.json["itens"][0]["categoria"] == "Receita"
+
+
+def test_cursor_com_data_invalida_responde_400(cliente, cabecalhos):
+    cursor = base64.urlsafe_b64encode(b"foo|1").decode()
+
+    assert cliente.get(f"/api/transacoes?cursor={cursor}", headers=cabecalhos).status_code == 400
+
+
+def test_respostas_grandes_saem_comprimidas_e_continuam_condicionais(cliente, cabecalhos):
+    conta = Conta()
+    conta.alimentar(pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=300, freq="D"), "tipo": "Pix",
+        "detalhe": [f"Cliente {i}" for i in range(300)], "credito": 100.0, "debito": 0.0,
+    }))
+    ContaRepository().salvar_transacoes(conta, 1)
+    gzip_aceito = {**cabecalhos, "Accept-Encoding": "gzip"}
+
+    sync = cliente.get("/api/sync?limite=250", headers=gzip_aceito)
+    assert sync.headers["Content-Encoding"] == "gzip"
+    corpo = json.loads(gzip.decompress(sync.get_data()))
+    assert len(corpo["itens"]) == 250 and corpo["tem_mais"]
+    assert corpo["itens"][0]["data"] == "2024-01-01"
+
+    listagem = cliente.get("/api/transacoes", headers=gzip_aceito)
+    assert listagem.headers["Content-Encoding"] == "gzip"
+    assert listagem.headers["ETag"].startswith('W/"')
+    repetida = cliente.get("/api/transacoes", headers={**gzip_aceito, "If-None-Match": listagem.headers["ETag"]})
+    assert repetida.status_code == 304
+
+    assert "Content-Encoding" not in cliente.get("/api/transacoes", headers=cabecalhos).headers
+
+
+def test_relatorios_agregam_por_categoria_favorecido_e_ano(cliente, cabecalhos):
+    conta = Conta()
+    conta.alimentar(pd.DataFrame({
+        "data": pd.to_datetime(["2023-03-05", "2024-03-10", "2024-03-20", "2024-04-02", "2024-04-15"]),
+        "tipo": ["Pix", "Pix", "Boleto", "Boleto", "Cartão"],
+        "detalhe": ["Cliente A", "Cliente A", "Internet", "Internet", "Mercado"],
+        "credito": [800.0, 1000.0, 0.0, 0.0, 0.0], "debito": [0.0, 0.0, 100.0, 100.0, 350.0],
+    }))
+    ContaRepository().salvar_transacoes(conta, 1)
+    ContaRepository().reconstruir_saldos_mensais(1)
+    cliente.post("/api/categorizar/lote", headers=cabecalhos,
+                 json={"itens": [{"tipo": "Pix", "detalhe": "Cliente A", "categoria": "Receita"}]})
+
+    categorias = cliente.get("/api/relatorios/categorias?data_inicio=2024-03-01&data_fim=2024-03-31",
+                             headers=cabecalhos).json
+    assert categorias == [
+        {"mes": "2024-03", "categoria": "Receita", "total_credito": 1000.0, "total_debito": 0.0, "quantidade": 1},
+        {"mes": "2024-03", "categoria": "Sem categoria", "total_credito": 0.0, "total_debito": 100.0, "quantidade": 1},
+    ]
+
+    favorecidos = cliente.get("/api/relatorios/favorecidos?limite=2", headers=cabecalhos).json
+    assert [(f["detalhe"], f["total"], f["quantidade"]) for f in favorecidos] == [("Mercado", 350.0, 1), ("Internet", 200.0, 2)]
+
+    anual = cliente.get("/api/relatorios/anual", headers=cabecalhos).json
+    assert [(a["ano"], a["total_credito"], a["variacao_credito"]) for a in anual] == [(2023, 800.0, None), (2024, 1000.0, 25.0)]
+
+    assert cliente.get("/api/relatorios/favorecidos?natureza=outra", headers=cabecalhos).status_code == 400
+
+
+def test_upload_vai_para_o_disco_e_acima_do_limite_responde_413(cliente, cabecalhos):
+    import io
+    from flask import request
+    from infrastructure.uploads import caminho_em_disco
+
+    app = cliente.application
+    with app.test_request_context("/api/upload", method="POST",
+                                  data={"extrato": (io.BytesIO(b"Data;Descricao\n"), "extrato.csv")}):
+        caminho = caminho_em_disco(request.files["extrato"])
+        assert caminho.endswith(".csv")
+        with open(caminho, "rb") as f:
+            assert f.read() == b"Data;Descricao\n"
+    assert not os.path.exists(caminho)
+
+    app.config["MAX_CONTENT_LENGTH"] = 1024
+    resposta = cliente.post("/api/upload", headers=cabecalhos,
+                            data={"extrato": (io.BytesIO(b"x" * 4096), "extrato.xlsx")})
+    assert resposta.status_code == 413
+    assert "grande demais" in resposta.json["erro"]
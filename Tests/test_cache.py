@@ -0,0 +1,53 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+import time
+
+from infrastructure.cache import CacheVersionado, MemoriaCache
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_memoria_cache_descarta_o_menos_usado():
+    cache = MemoriaCache(max_itens=2)
+    cache.definir("a", 1)
+    cache.definir("b", 2)
+    cache.obter("a")
+    cache.definir("c", 3)
+
+    assert cache.obter("a") == 1
+    assert cache.obter("b") is None
+    assert cache.obter("c") == 3
+
+
+def test_memoria_cache_expira_pelo_ttl():
+    cache = MemoriaCache(ttl=0.01)
+    cache.definir("a", 1)
+    cache.definir("b", 2, ttl=0)
+    time.sleep(0.02)
+
+    assert cache.obter("a") is None
+    assert cache.obter("b") == 2
+
+
+def test_cache_versionado_conta_acertos_e_invalida_por_usuario():
+    cache = CacheVersionado(MemoriaCache())
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return len(chamadas)
+
+    assert cache.obter_ou_calcular(1, "saldos", calcular) == 1
+    assert cache.obter_ou_calcular(1, "saldos", calcular) == 1
+    assert cache.obter_ou_calcular(2, "saldos", calcular) == 2
+
+    cache.invalidar(1)
+    assert cache.obter_ou_calcular(1, "saldos", calcular) == 3
+    assert cache.obter_ou_calcular(2, "saldos", calcular) == 2
+    assert cache.estatisticas()["acertos"] == 2
+    assert cache.estatisticas()["falhas"] == 3
@@ -0,0 +1,50 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+import pandas as pd
+import pytest
+
+from models.categorizacao import ClassificadorCategorias, validar_regra
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_classificador_respeita_a_ordem_das_regras():
+    classificador = ClassificadorCategorias([
+        {"tipo_regra": "exato", "campo": "tipo", "padrao": "Tarifa", "categoria": "Taxas"},
+        {"tipo_regra": "regex", "campo": "descricao", "padrao": r"^pix .*cliente", "categoria": "Receita"},
+        {"tipo_regra": "palavra", "campo": "detalhe", "padrao": "mercado", "categoria": "Alimentação"},
+        {"tipo_regra": "palavra", "campo": "detalhe", "padrao": "cliente", "categoria": "Outros"},
+    ])
+    dados = pd.DataFrame({
+        "tipo": ["Tarifa", "Pix", "Cartão", "Boleto", "Pix"],
+        "detalhe": ["Pacote", "Cliente A", "SUPERMERCADO", "Luz", "Cliente A"],
+    })
+
+    assert classificador.classificar(dados).tolist() == ["Taxas", "Receita", "Alimentação", None, "Receita"]
+
+
+def test_validar_regra_rejeita_regex_invalida():
+    with pytest.raises(ValueError):
+        validar_regra("regex", "detalhe", "(aberto", "Outros")
+    with pytest.raises(ValueError):
+        validar_regra("palavra", "valor", "x", "Outros")
+
+
+def test_regras_regex_com_flags_e_grupos_funcionam_juntas():
+    classificador = ClassificadorCategorias([
+        {"tipo_regra": "regex", "campo": "detalhe", "padrao": "(?i)uber", "categoria": "Transporte"},
+        {"tipo_regra": "regex", "campo": "detalhe", "padrao": r"(?P<loja>pad)aria", "categoria": "Alimentação"},
+        {"tipo_regra": "regex", "campo": "detalhe", "padrao": r"(?P<loja>farm)acia (c)\2", "categoria": "Saúde"},
+        {"tipo_regra": "palavra", "campo": "detalhe", "padrao": "luz", "categoria": "Moradia"},
+    ])
+    dados = pd.DataFrame({
+        "tipo": ["Cartão", "Cartão", "Cartão", "Boleto", "Pix"],
+        "detalhe": ["UBER TRIP", "Padaria", "Farmacia CC", "Luz", "Cliente A"],
+    })
+
+    assert classificador.classificar(dados).tolist() == ["Transporte", "Alimentação", "Saúde", "Moradia", None]
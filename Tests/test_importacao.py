@@ -0,0 +1,67 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+import io
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.importacao_service import FilaCheia, ImportacaoService
+
+
+class ContaServiceFalso:
+    def __init__(self, liberar=None):
+        self.liberar = liberar
+        self.conteudos = []
+
+    def processar_uploads(self, arquivos, usuario, progresso=None):
+        for arquivo in arquivos:
+            with open(arquivo, "rb") as f:
+                self.conteudos.append(f.read())
+        if self.liberar:
+            self.liberar.wait(5)
+        progresso(10, 7, 3)
+
+
+def aguardar(service, importacao_id, usuario_id):
+    for _ in range(200):
+        importacao = service.buscar(importacao_id, usuario_id)
+        if importacao["status"] in ("concluida", "erro"):
+            return importacao
+        time.sleep(0.01)
+    raise AssertionError("importação não terminou")
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_importacao_em_segundo_plano_reporta_progresso():
+    conta_service = ContaServiceFalso()
+    service = ImportacaoService(conta_service)
+    usuario = SimpleNamespace(id=1)
+
+    importacao = service.enviar(io.BytesIO(b"extrato"), usuario)
+    final = aguardar(service, importacao["id"], 1)
+
+    assert final["status"] == "concluida"
+    assert (final["linhas_lidas"], final["linhas_inseridas"], final["duplicadas"]) == (10, 7, 3)
+    assert conta_service.conteudos == [b"extrato"]
+    assert service.buscar(importacao["id"], 2) is None
+
+
+def test_fila_cheia_recusa_novas_importacoes():
+    liberar = threading.Event()
+    service = ImportacaoService(ContaServiceFalso(liberar), max_workers=1, max_pendentes=1)
+    usuario = SimpleNamespace(id=1)
+
+    importacao = service.enviar(io.BytesIO(b"a"), usuario)
+    with pytest.raises(FilaCheia):
+        service.enviar(io.BytesIO(b"b"), usuario)
+
+    liberar.set()
+    assert aguardar(service, importacao["id"], 1)["status"] == "concluida"
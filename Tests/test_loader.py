@@ -0,0 +1,166 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from infrastructure.loader import CsvLoader, ExcelLoader, OfxLoader, escolher_loader
+from models.main import gerar_hash_transacoes
+
+
+# -------------------------------------------------
+# Função auxiliar para criar a planilha
+# -------------------------------------------------
+def criar_planilha(caminho, linhas):
+    workbook = Workbook()
+    planilha = workbook.active
+    planilha.append(['Data', 'Descrição', 'Crédito (R$)', 'Débito (R$)'])
+    for linha in linhas:
+        planilha.append(linha)
+    workbook.save(caminho)
+    return caminho
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_carregar_normaliza_colunas(tmp_path):
+    arquivo = criar_planilha(tmp_path / "extrato.xlsx", [
+        ['10/01/2024', 'Pix recebido  Cliente A', '1.234,56', None],
+        [datetime(2024, 1, 15), 'Boleto  Internet', None, -99.9],
+        ['Saldo do dia', None, None, None],
+    ])
+
+    dados = ExcelLoader(arquivo).carregar()
+
+    assert list(dados.columns) == ['data', 'tipo', 'detalhe', 'credito', 'debito']
+    assert len(dados) == 2
+    assert dados.loc[0, 'data'] == pd.Timestamp('2024-01-10')
+    assert dados.loc[0, 'tipo'] == 'Pix recebido'
+    assert dados.loc[0, 'detalhe'] == 'Cliente A'
+    assert dados.loc[0, 'credito'] == pytest.approx(1234.56)
+    assert dados.loc[1, 'debito'] == pytest.approx(99.9)
+
+
+def test_carregar_em_blocos_respeita_tamanho(tmp_path):
+    arquivo = criar_planilha(tmp_path / "extrato.xlsx", [
+        [f'{dia:02d}/01/2024', 'Cartão  Padaria', None, '8,50'] for dia in range(1, 11)
+    ])
+
+    blocos = list(ExcelLoader(arquivo, tamanho_bloco=4).carregar_em_blocos())
+
+    assert [len(bloco) for bloco in blocos] == [4, 4, 2]
+
+
+def test_carregar_sem_coluna_obrigatoria(tmp_path):
+    workbook = Workbook()
+    workbook.active.append(['Data', 'Descrição'])
+    workbook.save(tmp_path / "extrato.xlsx")
+
+    with pytest.raises(ValueError):
+        ExcelLoader(tmp_path / "extrato.xlsx").carregar()
+
+
+def test_hash_em_blocos_igual_ao_extrato_inteiro(tmp_path):
+    arquivo = criar_planilha(tmp_path / "extrato.xlsx", [
+        ['10/01/2024', 'Cartão  Padaria', None, '8,50'] for _ in range(5)
+    ])
+
+    inteiro = gerar_hash_transacoes(ExcelLoader(arquivo).carregar(), 1)
+    ocorrencias = Counter()
+    em_blocos = pd.concat([
+        gerar_hash_transacoes(bloco, 1, ocorrencias)
+        for bloco in ExcelLoader(arquivo, tamanho_bloco=2).carregar_em_blocos()
+    ])
+
+    assert inteiro.tolist() == em_blocos.tolist()
+    assert inteiro.nunique() == 5
+
+
+def test_escolher_loader_pelo_conteudo(tmp_path):
+    planilha = criar_planilha(tmp_path / "extrato.bin", [['10/01/2024', 'Pix  Cliente A', '10,00', None]])
+    csv = tmp_path / "extrato.txt"
+    csv.write_text("Data;Descrição;Crédito (R$);Débito (R$)\n10/01/2024;Pix  Cliente A;10,00;\n", encoding="utf-8")
+    ofx = tmp_path / "extrato.dat"
+    ofx.write_text("OFXHEADER:100\n<OFX><STMTTRN><DTPOSTED>20240110<TRNAMT>10.00<MEMO>Pix  Cliente A</STMTTRN></OFX>")
+
+    assert escolher_loader(planilha) is ExcelLoader
+    assert escolher_loader(csv) is CsvLoader
+    assert escolher_loader(ofx) is OfxLoader
+
+
+def test_loaders_produzem_as_mesmas_colunas(tmp_path):
+    planilha = criar_planilha(tmp_path / "extrato.xlsx", [
+        ['10/01/2024', 'Pix  Cliente A', '1.234,56', None],
+        ['11/01/2024', 'Boleto  Luz', None, '-80,00'],
+    ])
+    csv = tmp_path / "extrato.csv"
+    csv.write_text(
+        "Data;Descrição;Crédito (R$);Débito (R$)\n"
+        "10/01/2024;Pix  Cliente A;1.234,56;\n"
+        "11/01/2024;Boleto  Luz;;-80,00\n",
+        encoding="latin-1"
+    )
+    ofx = tmp_path / "extrato.ofx"
+    ofx.write_text(
+        "OFXHEADER:100\n<OFX><BANKTRANLIST>\n"
+        "<STMTTRN>\n<DTPOSTED>20240110120000[-3:BRT]\n<TRNAMT>1234.56\n<MEMO>Pix  Cliente A\n</STMTTRN>\n"
+        "<STMTTRN>\n<DTPOSTED>20240111\n<TRNAMT>-80.00\n<MEMO>Boleto  Luz\n</STMTTRN>\n"
+        "</BANKTRANLIST></OFX>"
+    )
+
+    esperado = ExcelLoader(planilha).carregar()
+
+    pd.testing.assert_frame_equal(CsvLoader(csv).carregar(), esperado)
+    pd.testing.assert_frame_equal(OfxLoader(ofx).carregar(), esperado)
+
+
+def test_carregar_em_paralelo_reaproveita_o_pool_e_le_pouco_em_serie(tmp_path):
+    from infrastructure import loader
+
+    caminhos = [
+        criar_planilha(tmp_path / f"extrato{mes}.xlsx", [[f'10/{mes:02d}/2024', 'Pix  Cliente A', '10,00', None]])
+        for mes in (1, 2, 3)
+    ]
+    em_serie = [ExcelLoader(caminho).carregar() for caminho in caminhos]
+
+    # Poucos bytes: lidos em série, sem criar o pool
+    assert len(loader.carregar_em_paralelo(caminhos, processos=2)) == 3
+    assert loader._pool is None
+
+    primeira = loader.carregar_em_paralelo(caminhos, processos=2, min_bytes=0)
+    pool = loader._pool
+    segunda = loader.carregar_em_paralelo(caminhos, processos=2, min_bytes=0)
+    assert pool is not None and loader._pool is pool
+    for esperado, lido1, lido2 in zip(em_serie, primeira, segunda):
+        pd.testing.assert_frame_equal(lido1, esperado)
+        pd.testing.assert_frame_equal(lido2, esperado)
+
+
+def test_pool_nao_fica_limitado_aos_arquivos_do_primeiro_upload(tmp_path, monkeypatch):
+    from infrastructure import loader
+
+    monkeypatch.setattr(loader, "IMPORTACAO_PROCESSOS", 4)
+    monkeypatch.setattr(loader, "_pool", None)
+    caminhos = [
+        criar_planilha(tmp_path / f"extrato{mes}.xlsx", [[f'10/{mes:02d}/2024', 'Pix  Cliente A', '10,00', None]])
+        for mes in (1, 2, 3, 4)
+    ]
+
+    try:
+        loader.carregar_em_paralelo(caminhos[:2], processos=4, min_bytes=0)
+        pool = loader._pool
+        assert pool._max_workers == 4
+
+        lidos = loader.carregar_em_paralelo(caminhos, processos=4, min_bytes=0)
+        assert loader._pool is pool
+        assert [dados.loc[0, 'data'].month for dados in lidos] == [1, 2, 3, 4]
+    finally:
+        if loader._pool is not None:
+            loader._descartar_pool(loader._pool)
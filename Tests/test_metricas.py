@@ -0,0 +1,70 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from infrastructure.cache import CacheVersionado, MemoriaCache
+from infrastructure.metricas import Histograma, instrumentar_app
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_histograma_exporta_baldes_acumulados():
+    histograma = Histograma("teste_segundos", "Teste.", ("rota",), limites=(0.1, 1))
+    histograma.observar(0.05, rota="/a")
+    histograma.observar(0.5, rota="/a")
+    histograma.observar(5, rota="/a")
+
+    linhas = histograma.exportar()
+
+    assert 'teste_segundos_bucket{rota="/a",le="0.1"} 1' in linhas
+    assert 'teste_segundos_bucket{rota="/a",le="1"} 2' in linhas
+    assert 'teste_segundos_bucket{rota="/a",le="+Inf"} 3' in linhas
+    assert 'teste_segundos_count{rota="/a"} 3' in linhas
+
+
+def test_metrics_conta_consultas_sql_por_rota():
+    engine = create_engine("sqlite://")
+    app = Flask(__name__)
+    instrumentar_app(app, engine, caches={"leituras": CacheVersionado(MemoriaCache())})
+
+    @app.route("/consulta/<int:n>")
+    def consulta(n):
+        with engine.connect() as conn:
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+        return "ok"
+
+    cliente = app.test_client()
+    cliente.get("/consulta/3")
+    corpo = cliente.get("/metrics").get_data(as_text=True)
+
+    assert 'financer_requisicao_consultas_sql_sum{rota="/consulta/<int:n>"} 3' in corpo
+    assert 'financer_cache_acertos{cache="leituras"} 0' in corpo
+
+
+def test_metrics_inclui_consultas_feitas_durante_resposta_em_fluxo():
+    engine = create_engine("sqlite://")
+    app = Flask(__name__)
+    instrumentar_app(app, engine)
+
+    @app.route("/fluxo")
+    def fluxo():
+        def gerar():
+            with engine.connect() as conn:
+                for _ in range(4):
+                    yield str(conn.execute(text("SELECT 1")).scalar())
+        return app.response_class(gerar())
+
+    cliente = app.test_client()
+    resposta = cliente.get("/fluxo")
+    assert resposta.get_data(as_text=True) == "1111"
+    resposta.close()
+    corpo = cliente.get("/metrics").get_data(as_text=True)
+
+    assert 'financer_requisicao_consultas_sql_sum{rota="/fluxo"} 4' in corpo
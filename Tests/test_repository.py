@@ -0,0 +1,469 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from infrastructure.database import Base, engine, get_connection, unidade_de_trabalho
+from infrastructure.paginacao import decodificar_cursor, decodificar_cursor_sync, ler_filtros_transacoes
+from models.main import Conta
+from repositories.repository import (
+    ContaRepository, ImportacaoRepository, RegraCategorizacaoRepository, UsuarioRepository
+)
+from services.conta_service import ContaService
+
+
+# -------------------------------------------------
+# Banco SQLite em memória recriado a cada teste
+# -------------------------------------------------
+@pytest.fixture
+def conta_repo():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return ContaRepository()
+
+
+@pytest.fixture
+def usuario_repo():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return UsuarioRepository()
+
+
+def criar_conta(linhas):
+    conta = Conta(nome="João", numero="1234567-1")
+    conta.alimentar(pd.DataFrame(linhas, columns=['data', 'tipo', 'detalhe', 'credito', 'debito']).assign(
+        data=lambda df: pd.to_datetime(df['data'])
+    ))
+    return conta
+
+
+class LoaderFixo:
+    """Loader de teste: o "arquivo" já é a lista de linhas do extrato."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+
+    def carregar(self):
+        return criar_conta(self.arquivo).dados
+
+
+class UsuarioFake:
+    id = 1
+    nome = "João"
+    numero = "1234567-1"
+
+
+# -------------------------------------------------
+# TESTES
+# -------------------------------------------------
+
+def test_salvar_transacoes_ignora_reupload(conta_repo):
+    conta = criar_conta([
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+    ])
+
+    assert conta_repo.salvar_transacoes(conta, 1) == 2
+    assert conta_repo.salvar_transacoes(conta, 1) == 0
+    assert len(conta_repo.buscar_transacoes(1)) == 2
+
+
+def test_salvar_transacoes_mantem_lancamentos_identicos_do_mesmo_extrato(conta_repo):
+    conta = criar_conta([
+        ("2024-01-10", "Cartão", "Padaria", 0.0, 8.5),
+        ("2024-01-10", "Cartão", "Padaria", 0.0, 8.5),
+    ])
+
+    assert conta_repo.salvar_transacoes(conta, 1) == 2
+    assert conta_repo.salvar_transacoes(conta, 1) == 0
+
+
+def test_salvar_transacoes_separa_usuarios(conta_repo):
+    conta = criar_conta([("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0)])
+
+    assert conta_repo.salvar_transacoes(conta, 1) == 1
+    assert conta_repo.salvar_transacoes(conta, 2) == 1
+
+
+def test_salvar_transacoes_em_varios_lotes():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    conta_repo = ContaRepository(tamanho_lote=2)
+    conta = criar_conta([
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+        ("2024-02-05", "Cartão", "Supermercado", 0.0, 50.0),
+    ])
+
+    assert conta_repo.salvar_transacoes(conta, 1) == 3
+    assert len(conta_repo.buscar_transacoes(1)) == 3
+
+
+def test_processar_upload_soma_apenas_transacoes_novas(conta_repo):
+    service = ContaService(conta_repo, loader_cls=LoaderFixo)
+    janeiro = [
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+    ]
+    fevereiro = [("2024-02-05", "Cartão", "Supermercado", 0.0, 50.0)]
+
+    service.processar_upload(janeiro, UsuarioFake())
+    conta = service.processar_upload(janeiro + fevereiro, UsuarioFake())
+
+    saldos = conta.saldos_mensais.set_index('mes')
+    assert saldos.loc['2024-01', 'saldo'] == 900.0
+    assert saldos.loc['2024-02', 'saldo'] == -50.0
+    assert conta_repo.verificar_saldos_mensais(1) == []
+
+
+def test_processar_uploads_une_arquivos_e_zip_sem_repetir_periodos(conta_repo, tmp_path):
+    import zipfile
+    from datetime import date
+    from openpyxl import Workbook
+
+    def planilha(nome, linhas):
+        workbook = Workbook()
+        workbook.active.append(['Data', 'Descrição', 'Crédito (R$)', 'Débito (R$)'])
+        for linha in linhas:
+            workbook.active.append(linha)
+        workbook.save(tmp_path / nome)
+        return tmp_path / nome
+
+    # Janeiro e fevereiro se sobrepõem em 20/01; o café repetido no mesmo dia são dois lançamentos
+    janeiro = planilha("janeiro.xlsx", [
+        ['10/01/2024', 'Pix  Cliente A', '1.000,00', None],
+        ['20/01/2024', 'Cartão  Café', None, '-5,00'],
+        ['20/01/2024', 'Cartão  Café', None, '-5,00'],
+    ])
+    fevereiro = planilha("fevereiro.xlsx", [
+        ['20/01/2024', 'Cartão  Café', None, '-5,00'],
+        ['05/02/2024', 'Boleto  Internet', None, '-100,00'],
+    ])
+    marco = planilha("marco.xlsx", [['05/03/2024', 'Pix  Cliente B', '300,00', None]])
+    with zipfile.ZipFile(tmp_path / "extratos.zip", "w") as arquivo_zip:
+        arquivo_zip.write(fevereiro, "2024/fevereiro.xlsx")
+        arquivo_zip.write(marco, "2024/marco.xlsx")
+        arquivo_zip.writestr("__MACOSX/2024/._marco.xlsx", b"metadados")
+        arquivo_zip.write(planilha("vazio.xlsx", []), "2024/vazio.xlsx")
+
+    progresso = []
+    importacao_repo = ImportacaoRepository()
+    service = ContaService(conta_repo, processos=2, importacao_repo=importacao_repo)
+    conta = service.processar_uploads([str(janeiro), str(tmp_path / "extratos.zip")], UsuarioFake(),
+                                      progresso=lambda *totais: progresso.append(totais))
+
+    assert progresso == [(6, 0, 0), (6, 5, 1)]
+    assert len(conta_repo.buscar_transacoes(1)) == 5
+    saldos = conta.saldos_mensais.set_index('mes')
+    assert saldos.loc['2024-01', 'saldo'] == 990.0
+    assert saldos.loc['2024-02', 'saldo'] == -100.0
+    assert saldos.loc['2024-03', 'saldo'] == 300.0
+    assert conta_repo.verificar_saldos_mensais(1) == []
+    with get_connection() as conn:
+        periodos = conn.execute(text("SELECT data_inicio, data_fim FROM importacoes ORDER BY id")).fetchall()
+    assert len(periodos) == 4 and (None, None) in [tuple(periodo) for periodo in periodos]
+    assert importacao_repo.janelas(1) == [(date(2024, 1, 10), date(2024, 2, 5)), (date(2024, 3, 5), date(2024, 3, 5))]
+
+    # Reenviar os mesmos arquivos não grava nada
+    service.processar_uploads([str(fevereiro), str(marco)], UsuarioFake())
+    assert len(conta_repo.buscar_transacoes(1)) == 5
+
+
+def test_reenvio_do_mesmo_arquivo_nao_e_lido_e_sobreposicao_so_consulta_o_periodo_importado(conta_repo, tmp_path):
+    from datetime import date
+    from infrastructure.loader import CsvLoader
+
+    class LoaderContado(CsvLoader):
+        leituras = 0
+
+        def carregar_em_blocos(self):
+            LoaderContado.leituras += 1
+            return super().carregar_em_blocos()
+
+    consultadas = []
+    filtrar = conta_repo.filtrar_transacoes_novas
+    conta_repo.filtrar_transacoes_novas = lambda conta, *args: consultadas.append(args[-1]) or filtrar(conta, *args)
+
+    cabecalho = "Data;Descrição;Crédito (R$);Débito (R$)\n"
+    janeiro = tmp_path / "janeiro.csv"
+    janeiro.write_text(cabecalho + "10/01/2024;Pix  Cliente A;1.000,00;\n20/01/2024;Cartão  Café;;-5,00\n")
+    fevereiro = tmp_path / "fevereiro.csv"
+    fevereiro.write_text(cabecalho + "20/01/2024;Cartão  Café;;-5,00\n05/02/2024;Boleto  Internet;;-100,00\n")
+
+    importacao_repo = ImportacaoRepository()
+    service = ContaService(conta_repo, loader_cls=LoaderContado, importacao_repo=importacao_repo)
+    service.processar_upload(str(janeiro), UsuarioFake())
+
+    progresso = []
+    conta = service.processar_upload(str(janeiro), UsuarioFake(), progresso=lambda *totais: progresso.append(totais))
+    assert LoaderContado.leituras == 1
+    assert progresso == [(2, 0, 2)]
+    assert conta.saldos_mensais.set_index('mes').loc['2024-01', 'saldo'] == 995.0
+
+    service.processar_upload(str(fevereiro), UsuarioFake())
+    assert LoaderContado.leituras == 2
+    assert consultadas == [[], [(date(2024, 1, 10), date(2024, 1, 20))]]
+    assert len(conta_repo.buscar_transacoes(1)) == 3
+    assert importacao_repo.janelas(1) == [(date(2024, 1, 10), date(2024, 2, 5))]
+    assert conta_repo.verificar_saldos_mensais(1) == []
+
+
+def test_reconstruir_saldos_mensais_corrige_divergencia(conta_repo):
+    service = ContaService(conta_repo, loader_cls=LoaderFixo)
+    service.processar_upload([("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0)], UsuarioFake())
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE saldos_mensais SET saldo = 0")
+    assert conta_repo.verificar_saldos_mensais(1) == ['2024-01']
+
+    conta_repo.reconstruir_saldos_mensais(1)
+    assert conta_repo.verificar_saldos_mensais(1) == []
+
+
+def test_buscar_transacoes_paginadas_percorre_todas_as_paginas(conta_repo):
+    conta_repo.salvar_transacoes(criar_conta([
+        (f"2024-01-{dia:02d}", "Pix", f"Cliente {dia}", 10.0, 0.0) for dia in range(1, 8)
+    ]), 1)
+
+    vistos = []
+    cursor = None
+    while True:
+        pagina = conta_repo.buscar_transacoes_paginadas(1, limite=3, cursor=cursor and decodificar_cursor(cursor))
+        vistos += [item['detalhe'] for item in pagina['itens']]
+        cursor = pagina['proximo_cursor']
+        if not cursor:
+            break
+
+    assert vistos == [f"Cliente {dia}" for dia in range(7, 0, -1)]
+
+
+def test_buscar_transacoes_paginadas_filtra_mes_e_natureza(conta_repo):
+    conta_repo.salvar_transacoes(criar_conta([
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+        ("2024-02-05", "Cartão", "Supermercado", 0.0, 50.0),
+    ]), 1)
+
+    filtros = ler_filtros_transacoes({"mes": "2024-01", "natureza": "debito"})
+    pagina = conta_repo.buscar_transacoes_paginadas(1, **filtros)
+
+    assert [item['detalhe'] for item in pagina['itens']] == ["Internet"]
+    assert pagina['proximo_cursor'] is None
+
+
+def test_ler_filtros_transacoes_rejeita_parametros_invalidos():
+    with pytest.raises(ValueError):
+        ler_filtros_transacoes({"limite": "10000"})
+    with pytest.raises(ValueError):
+        ler_filtros_transacoes({"cursor": "nao-e-um-cursor"})
+    with pytest.raises(ValueError):
+        ler_filtros_transacoes({"cursor": "Zm9vfDE="})  # "foo|1": id válido, data não
+    with pytest.raises(ValueError):
+        ler_filtros_transacoes({"mes": "janeiro"})
+
+
+def test_buscar_total_anual_soma_receitas_do_ano(conta_repo):
+    conta_repo.salvar_transacoes(criar_conta([
+        ("2023-12-31", "Pix", "Cliente A", 500.0, 0.0),
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-06-10", "Pix", "Cliente B", 250.0, 0.0),
+        ("2024-07-01", "Boleto", "Internet", 0.0, 100.0),
+    ]), 1)
+    conta_repo.atualizar_categoria_em_lote("Pix", "Cliente A", "Receita", 1)
+    conta_repo.atualizar_categoria_em_lote("Pix", "Cliente B", "Receita", 1)
+
+    assert conta_repo.buscar_total_anual(1, ano=2024) == 1250.0
+    assert conta_repo.buscar_total_anual(1, ano=2023) == 500.0
+
+
+def test_receitas_anuais_acompanham_importacao_e_mudancas_de_categoria(conta_repo):
+    regra_repo = RegraCategorizacaoRepository()
+    regra_repo.criar(1, "palavra", "cliente", "Receita", campo="detalhe")
+    service = ContaService(conta_repo, loader_cls=LoaderFixo, regra_repo=regra_repo)
+    service.processar_upload([
+        ("2023-12-31", "Pix", "Cliente A", 500.0, 0.0),
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-03-10", "TED", "Aluguel", 700.0, 0.0),
+    ], UsuarioFake())
+    assert conta_repo.buscar_total_anual(1, ano=2024) == 1000.0
+
+    ted = next(row["id"] for row in conta_repo.buscar_transacoes(1) if row["tipo"] == "TED")
+    conta_repo.atualizar_categoria(ted, "Receita", 1)
+    conta_repo.atualizar_categoria(ted, "Receita", 1)
+    assert conta_repo.buscar_total_anual(1, ano=2024) == 1700.0
+
+    conta_repo.categorizar_em_lote([{"tipo": "Pix", "detalhe": "Cliente A", "categoria": "Outros"}], 1)
+    assert conta_repo.buscar_total_anual(1, ano=2024) == 700.0
+    assert conta_repo.buscar_total_anual(1, ano=2023) == 0.0
+
+    assert conta_repo.reaplicar_regras(regra_repo.classificador(1), 1) == 2
+    with get_connection() as conn:
+        conn.execute(text("UPDATE receitas_anuais SET total = 0"))
+        conn.commit()
+    assert conta_repo.reconstruir_receitas_anuais(1) == {2023: 500.0, 2024: 1700.0}
+    assert conta_repo.buscar_total_anual(1, ano=2024) == 1700.0
+
+
+def test_buscar_saldos_mensais_usa_cache_ate_a_proxima_escrita(conta_repo):
+    service = ContaService(conta_repo, loader_cls=LoaderFixo)
+    service.processar_upload([("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0)], UsuarioFake())
+
+    conta_repo.buscar_saldos_mensais(1)
+    acertos = conta_repo.cache.estatisticas()["acertos"]
+    conta_repo.buscar_saldos_mensais(1)
+    assert conta_repo.cache.estatisticas()["acertos"] == acertos + 1
+
+    service.processar_upload([("2024-02-10", "Pix", "Cliente A", 500.0, 0.0)], UsuarioFake())
+    assert [saldo['mes'] for saldo in conta_repo.buscar_saldos_mensais(1)] == ['2024-01', '2024-02']
+
+
+def test_unidade_de_trabalho_desfaz_todas_as_escritas_em_caso_de_erro(conta_repo):
+    conta = criar_conta([("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0)])
+    conta.recalcular_saldo_do_banco(conta.dados)
+
+    with pytest.raises(RuntimeError):
+        with unidade_de_trabalho():
+            conta_repo.salvar_transacoes(conta, 1)
+            conta_repo.salvar_saldos_mensais(conta, 1)
+            raise RuntimeError("falha no meio da requisição")
+
+    assert conta_repo.buscar_transacoes(1) == []
+    assert conta_repo.buscar_saldos_mensais(1) == []
+
+
+def test_unidade_de_trabalho_compartilha_conexao_e_invalida_cache_no_fim(conta_repo):
+    conta = criar_conta([("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0)])
+    conta.recalcular_saldo_do_banco(conta.dados)
+
+    with unidade_de_trabalho():
+        with get_connection() as a, get_connection() as b:
+            assert a.connection is b.connection
+        conta_repo.salvar_transacoes(conta, 1)
+        conta_repo.salvar_saldos_mensais(conta, 1)
+        versao = conta_repo.cache.versao(1)
+
+    assert conta_repo.cache.versao(1) != versao
+    assert conta_repo.buscar_saldos_mensais(1)[0]["saldo"] == 1000.0
+
+
+def test_buscar_usuario_por_id_usa_cache_ate_invalidar(usuario_repo):
+    usuario_repo.criar("João", "1234567-1", "senha")
+    usuario_id = usuario_repo.buscar_por_numero("1234567-1").id
+
+    assert usuario_repo.buscar_por_id(usuario_id).nome == "João"
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE usuarios SET nome = 'Maria'")
+    assert usuario_repo.buscar_por_id(usuario_id).nome == "João"
+
+    usuario_repo.invalidar(usuario_id)
+    assert usuario_repo.buscar_por_id(usuario_id).nome == "Maria"
+    assert usuario_repo.estatisticas()["leituras_evitadas"] == 1
+
+
+def test_snapshot_colunar_incremental_e_descartado_ao_categorizar(conta_repo, tmp_path):
+    pytest.importorskip("pyarrow")
+    from infrastructure.snapshots import SnapshotTransacoes
+
+    conta_repo.snapshots = SnapshotTransacoes(str(tmp_path), engine)
+    service = ContaService(conta_repo, loader_cls=LoaderFixo)
+    service.processar_upload([("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0)], UsuarioFake())
+    service.processar_upload([("2024-02-05", "Boleto", "Internet", 0.0, 100.0)], UsuarioFake())
+
+    dados = conta_repo.buscar_transacoes_colunar(1)
+    assert len(list((tmp_path / "1").glob("seg-*.arrow"))) == 2
+    assert str(dados['data'].dtype).startswith("datetime64")
+    assert dados['credito'].tolist() == [1000.0, 0.0]
+    assert conta_repo.verificar_saldos_mensais(1) == []
+
+    conta_repo.atualizar_categoria(int(dados['id'].iloc[0]), "Receita", 1)
+    assert conta_repo.buscar_transacoes_colunar(1, ['categoria'])['categoria'].tolist() == ["Receita", "Sem categoria"]
+
+
+def test_regras_categorizam_na_importacao_e_ao_reaplicar(conta_repo):
+    regra_repo = RegraCategorizacaoRepository()
+    regra_repo.criar(1, "palavra", "cliente", "Receita", campo="detalhe")
+    service = ContaService(conta_repo, loader_cls=LoaderFixo, regra_repo=regra_repo)
+    service.processar_upload([
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+        ("2024-02-15", "Boleto", "Internet", 0.0, 100.0),
+    ], UsuarioFake())
+
+    categorias = {row["detalhe"]: row["categoria"] for row in conta_repo.buscar_transacoes(1)}
+    assert categorias == {"Cliente A": "Receita", "Internet": "Sem categoria"}
+
+    regra_repo.criar(1, "exato", "Boleto", "Contas", campo="tipo")
+    assert conta_repo.reaplicar_regras(regra_repo.classificador(1), 1) == 2
+    assert conta_repo.reaplicar_regras(regra_repo.classificador(1), 1) == 0
+    assert {row["categoria"] for row in conta_repo.buscar_transacoes(1)} == {"Receita", "Contas"}
+
+
+def test_categorizar_em_lote_retorna_resultado_por_item(conta_repo):
+    conta_repo.salvar_transacoes(criar_conta([
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+        ("2024-02-15", "Boleto", "Internet", 0.0, 100.0),
+    ]), 1)
+    pix = next(row["id"] for row in conta_repo.buscar_transacoes(1) if row["tipo"] == "Pix")
+
+    resultados = conta_repo.categorizar_em_lote([
+        {"transacao_id": pix, "categoria": "Receita"},
+        {"tipo": "Boleto", "detalhe": "Internet", "categoria": "Moradia"},
+        {"transacao_id": 9999, "categoria": "Lazer"},
+        {"categoria": "Lazer"},
+    ], 1)
+
+    assert [r["status"] for r in resultados] == ["ok", "ok", "nao_encontrada", "invalido"]
+    assert [r["atualizadas"] for r in resultados] == [1, 2, 0, 0]
+    assert {row["categoria"] for row in conta_repo.buscar_transacoes(1)} == {"Receita", "Moradia"}
+
+
+def test_categorizar_em_lote_aplica_os_itens_na_ordem_enviada(conta_repo):
+    conta_repo.salvar_transacoes(criar_conta([
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+        ("2024-02-15", "Boleto", "Internet", 0.0, 100.0),
+    ]), 1)
+    janeiro = next(row["id"] for row in conta_repo.buscar_transacoes(1) if row["data"].month == 1)
+
+    conta_repo.categorizar_em_lote([
+        {"tipo": "Boleto", "detalhe": "Internet", "categoria": "Moradia"},
+        {"transacao_id": janeiro, "categoria": "Lazer"},
+    ], 1)
+    categorias = {row["data"].month: row["categoria"] for row in conta_repo.buscar_transacoes(1)}
+    assert categorias == {1: "Lazer", 2: "Moradia"}
+
+    conta_repo.categorizar_em_lote([
+        {"transacao_id": janeiro, "categoria": "Outros"},
+        {"tipo": "Boleto", "detalhe": "Internet", "categoria": "Moradia"},
+    ], 1)
+    assert {row["categoria"] for row in conta_repo.buscar_transacoes(1)} == {"Moradia"}
+
+
+def test_buscar_alteracoes_traz_apenas_o_que_mudou_desde_o_cursor(conta_repo):
+    conta_repo.salvar_transacoes(criar_conta([
+        ("2024-01-10", "Pix", "Cliente A", 1000.0, 0.0),
+        ("2024-01-15", "Boleto", "Internet", 0.0, 100.0),
+        ("2024-01-20", "Boleto", "Luz", 0.0, 80.0),
+    ]), 1)
+
+    primeira = conta_repo.buscar_alteracoes(1, limite=2)
+    segunda = conta_repo.buscar_alteracoes(1, desde=decodificar_cursor_sync(primeira["cursor"]), limite=2)
+    assert primeira["tem_mais"] and not segunda["tem_mais"]
+    assert len(primeira["itens"]) + len(segunda["itens"]) == 3
+
+    cursor = decodificar_cursor_sync(segunda["cursor"])
+    assert conta_repo.buscar_alteracoes(1, desde=cursor)["itens"] == []
+
+    internet = next(row["id"] for row in conta_repo.buscar_transacoes(1) if row["detalhe"] == "Internet")
+    conta_repo.atualizar_categoria(internet, "Moradia", 1)
+    conta_repo.salvar_transacoes(criar_conta([("2024-02-10", "Pix", "Cliente B", 500.0, 0.0)]), 1)
+
+    alteracoes = conta_repo.buscar_alteracoes(1, desde=cursor)
+    assert [(row["detalhe"], row["categoria"]) for row in alteracoes["itens"]] == [
+        ("Internet", "Moradia"), ("Cliente B", "Sem categoria")
+    ]
+    assert conta_repo.buscar_alteracoes(2)["itens"] == []
@@ -1,5 +1,6 @@
 import os
 import re
+from datetime import date
 
 from flask import Flask, render_template, request, redirect, url_for, flash
 from flask_login import (
@@ -11,8 +12,20 @@ from flask_login import (
 )
 from services.conta_service import ContaService
 from services.alerta_service import AlertaService
-from infrastructure.database import criar_tabelas
-from repositories.repository import UsuarioRepository, ContaRepository, InvestimentoRepository
+from infrastructure.cache import criar_cache
+from infrastructure.compressao import registrar_compressao
+from infrastructure.condicional import condicional
+from infrastructure.database import criar_tabelas, engine, registrar_unidade_de_trabalho
+from infrastructure.metricas import instrumentar_app
+from infrastructure.paginacao import ler_filtros_transacoes
+from infrastructure.uploads import registrar_uploads
+from repositories.repository import (
+    UsuarioRepository,
+    ContaRepository,
+    ImportacaoRepository,
+    InvestimentoRepository,
+    RegraCategorizacaoRepository
+)
 
 from dotenv import load_dotenv
 from pathlib import Path
@@ -28,12 +41,35 @@ def create_app() -> Flask:
     login_manager = LoginManager(app)
     login_manager.login_view = 'login'
 
+    cache = criar_cache()
     usuario_repo = UsuarioRepository()
-    conta_repo = ContaRepository()
-    conta_service = ContaService(conta_repo)
-    investimento_repo = InvestimentoRepository()
+    conta_repo = ContaRepository(cache=cache)
+    regra_repo = RegraCategorizacaoRepository()
+    conta_service = ContaService(conta_repo, regra_repo=regra_repo, importacao_repo=ImportacaoRepository())
+    investimento_repo = InvestimentoRepository(cache=cache)
     alerta_service = AlertaService()
 
+    def upload_grande_demais(erro):
+        limite_mb = request.max_content_length // (1024 * 1024)
+        flash(f'Arquivo grande demais. O limite é de {limite_mb} MB por envio.', 'erro')
+        return render_template('index.html'), 413
+
+    # Arquivos enviados vão para o disco; acima do limite, 413 antes de ler o corpo
+    registrar_uploads(app, ao_exceder=upload_grande_demais)
+    # Métricas primeiro: o after_request delas roda por último e inclui o commit da unidade de trabalho
+    instrumentar_app(app, engine, caches={"usuarios": usuario_repo, "leituras": conta_repo.cache})
+    # Comprime depois do commit da unidade de trabalho (after_request roda na ordem inversa)
+    registrar_compressao(app)
+    # Uma conexão e uma transação por requisição, compartilhadas pelos repositórios
+    registrar_unidade_de_trabalho(app)
+
+    # Páginas também mudam com o usuário (menu, tipo) e com a data (lembretes do dia)
+    com_etag = condicional(
+        lambda: current_user.id,
+        conta_repo.versao_dados,
+        extras=lambda: (current_user.nome, current_user.tipo, date.today())
+    )
+
     @login_manager.user_loader
     def load_user(user_id):
         return usuario_repo.buscar_por_id(int(user_id))
@@ -83,6 +119,7 @@ def create_app() -> Flask:
 
     @app.route('/')
     @login_required
+    @com_etag
     def index():
         saldos = conta_repo.buscar_saldos_mensais(current_user.id)
 
@@ -115,10 +152,14 @@ def create_app() -> Flask:
     @app.route('/upload', methods=['POST'])
     @login_required
     def upload():
-        arquivo = request.files['extrato']
-        conta = conta_service.processar_upload(arquivo, current_user)
-
-        meses = [str(m) for m in conta.saldos_mensais.index]
+        arquivos = [arquivo for arquivo in request.files.getlist('extrato') if arquivo.filename]
+        try:
+            conta = conta_service.processar_uploads(arquivos, current_user)
+        except ValueError as e:
+            flash(str(e), 'erro')
+            return redirect(url_for('importar'))
+
+        meses = [str(m) for m in conta.saldos_mensais['mes']]
         saldos = [round(row['saldo'], 2) for _, row in conta.saldos_mensais.iterrows()]
         creditos = [round(row['total_credito'], 2) for _, row in conta.saldos_mensais.iterrows()]
         debitos = [round(row['total_debito'], 2) for _, row in conta.saldos_mensais.iterrows()]
@@ -135,9 +176,25 @@ def create_app() -> Flask:
 
     @app.route('/transacoes')
     @login_required
+    @com_etag
     def transacoes():
-        registros = conta_repo.buscar_transacoes(current_user.id)
-        return render_template('transacoes.html', registros=registros, categorias=CATEGORIAS)
+        try:
+            filtros = ler_filtros_transacoes(request.args)
+        except ValueError as e:
+            flash(str(e), 'erro')
+            return redirect(url_for('transacoes'))
+
+        pagina = conta_repo.buscar_transacoes_paginadas(current_user.id, **filtros)
+        meses = [row['mes'] for row in reversed(conta_repo.buscar_saldos_mensais(current_user.id))]
+
+        return render_template(
+            'transacoes.html',
+            registros=pagina['itens'],
+            proximo_cursor=pagina['proximo_cursor'],
+            meses=meses,
+            mes_selecionado=request.args.get('mes', 'todos'),
+            categorias=CATEGORIAS
+        )
 
     @app.route('/categorizar', methods=['POST'])
     @login_required
@@ -168,6 +225,7 @@ def create_app() -> Flask:
 
     @app.route('/investimentos')
     @login_required
+    @com_etag
     def investimentos():
         dados = investimento_repo.buscar_por_usuario(current_user.id)
         return render_template('investimentos.html', investimentos=dados)
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 load_dotenv()
+import itertools
 import os
 import re
 from flask import Flask, jsonify, request
@@ -7,19 +8,42 @@ from flask_jwt_extended import (
     JWTManager,
     create_access_token,
     jwt_required,
+    get_jwt,
     get_jwt_identity
 )
 
 from services.conta_service import ContaService
-from infrastructure.database import criar_tabelas
+from services.importacao_service import FilaCheia, ImportacaoService
+from models.usuario import Usuario
+from infrastructure.cache import criar_cache
+from infrastructure.compressao import registrar_compressao
+from infrastructure.condicional import condicional
+from infrastructure.database import criar_tabelas, engine, registrar_unidade_de_trabalho
+from infrastructure.metricas import instrumentar_app
+from infrastructure.paginacao import (
+    ler_filtros_favorecidos,
+    ler_filtros_transacoes,
+    ler_parametros_sync,
+    ler_periodo,
+    proximo_cursor_sync
+)
+from infrastructure.serializacao import ProvedorJSON, resposta_json_em_fluxo
+from infrastructure.uploads import registrar_uploads
 from repositories.repository import (
     UsuarioRepository,
     ContaRepository,
-    InvestimentoRepository
+    ImportacaoRepository,
+    InvestimentoRepository,
+    RegraCategorizacaoRepository,
+    RelatorioRepository
 )
 
+LIMITE_ITENS_LOTE = 1000
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
+    app.json = ProvedorJSON(app)
 
     app.config["SECRET_KEY"] = os.environ.get(
         "FINANCER_SECRET_KEY",
@@ -36,11 +60,41 @@ def create_app() -> Flask:
 
     JWTManager(app)
 
+    # A versão dos dados de cada usuário (cache) é a mesma para contas e investimentos
+    cache = criar_cache()
     usuario_repo = UsuarioRepository()
-    conta_repo = ContaRepository()
-    investimento_repo = InvestimentoRepository()
+    conta_repo = ContaRepository(cache=cache)
+    investimento_repo = InvestimentoRepository(cache=cache)
+    relatorio_repo = RelatorioRepository(cache=cache)
     # implementar upload para react_native
-    conta_service = ContaService(conta_repo)
+    regra_repo = RegraCategorizacaoRepository()
+    conta_service = ContaService(conta_repo, regra_repo=regra_repo, importacao_repo=ImportacaoRepository())
+    importacao_service = ImportacaoService(conta_service)
+
+    def upload_grande_demais(erro):
+        limite_mb = request.max_content_length // (1024 * 1024)
+        return jsonify({"erro": f"Arquivo grande demais. O limite é de {limite_mb} MB por envio."}), 413
+
+    # Arquivos enviados vão para o disco; acima do limite, 413 antes de ler o corpo
+    registrar_uploads(app, ao_exceder=upload_grande_demais)
+    # Métricas primeiro: o after_request delas roda por último e inclui o commit da unidade de trabalho
+    instrumentar_app(app, engine, caches={"usuarios": usuario_repo, "leituras": conta_repo.cache})
+    # Comprime depois do commit da unidade de trabalho (after_request roda na ordem inversa)
+    registrar_compressao(app)
+    # Uma conexão e uma transação por requisição, compartilhadas pelos repositórios
+    registrar_unidade_de_trabalho(app)
+
+    # GET condicional: 304 quando a versão dos dados do usuário não mudou
+    com_etag = condicional(lambda: int(get_jwt_identity()), conta_repo.versao_dados)
+
+    def usuario_atual():
+        """Usuário do token: os claims dispensam o banco; tokens antigos caem no cache/banco."""
+        usuario_id = int(get_jwt_identity())
+        usuario = Usuario.de_claims(usuario_id, get_jwt())
+        if usuario is None:
+            return usuario_repo.buscar_por_id(usuario_id)
+        usuario_repo.registrar_leitura_por_token()
+        return usuario
 
     # ===============================
     # REGISTRO
@@ -86,7 +140,10 @@ def create_app() -> Flask:
 
         if usuario and usuario.checar_senha(senha):
             # 🔥 Identity precisa ser string
-            token = create_access_token(identity=str(usuario.id))
+            token = create_access_token(
+                identity=str(usuario.id),
+                additional_claims=usuario.claims()
+            )
 
             return jsonify({
                 "token": token,
@@ -100,33 +157,60 @@ def create_app() -> Flask:
     # UPLOAD
     # ===============================
     @app.route("/upload", methods=["POST"])
+    @app.route("/api/upload", methods=["POST"])
     @jwt_required()
     def upload():
-        request.stream.read(timeout=30)
-        usuario_id = int(get_jwt_identity())
-        usuario = usuario_repo.buscar_por_id(usuario_id)
+        usuario = usuario_atual()
 
         if not usuario:
             return jsonify({"erro": "Usuário não encontrado"}), 404
 
-        if "extrato" not in request.files:
+        # Um ou mais campos "extrato": planilhas, CSV, OFX ou .zip com vários extratos
+        arquivos = [arquivo for arquivo in request.files.getlist("extrato") if arquivo.filename]
+        if not arquivos:
             return jsonify({"erro": "Arquivo não enviado"}), 400
 
-        arquivo = request.files["extrato"]
-
         try:
-            conta_service.processar_upload(arquivo, usuario)
+            importacao = importacao_service.enviar(arquivos, usuario)
+        except FilaCheia as e:
+            return jsonify({"erro": str(e)}), 503, {"Retry-After": "30"}
+
+        return jsonify({
+            "mensagem": "Extrato recebido. A importação continua em segundo plano.",
+            "importacao_id": importacao["id"],
+            "status": importacao["status"]
+        }), 202, {"Location": f"/api/importacoes/{importacao['id']}"}
 
-            return jsonify({"mensagem": "Extrato importado com sucesso!"})
+    @app.route("/api/importacoes/<importacao_id>", methods=["GET"])
+    @jwt_required()
+    def status_importacao(importacao_id):
+        usuario_id = int(get_jwt_identity())
+        importacao = importacao_service.buscar(importacao_id, usuario_id)
 
-        except Exception as e:
-            return jsonify({"erro": str(e)}), 500
+        if not importacao:
+            return jsonify({"erro": "Importação não encontrada"}), 404
+
+        return jsonify({
+            chave: valor for chave, valor in importacao.items() if chave != "usuario_id"
+        })
+
+    # ===============================
+    # ESTATÍSTICAS DE CACHE
+    # ===============================
+    @app.route("/api/estatisticas/cache", methods=["GET"])
+    @jwt_required()
+    def estatisticas_cache():
+        return jsonify({
+            "usuarios": usuario_repo.estatisticas(),
+            "leituras": conta_repo.cache.estatisticas()
+        })
 
     # ===============================
     # DASHBOARD
     # ===============================
     @app.route("/api/dashboard", methods=["GET"])
     @jwt_required()
+    @com_etag
     def dashboard():
         usuario_id = int(get_jwt_identity())  # converte para int
 
@@ -152,10 +236,41 @@ def create_app() -> Flask:
     # ===============================
     @app.route("/api/transacoes", methods=["GET"])
     @jwt_required()
+    @com_etag
     def transacoes():
         usuario_id = int(get_jwt_identity())
-        registros = conta_repo.buscar_transacoes(usuario_id)
-        return jsonify(registros or [])
+
+        try:
+            filtros = ler_filtros_transacoes(request.args)
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+
+        pagina = conta_repo.buscar_transacoes_paginadas(usuario_id, **filtros)
+        return jsonify(pagina)
+
+    # ===============================
+    # SINCRONIZAÇÃO (app mobile)
+    # ===============================
+    @app.route("/api/sync", methods=["GET"])
+    @jwt_required()
+    def sincronizar():
+        usuario_id = int(get_jwt_identity())
+
+        try:
+            parametros = ler_parametros_sync(request.args)
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+
+        # Em fluxo: as linhas saem do cursor do banco direto para a resposta
+        limite, desde = parametros["limite"], parametros.get("desde")
+        linhas = conta_repo.iterar_alteracoes(usuario_id, desde, limite + 1)
+
+        def rodape(ultimo):
+            tem_mais = next(linhas, None) is not None
+            linhas.close()
+            return {"cursor": proximo_cursor_sync(ultimo, desde), "tem_mais": tem_mais}
+
+        return resposta_json_em_fluxo(itertools.islice(linhas, limite), rodape)
 
     # ===============================
     # CATEGORIZAR
@@ -204,11 +319,128 @@ def create_app() -> Flask:
 
         return jsonify({"mensagem": "Transação categorizada!"})
 
+    @app.route("/api/categorizar/lote", methods=["POST"])
+    @jwt_required()
+    def categorizar_lote():
+        usuario_id = int(get_jwt_identity())
+        data = request.get_json()
+
+        itens = data.get("itens") if isinstance(data, dict) else None
+        if not isinstance(itens, list) or not itens:
+            return jsonify({"erro": "Envie uma lista em itens."}), 400
+
+        if len(itens) > LIMITE_ITENS_LOTE:
+            return jsonify({"erro": f"No máximo {LIMITE_ITENS_LOTE} itens por requisição."}), 400
+
+        resultados = conta_repo.categorizar_em_lote(itens, usuario_id)
+        return jsonify({
+            "atualizadas": sum(r["atualizadas"] for r in resultados),
+            "resultados": resultados
+        })
+
+    # ===============================
+    # RELATÓRIOS
+    # ===============================
+    @app.route("/api/relatorios/categorias", methods=["GET"])
+    @jwt_required()
+    @com_etag
+    def relatorio_categorias():
+        usuario_id = int(get_jwt_identity())
+        try:
+            periodo = ler_periodo(request.args)
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+
+        return jsonify(relatorio_repo.categorias_por_mes(
+            usuario_id, periodo.get("data_inicio"), periodo.get("data_fim")
+        ))
+
+    @app.route("/api/relatorios/favorecidos", methods=["GET"])
+    @jwt_required()
+    @com_etag
+    def relatorio_favorecidos():
+        usuario_id = int(get_jwt_identity())
+        try:
+            filtros = ler_filtros_favorecidos(request.args)
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+
+        return jsonify(relatorio_repo.maiores_favorecidos(
+            usuario_id, filtros.get("data_inicio"), filtros.get("data_fim"), filtros["natureza"], filtros["limite"]
+        ))
+
+    @app.route("/api/relatorios/anual", methods=["GET"])
+    @jwt_required()
+    @com_etag
+    def relatorio_anual():
+        usuario_id = int(get_jwt_identity())
+        try:
+            periodo = ler_periodo(request.args)
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+
+        return jsonify(relatorio_repo.comparativo_anual(
+            usuario_id, periodo.get("data_inicio"), periodo.get("data_fim")
+        ))
+
+    # ===============================
+    # REGRAS DE CATEGORIZAÇÃO
+    # ===============================
+    @app.route("/api/regras", methods=["GET"])
+    @jwt_required()
+    def listar_regras():
+        usuario_id = int(get_jwt_identity())
+        return jsonify(regra_repo.listar(usuario_id))
+
+    @app.route("/api/regras", methods=["POST"])
+    @jwt_required()
+    def criar_regra():
+        usuario_id = int(get_jwt_identity())
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"erro": "JSON inválido"}), 400
+
+        try:
+            regra_id = regra_repo.criar(
+                usuario_id,
+                data.get("tipo_regra", "palavra"),
+                data.get("padrao"),
+                data.get("categoria"),
+                campo=data.get("campo", "descricao"),
+                prioridade=data.get("prioridade", 0)
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"erro": str(e)}), 400
+
+        return jsonify({"mensagem": "Regra criada!", "id": regra_id}), 201
+
+    @app.route("/api/regras/<int:regra_id>", methods=["DELETE"])
+    @jwt_required()
+    def remover_regra(regra_id):
+        usuario_id = int(get_jwt_identity())
+
+        if not regra_repo.remover(regra_id, usuario_id):
+            return jsonify({"erro": "Regra não encontrada"}), 404
+
+        return jsonify({"mensagem": "Regra removida."})
+
+    @app.route("/api/regras/reaplicar", methods=["POST"])
+    @jwt_required()
+    def reaplicar_regras():
+        usuario_id = int(get_jwt_identity())
+        qtd = conta_repo.reaplicar_regras(regra_repo.classificador(usuario_id), usuario_id)
+        return jsonify({
+            "mensagem": f"{qtd} transação(ões) recategorizadas!",
+            "atualizadas": qtd
+        })
+
     # ===============================
     # INVESTIMENTOS
     # ===============================
     @app.route("/api/investimentos", methods=["GET"])
     @jwt_required()
+    @com_etag
     def investimentos():
         usuario_id = int(get_jwt_identity())
         dados = investimento_repo.buscar_por_usuario(usuario_id)
@@ -0,0 +1,100 @@
+"""Comandos de manutenção do Financer.
+
+Uso (a partir de backend/):
+    python comandos.py migrar
+    python comandos.py verificar-saldos [--usuario ID] [--corrigir]
+    python comandos.py reconstruir-saldos [--usuario ID]
+    python comandos.py reconstruir-receitas [--usuario ID]
+"""
+import argparse
+
+from dotenv import load_dotenv
+from pathlib import Path
+
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+from sqlalchemy import text
+from infrastructure.database import Base, criar_tabelas, engine, get_connection
+from infrastructure.migracoes import aplicar_migracoes
+from repositories.repository import ContaRepository
+
+
+def _usuarios(usuario_id=None):
+    if usuario_id is not None:
+        return [usuario_id]
+    with get_connection() as conn:
+        rows = conn.execute(text("SELECT DISTINCT usuario_id FROM transacoes ORDER BY usuario_id")).fetchall()
+    return [row.usuario_id for row in rows]
+
+
+def migrar(args):
+    Base.metadata.create_all(bind=engine)
+    aplicadas = aplicar_migracoes()
+    if aplicadas:
+        print("Migrações aplicadas: " + ", ".join(aplicadas))
+    else:
+        print("Banco já está atualizado.")
+    return 0
+
+
+def verificar_saldos(args):
+    conta_repo = ContaRepository()
+    inconsistentes = 0
+    for usuario_id in _usuarios(args.usuario):
+        meses = conta_repo.verificar_saldos_mensais(usuario_id)
+        if not meses:
+            continue
+        inconsistentes += 1
+        print(f"Usuário {usuario_id}: {len(meses)} mês(es) divergente(s): {', '.join(meses)}")
+        if args.corrigir:
+            conta_repo.reconstruir_saldos_mensais(usuario_id)
+            print(f"Usuário {usuario_id}: saldos reconstruídos.")
+
+    if not inconsistentes:
+        print("Saldos mensais consistentes.")
+    return 1 if inconsistentes and not args.corrigir else 0
+
+
+def reconstruir_saldos(args):
+    conta_repo = ContaRepository()
+    for usuario_id in _usuarios(args.usuario):
+        saldos = conta_repo.reconstruir_saldos_mensais(usuario_id)
+        print(f"Usuário {usuario_id}: {len(saldos)} mês(es) reconstruído(s).")
+    return 0
+
+
+def reconstruir_receitas(args):
+    conta_repo = ContaRepository()
+    for usuario_id in _usuarios(args.usuario):
+        receitas = conta_repo.reconstruir_receitas_anuais(usuario_id)
+        print(f"Usuário {usuario_id}: {len(receitas)} ano(s) reconstruído(s).")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do Financer.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    subparsers.add_parser("migrar", help="Atualiza o esquema de um banco existente.").set_defaults(funcao=migrar)
+
+    verificar = subparsers.add_parser("verificar-saldos", help="Compara saldos_mensais com transacoes.")
+    verificar.add_argument("--usuario", type=int, help="Verifica apenas este usuário.")
+    verificar.add_argument("--corrigir", action="store_true", help="Reconstrói os usuários divergentes.")
+    verificar.set_defaults(funcao=verificar_saldos)
+
+    reconstruir = subparsers.add_parser("reconstruir-saldos", help="Recalcula saldos_mensais do zero.")
+    reconstruir.add_argument("--usuario", type=int, help="Reconstrói apenas este usuário.")
+    reconstruir.set_defaults(funcao=reconstruir_saldos)
+
+    receitas = subparsers.add_parser("reconstruir-receitas", help="Recalcula receitas_anuais (limite MEI) do zero.")
+    receitas.add_argument("--usuario", type=int, help="Reconstrói apenas este usuário.")
+    receitas.set_defaults(funcao=reconstruir_receitas)
+
+    args = parser.parse_args(argv)
+    if args.funcao is not migrar:
+        criar_tabelas()
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
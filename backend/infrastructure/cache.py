@@ -0,0 +1,162 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# -------------------------------------------------------------------
+# Cache de leituras por usuário
+# As chaves levam a "versão dos dados" do usuário; toda escrita troca a
+# versão, e as entradas antigas deixam de ser encontradas (e expiram pelo
+# LRU/TTL). O backend padrão vive na memória do processo; com mais de um
+# processo (gunicorn com vários workers), use o backend Redis para que
+# todos enxerguem a mesma versão.
+# -------------------------------------------------------------------
+CACHE_MAX_ITENS = int(os.environ.get("FINANCER_CACHE_MAX_ITENS", "2048"))
+CACHE_TTL = float(os.environ.get("FINANCER_CACHE_TTL", "300"))
+# Usuários carregados a cada requisição autenticada (Flask-Login / JWT)
+USUARIO_CACHE_MAX_ITENS = int(os.environ.get("FINANCER_USUARIO_CACHE_MAX_ITENS", "1024"))
+USUARIO_CACHE_TTL = float(os.environ.get("FINANCER_USUARIO_CACHE_TTL", "60"))
+
+
+class MemoriaCache:
+    """Backend LRU com TTL na memória do processo."""
+
+    def __init__(self, max_itens=CACHE_MAX_ITENS, ttl=CACHE_TTL):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        """Retorna o valor ou None se a chave não existe ou expirou."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em is not None and expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor, ttl=None):
+        """Grava o valor; ttl=None usa o TTL padrão do backend e ttl=0 não expira."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl if ttl else None)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+class RedisCache:
+    """Backend para Redis ou qualquer servidor compatível (Valkey, KeyDB, fakeredis).
+
+    Requer o pacote redis (pip install redis) ou um cliente com a mesma interface."""
+
+    def __init__(self, cliente, ttl=CACHE_TTL, prefixo="financer:"):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefixo = prefixo
+
+    @classmethod
+    def de_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("FINANCER_CACHE_URL exige o pacote redis (pip install redis).") from e
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def obter(self, chave):
+        valor = self.cliente.get(self.prefixo + chave)
+        return None if valor is None else pickle.loads(valor)
+
+    def definir(self, chave, valor, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.cliente.set(self.prefixo + chave, pickle.dumps(valor), ex=int(ttl) if ttl else None)
+
+    def remover(self, chave):
+        self.cliente.delete(self.prefixo + chave)
+
+    def limpar(self):
+        for chave in self.cliente.scan_iter(match=self.prefixo + "*"):
+            self.cliente.delete(chave)
+
+
+class CacheVersionado:
+    """Cache de leituras por usuário, invalidado pela troca da versão dos dados."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+
+    def versao(self, usuario_id):
+        chave = f"versao:{usuario_id}"
+        versao = self.backend.obter(chave)
+        if versao is None:
+            # Versão perdida (despejo, reinício): uma nova garante que nada antigo seja reaproveitado
+            versao = time.time_ns()
+            self.backend.definir(chave, versao, ttl=0)
+        return versao
+
+    def invalidar(self, usuario_id):
+        """Troca a versão dos dados do usuário; chame após qualquer escrita."""
+        self.backend.definir(f"versao:{usuario_id}", time.time_ns(), ttl=0)
+
+    def obter_ou_calcular(self, usuario_id, nome, calcular):
+        chave = f"{nome}:{usuario_id}:{self.versao(usuario_id)}"
+        valor = self.backend.obter(chave)
+        if valor is not None:
+            self._contar(acerto=True)
+            return valor
+
+        self._contar(acerto=False)
+        valor = calcular()
+        self.backend.definir(chave, valor)
+        return valor
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+    def _contar(self, acerto):
+        with self._lock:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+
+def criar_cache():
+    """Cache padrão: Redis se FINANCER_CACHE_URL estiver definida, senão memória do processo."""
+    url = os.environ.get("FINANCER_CACHE_URL")
+    backend = RedisCache.de_url(url) if url else MemoriaCache()
+    return CacheVersionado(backend)
+
+
+def em_cache(nome):
+    """Decorator para métodos de repositório (self, usuario_id, *args) que usam self.cache."""
+    def decorador(metodo):
+        @wraps(metodo)
+        def envolvido(self, usuario_id, *args):
+            chave = ":".join([nome, *map(str, args)])
+            return self.cache.obter_ou_calcular(usuario_id, chave, lambda: metodo(self, usuario_id, *args))
+        return envolvido
+    return decorador
@@ -0,0 +1,103 @@
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Sem o pacote brotli: só gzip
+    brotli = None
+
+# -------------------------------------------------------------------
+# Compressão das respostas
+# JSON e HTML são comprimidos com br (se o pacote brotli estiver
+# instalado) ou gzip, conforme o Accept-Encoding do cliente. Respostas
+# em fluxo são comprimidas bloco a bloco, sem esperar o fim da resposta.
+# -------------------------------------------------------------------
+COMPRESSAO_MIN_BYTES = int(os.environ.get("FINANCER_COMPRESSAO_MIN_BYTES", "1024"))
+COMPRESSAO_NIVEL_GZIP = int(os.environ.get("FINANCER_COMPRESSAO_NIVEL_GZIP", "6"))
+COMPRESSAO_NIVEL_BROTLI = int(os.environ.get("FINANCER_COMPRESSAO_NIVEL_BROTLI", "4"))
+
+TIPOS_COMPRIMIVEIS = ("application/json", "text/html", "text/plain", "text/csv", "text/css", "application/javascript")
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def processar(self, dados):
+        # Z_SYNC_FLUSH: o cliente recebe cada bloco assim que ele é gerado
+        return self._compressor.compress(dados) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSAO_NIVEL_BROTLI)
+
+    def processar(self, dados):
+        return self._compressor.process(dados) + self._compressor.flush()
+
+    def finalizar(self):
+        return self._compressor.finish()
+
+
+COMPRESSORES = {"gzip": _Gzip}
+if brotli is not None:
+    COMPRESSORES = {"br": _Brotli, **COMPRESSORES}
+
+
+def escolher_codificacao(accept_encodings):
+    """Melhor codificação aceita pelo cliente entre as disponíveis (br antes de gzip), ou None."""
+    return accept_encodings.best_match(list(COMPRESSORES))
+
+
+def comprimir_blocos(blocos, codificacao):
+    """Comprime uma sequência de blocos de bytes, devolvendo cada parte assim que possível."""
+    compressor = COMPRESSORES[codificacao]()
+    for bloco in blocos:
+        if bloco:
+            yield compressor.processar(bloco)
+    yield compressor.finalizar()
+
+
+def comprimir_resposta(resposta, codificacao, min_bytes=COMPRESSAO_MIN_BYTES):
+    """Comprime resposta no lugar com a codificação escolhida, se valer a pena."""
+    if (resposta.status_code != 200 or "Content-Encoding" in resposta.headers
+            or resposta.mimetype not in TIPOS_COMPRIMIVEIS):
+        return resposta
+
+    if resposta.is_streamed:
+        original = resposta.response
+        resposta.response = comprimir_blocos(resposta.iter_encoded(), codificacao)
+        resposta.headers.pop("Content-Length", None)
+        # Cliente desconectado no meio: o gerador original (e o cursor dele) também é fechado
+        if hasattr(original, "close"):
+            resposta.call_on_close(original.close)
+    else:
+        dados = resposta.get_data()
+        if len(dados) < min_bytes:
+            return resposta
+        resposta.set_data(b"".join(comprimir_blocos([dados], codificacao)))
+
+    resposta.headers["Content-Encoding"] = codificacao
+    resposta.vary.add("Accept-Encoding")
+    # O ETag identifica o conteúdo, não os bytes comprimidos: vira fraco, como nos proxies
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(etag, weak=True)
+    return resposta
+
+
+def registrar_compressao(app, min_bytes=COMPRESSAO_MIN_BYTES):
+    """Comprime as respostas do app conforme o Accept-Encoding de cada requisição."""
+    @app.after_request
+    def _comprimir(resposta):
+        if request.method == "HEAD":
+            return resposta
+        codificacao = escolher_codificacao(request.accept_encodings)
+        if codificacao is None:
+            return resposta
+        return comprimir_resposta(resposta, codificacao, min_bytes)
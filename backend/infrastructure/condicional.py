@@ -0,0 +1,54 @@
+import hashlib
+from functools import wraps
+
+from flask import make_response, request, session
+
+# -------------------------------------------------------------------
+# GET condicional
+# O ETag vem da versão dos dados do usuário no banco (versoes_sincronizacao),
+# que toda escrita incrementa. Com If-None-Match igual, a resposta é 304
+# com uma única leitura por chave primária, sem montar nem serializar nada.
+# Não use a versão de um cache na memória do processo: com vários workers,
+# os outros continuariam respondendo 304 com dados antigos.
+# -------------------------------------------------------------------
+CACHE_CONTROL = "private, no-cache"
+
+
+def gerar_etag(*partes) -> str:
+    return hashlib.sha256("|".join(map(str, partes)).encode("utf-8")).hexdigest()[:32]
+
+
+def condicional(obter_usuario_id, obter_versao, extras=None):
+    """Decorator de views GET com ETag forte derivado da versão dos dados do usuário.
+
+    :param obter_usuario_id: Função sem argumentos que retorna o id do usuário da requisição
+        (aplique o decorator depois de jwt_required/login_required).
+    :param obter_versao: Função (usuario_id) -> versão atual dos dados.
+    :param extras: Função opcional com outros valores que mudam a resposta (ex.: nome do
+        usuário e a data, em páginas HTML).
+    """
+    def decorador(view):
+        @wraps(view)
+        def envolvido(*args, **kwargs):
+            # Mensagens flash pendentes são consumidas ao renderizar: a página não pode vir do cache
+            if session.get("_flashes"):
+                return view(*args, **kwargs)
+
+            usuario_id = obter_usuario_id()
+            etag = gerar_etag(
+                usuario_id, request.path, request.query_string.decode("latin-1"),
+                obter_versao(usuario_id), *(extras() if extras else ())
+            )
+            # Comparação fraca (RFC 9110): respostas comprimidas devolvem o ETag como W/"..."
+            if request.if_none_match.contains_weak(etag):
+                resposta = make_response("", 304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag)
+            resposta.headers["Cache-Control"] = CACHE_CONTROL
+            return resposta
+        return envolvido
+    return decorador
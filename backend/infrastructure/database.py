@@ -1,7 +1,9 @@
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, UniqueConstraint
 
 # -------------------------------------------------------------------
 # Conexão
@@ -14,7 +16,28 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///financer.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+
+
+def _opcoes_pool(url):
+    """Dimensionamento do pool de conexões, configurável por variáveis de ambiente.
+
+    O SQLite mantém o pool padrão do SQLAlchemy (SingletonThreadPool em memória,
+    QueuePool em arquivo); para servidores (PostgreSQL/MySQL) o pool é fixo e
+    pool_size + max_overflow limita as conexões abertas por processo.
+    """
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.environ.get("FINANCER_DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.environ.get("FINANCER_DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.environ.get("FINANCER_DB_POOL_TIMEOUT", "30")),
+        # Conexões ociosas são derrubadas pelo provedor; recicla antes e testa ao emprestar
+        "pool_recycle": int(os.environ.get("FINANCER_DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+engine = create_engine(DATABASE_URL, **_opcoes_pool(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
@@ -34,19 +57,44 @@ class Usuario(Base):
 
 class Transacao(Base):
     __tablename__ = "transacoes"
+    __table_args__ = (
+        # Deduplicação de uploads: o hash da chave natural é único (ver gerar_hash_transacoes)
+        UniqueConstraint("hash", name="uq_transacoes_hash"),
+        # Listagens, saldos por período e total anual filtram por usuário e intervalo de datas
+        Index("ix_transacoes_usuario_data", "usuario_id", "data"),
+        # Categorização em lote: WHERE usuario_id AND tipo AND detalhe
+        Index("ix_transacoes_usuario_tipo_detalhe", "usuario_id", "tipo", "detalhe"),
+        # Sincronização: WHERE usuario_id AND versao > :desde ORDER BY versao, id
+        Index("ix_transacoes_usuario_versao", "usuario_id", "versao"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
-    data = Column(String)
+    data = Column(Date)
     tipo = Column(String)
     detalhe = Column(String)
     credito = Column(Float)
     debito = Column(Float)
     categoria = Column(String, default="Sem categoria")
+    hash = Column(String(64))
+    # Versão da última escrita na linha (inserção ou categoria), tirada de versoes_sincronizacao
+    versao = Column(Integer, nullable=False, default=0)
+
+
+class VersaoSincronizacao(Base):
+    __tablename__ = "versoes_sincronizacao"
+
+    # Contador por usuário: cada escrita em transacoes reserva o próximo valor
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True, autoincrement=False)
+    versao = Column(Integer, nullable=False, default=0)
 
 
 class SaldoMensal(Base):
     __tablename__ = "saldos_mensais"
+    __table_args__ = (
+        # Um registro por usuário e mês: permite atualizar os saldos por upsert
+        UniqueConstraint("usuario_id", "mes", name="uq_saldos_mensais_usuario_mes"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
@@ -56,6 +104,47 @@ class SaldoMensal(Base):
     saldo = Column(Float)
 
 
+class ReceitaAnual(Base):
+    __tablename__ = "receitas_anuais"
+    __table_args__ = (
+        # Um registro por usuário e ano: importações e categorizações somam ou subtraem por upsert
+        UniqueConstraint("usuario_id", "ano", name="uq_receitas_anuais_usuario_ano"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    ano = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False, default=0.0)  # créditos categorizados como 'Receita'
+
+
+class Importacao(Base):
+    __tablename__ = "importacoes"
+    __table_args__ = (
+        # Um registro por usuário e conteúdo de arquivo: reenviar o mesmo extrato é reconhecido pelo hash
+        UniqueConstraint("usuario_id", "hash_arquivo", name="uq_importacoes_usuario_hash"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    hash_arquivo = Column(String(64))  # SHA-256 do arquivo; NULL no registro do histórico anterior ao log
+    data_inicio = Column(Date)  # período coberto pelo extrato (NULL se ele não tinha lançamentos)
+    data_fim = Column(Date)
+    linhas = Column(Integer, nullable=False, default=0)
+    criada_em = Column(DateTime)
+
+
+class RegraCategorizacao(Base):
+    __tablename__ = "regras_categorizacao"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False, index=True)
+    tipo_regra = Column(String, nullable=False)  # palavra, regex ou exato (ver models/categorizacao.py)
+    campo = Column(String, nullable=False, default="descricao")  # descricao, tipo ou detalhe
+    padrao = Column(String, nullable=False)
+    categoria = Column(String, nullable=False)
+    prioridade = Column(Integer, nullable=False, default=0)  # maior primeiro
+
+
 class Investimento(Base):
     __tablename__ = "investimentos"
 
@@ -69,7 +158,10 @@ class Investimento(Base):
 # Criação das tabelas (substitui criar_tabelas())
 # -------------------------------------------------------------------
 def criar_tabelas():
+    from infrastructure.migracoes import aplicar_migracoes
+
     Base.metadata.create_all(bind=engine)
+    aplicar_migracoes()
 
 
 # -------------------------------------------------------------------
@@ -78,10 +170,145 @@ def criar_tabelas():
 # -------------------------------------------------------------------
 def get_connection():
     """Retorna uma conexão raw para uso com execute() direto.
-    Use durante a migração. Prefira get_session() no código novo."""
+    Use durante a migração. Prefira get_session() no código novo.
+
+    Dentro de uma unidade de trabalho, devolve a conexão compartilhada dela."""
+    unidade = _unidade_atual.get()
+    if unidade is not None:
+        return unidade.conexao()
     return engine.connect()
 
 
 def get_session():
     """Retorna uma Session do SQLAlchemy para o código novo."""
-    return SessionLocal()
\ No newline at end of file
+    return SessionLocal()
+
+
+# -------------------------------------------------------------------
+# Unidade de trabalho
+# Uma conexão e uma transação compartilhadas por todos os repositórios
+# durante uma requisição (ou um bloco with unidade_de_trabalho()).
+# Os repositórios continuam usando "with get_connection() as conn" e
+# conn.commit(); dentro da unidade, o with não fecha a conexão e o
+# commit só acontece ao final, de uma vez.
+# -------------------------------------------------------------------
+_unidade_atual = ContextVar("unidade_de_trabalho", default=None)
+
+
+class _ConexaoCompartilhada:
+    """Conexão da unidade de trabalho: sair do with não a fecha e commit() fica para o fim da unidade."""
+
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+
+class UnidadeDeTrabalho:
+    """Abre a conexão no primeiro uso e a mantém até encerrar()."""
+
+    def __init__(self):
+        self._conexao = None
+        self._ao_encerrar = []
+
+    def conexao(self):
+        if self._conexao is None:
+            self._conexao = engine.connect()
+        return _ConexaoCompartilhada(self._conexao)
+
+    def confirmar(self):
+        if self._conexao is not None:
+            self._conexao.commit()
+
+    def desfazer(self):
+        if self._conexao is not None:
+            self._conexao.rollback()
+
+    def encerrar(self):
+        """Devolve a conexão ao pool (desfazendo o que não foi confirmado) e roda os callbacks."""
+        try:
+            if self._conexao is not None:
+                self._conexao.close()
+        finally:
+            self._conexao = None
+            callbacks, self._ao_encerrar = self._ao_encerrar, []
+            for callback in callbacks:
+                callback()
+
+
+def ao_encerrar_unidade(callback, imediato=False):
+    """Agenda callback para o fim da unidade de trabalho atual (após commit ou rollback).
+
+    Fora de uma unidade não faz nada, pois cada conexão já confirmou a própria escrita;
+    com imediato=True, nesse caso o callback é chamado na hora."""
+    unidade = _unidade_atual.get()
+    if unidade is not None:
+        unidade._ao_encerrar.append(callback)
+    elif imediato:
+        callback()
+
+
+def unidade_ativa():
+    """True dentro de uma unidade de trabalho (escritas ainda não confirmadas são visíveis)."""
+    return _unidade_atual.get() is not None
+
+
+@contextmanager
+def unidade_de_trabalho():
+    """Executa o bloco em uma única transação; reaproveita a unidade externa se já houver uma."""
+    atual = _unidade_atual.get()
+    if atual is not None:
+        yield atual
+        return
+
+    unidade = UnidadeDeTrabalho()
+    token = _unidade_atual.set(unidade)
+    try:
+        yield unidade
+        unidade.confirmar()
+    except BaseException:
+        unidade.desfazer()
+        raise
+    finally:
+        _unidade_atual.reset(token)
+        unidade.encerrar()
+
+
+def registrar_unidade_de_trabalho(app):
+    """Uma unidade de trabalho por requisição Flask.
+
+    Respostas de sucesso (< 400) confirmam a transação; erros a desfazem.
+    """
+    @app.before_request
+    def _abrir_unidade_de_trabalho():
+        _unidade_atual.set(UnidadeDeTrabalho())
+
+    @app.after_request
+    def _confirmar_unidade_de_trabalho(resposta):
+        unidade = _unidade_atual.get()
+        if unidade is not None:
+            if resposta.status_code < 400:
+                unidade.confirmar()
+            else:
+                unidade.desfazer()
+        return resposta
+
+    @app.teardown_request
+    def _encerrar_unidade_de_trabalho(exc):
+        unidade = _unidade_atual.get()
+        _unidade_atual.set(None)
+        if unidade is not None:
+            unidade.encerrar()
@@ -0,0 +1,185 @@
+import csv
+import io
+import os
+
+from sqlalchemy import Date, bindparam, text
+
+# -------------------------------------------------------------------
+# Escrita em lote
+# Em vez de um conn.execute() por linha, os registros são enviados em
+# lotes (executemany / VALUES múltiplos). No PostgreSQL, cargas grandes
+# usam COPY para uma tabela temporária e um único INSERT ... SELECT.
+# -------------------------------------------------------------------
+TAMANHO_LOTE_PADRAO = int(os.environ.get("FINANCER_TAMANHO_LOTE", "1000"))
+LIMIAR_COPY = int(os.environ.get("FINANCER_LIMIAR_COPY", "5000"))
+
+COLUNAS_TRANSACAO = ["usuario_id", "data", "tipo", "detalhe", "credito", "debito", "categoria", "hash", "versao"]
+
+
+def em_lotes(registros, tamanho_lote):
+    """Divide uma lista de registros em fatias de até tamanho_lote itens."""
+    for inicio in range(0, len(registros), tamanho_lote):
+        yield registros[inicio:inicio + tamanho_lote]
+
+
+def sql_inserir_transacoes(dialeto, origem=None):
+    """INSERT que descarta silenciosamente transações cujo hash já existe.
+
+    SQLite e PostgreSQL usam ON CONFLICT sobre o índice único de hash;
+    o MySQL não tem ON CONFLICT e usa INSERT IGNORE. Com origem, os
+    valores vêm de um SELECT em vez de parâmetros."""
+    colunas = ", ".join(COLUNAS_TRANSACAO)
+    if origem:
+        valores = f"SELECT {colunas} FROM {origem}"
+    else:
+        valores = "VALUES (" + ", ".join(f":{c}" for c in COLUNAS_TRANSACAO) + ")"
+
+    if dialeto == "mysql":
+        return f"INSERT IGNORE INTO transacoes ({colunas}) {valores}"
+    return f"INSERT INTO transacoes ({colunas}) {valores} ON CONFLICT (hash) DO NOTHING"
+
+
+def inserir_transacoes(conn, dados, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Insere o DataFrame já normalizado (COLUNAS_TRANSACAO) e retorna as linhas inseridas.
+
+    Não faz commit: todos os lotes ficam na transação de quem chamou."""
+    if dados.empty:
+        return 0
+
+    if conn.dialect.name == "postgresql" and len(dados) >= LIMIAR_COPY:
+        return _copiar_transacoes_postgres(conn, dados)
+
+    # Tipa o parâmetro data para que cada dialeto receba a data no formato nativo
+    sql = text(sql_inserir_transacoes(conn.dialect.name)).bindparams(bindparam("data", type_=Date))
+    registros = dados[COLUNAS_TRANSACAO].to_dict("records")
+
+    inseridas = 0
+    for lote in em_lotes(registros, tamanho_lote):
+        inseridas += conn.execute(sql, lote).rowcount
+    return inseridas
+
+
+def _copiar_transacoes_postgres(conn, dados):
+    """COPY para uma tabela temporária e INSERT ... SELECT com ON CONFLICT.
+
+    COPY não aceita ON CONFLICT, por isso a carga passa pela tabela temporária,
+    que é descartada no fim da transação."""
+    colunas = ", ".join(COLUNAS_TRANSACAO)
+    conn.execute(text(f"""
+        CREATE TEMP TABLE IF NOT EXISTS transacoes_carga ON COMMIT DROP AS
+        SELECT {colunas} FROM transacoes WITH NO DATA
+    """))
+
+    buffer = io.StringIO()
+    # Strings sempre entre aspas: no CSV do PostgreSQL, vazio sem aspas vira NULL
+    dados[COLUNAS_TRANSACAO].to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_NONNUMERIC)
+    buffer.seek(0)
+
+    copy_sql = f"COPY transacoes_carga ({colunas}) FROM STDIN WITH (FORMAT csv)"
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+    inseridas = conn.execute(text(sql_inserir_transacoes("postgresql", origem="transacoes_carga"))).rowcount
+    conn.execute(text("TRUNCATE transacoes_carga"))
+    return inseridas
+
+
+def sql_reservar_versao(dialeto):
+    """Incrementa (ou cria em 1) o contador de versões do usuário em versoes_sincronizacao."""
+    valores = "INTO versoes_sincronizacao (usuario_id, versao) VALUES (:usuario_id, 1)"
+    if dialeto == "mysql":
+        return f"INSERT {valores} ON DUPLICATE KEY UPDATE versao = versao + 1"
+    return f"INSERT {valores} ON CONFLICT (usuario_id) DO UPDATE SET versao = versoes_sincronizacao.versao + 1"
+
+
+def reservar_versao(conn, usuario_id):
+    """Reserva a próxima versão de sincronização do usuário. Não faz commit.
+
+    A linha do contador fica travada até o fim da transação de quem chamou, então
+    escritas concorrentes do mesmo usuário confirmam na ordem das versões: quem
+    sincronizou até a versão N não perde uma escrita N - 1 confirmada depois."""
+    conn.execute(text(sql_reservar_versao(conn.dialect.name)), {"usuario_id": usuario_id})
+    return ler_versao(conn, usuario_id)
+
+
+def ler_versao(conn, usuario_id):
+    """Última versão reservada pelo usuário (0 se ele nunca escreveu)."""
+    versao = conn.execute(
+        text("SELECT versao FROM versoes_sincronizacao WHERE usuario_id = :usuario_id"),
+        {"usuario_id": usuario_id}
+    ).scalar()
+    return versao or 0
+
+
+def sql_upsert_saldos_mensais(dialeto, acumular=True):
+    """INSERT em saldos_mensais que, se o mês já existe, soma (acumular) ou substitui os totais."""
+    colunas = ["total_credito", "total_debito", "saldo"]
+    valores = """INTO saldos_mensais (usuario_id, mes, total_credito, total_debito, saldo)
+        VALUES (:usuario_id, :mes, :total_credito, :total_debito, :saldo)"""
+
+    if dialeto == "mysql":
+        atualizacoes = ", ".join(
+            f"{c} = {c} + VALUES({c})" if acumular else f"{c} = VALUES({c})" for c in colunas
+        )
+        return f"INSERT {valores} ON DUPLICATE KEY UPDATE {atualizacoes}"
+
+    atualizacoes = ", ".join(
+        f"{c} = saldos_mensais.{c} + excluded.{c}" if acumular else f"{c} = excluded.{c}" for c in colunas
+    )
+    return f"INSERT {valores} ON CONFLICT (usuario_id, mes) DO UPDATE SET {atualizacoes}"
+
+
+def upsert_saldos_mensais(conn, registros, acumular=True, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Grava os saldos mensais em lotes, somando ou substituindo os meses existentes. Não faz commit."""
+    sql = text(sql_upsert_saldos_mensais(conn.dialect.name, acumular))
+    for lote in em_lotes(registros, tamanho_lote):
+        conn.execute(sql, lote)
+
+
+def sql_ano(dialeto, coluna="data"):
+    """Expressão SQL com o ano (inteiro) de uma coluna DATE."""
+    if dialeto == "sqlite":
+        return f"CAST(strftime('%Y', {coluna}) AS INTEGER)"
+    if dialeto == "mysql":
+        return f"YEAR({coluna})"
+    return f"CAST(EXTRACT(YEAR FROM {coluna}) AS INTEGER)"
+
+
+def sql_mes(dialeto, coluna="data"):
+    """Expressão SQL com o mês ('AAAA-MM', como em saldos_mensais.mes) de uma coluna DATE."""
+    if dialeto == "sqlite":
+        return f"strftime('%Y-%m', {coluna})"
+    if dialeto == "mysql":
+        return f"DATE_FORMAT({coluna}, '%Y-%m')"
+    return f"to_char({coluna}, 'YYYY-MM')"
+
+
+def sql_upsert_receitas_anuais(dialeto, acumular=True):
+    """INSERT em receitas_anuais que, se o ano já existe, soma (acumular) ou substitui o total."""
+    valores = "INTO receitas_anuais (usuario_id, ano, total) VALUES (:usuario_id, :ano, :total)"
+    if dialeto == "mysql":
+        return f"INSERT {valores} ON DUPLICATE KEY UPDATE total = {'total + ' if acumular else ''}VALUES(total)"
+    novo = "receitas_anuais.total + excluded.total" if acumular else "excluded.total"
+    return f"INSERT {valores} ON CONFLICT (usuario_id, ano) DO UPDATE SET total = {novo}"
+
+
+def upsert_receitas_anuais(conn, registros, acumular=True):
+    """Grava os totais de receita por ano, somando ou substituindo os anos existentes. Não faz commit."""
+    if registros:
+        conn.execute(text(sql_upsert_receitas_anuais(conn.dialect.name, acumular)), registros)
+
+
+def sql_registrar_importacao(dialeto):
+    """INSERT em importacoes que ignora o arquivo já registrado para o usuário (mesmo hash)."""
+    colunas = "usuario_id, hash_arquivo, data_inicio, data_fim, linhas, criada_em"
+    valores = "VALUES (:usuario_id, :hash_arquivo, :data_inicio, :data_fim, :linhas, CURRENT_TIMESTAMP)"
+    if dialeto == "mysql":
+        return f"INSERT IGNORE INTO importacoes ({colunas}) {valores}"
+    return f"INSERT INTO importacoes ({colunas}) {valores} ON CONFLICT (usuario_id, hash_arquivo) DO NOTHING"
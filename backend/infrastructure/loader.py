@@ -1,36 +1,440 @@
+import codecs
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
 import pandas as pd
+from openpyxl import load_workbook
+
+from infrastructure.uploads import caminho_em_disco, salvar_upload
+
+TAMANHO_BLOCO_PADRAO = 5000
+
+COLUNAS_NORMALIZADAS = ['data', 'tipo', 'detalhe', 'credito', 'debito']
+
+
+def normalizar_extrato(datas, descricoes, creditos, debitos) -> pd.DataFrame:
+    """Converte as colunas brutas do extrato nas colunas normalizadas (data, tipo, detalhe, credito, debito).
+
+    Linhas sem data válida (rodapés, linhas de saldo) são descartadas."""
+    dados = pd.DataFrame({
+        'data': _para_data(pd.Series(datas, dtype=object)),
+        'descricao': pd.Series(descricoes, dtype=object).fillna('').astype(str),
+        'credito': _para_valor(pd.Series(creditos, dtype=object)),
+        'debito': _para_valor(pd.Series(debitos, dtype=object)).abs(),
+    })
+    dados = dados[dados['data'].notna()]
+
+    partes = dados['descricao'].str.split(r'\s{2,}', n=1, expand=True, regex=True).reindex(columns=[0, 1])
+    dados['tipo'] = partes[0].fillna('').str.strip()
+    dados['detalhe'] = partes[1].fillna('').str.strip()
+
+    return dados[COLUNAS_NORMALIZADAS].reset_index(drop=True)
+
+
+def _para_data(serie: pd.Series) -> pd.Series:
+    """Aceita datas já tipadas pela planilha ou texto no formato DD/MM/AAAA."""
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipo == 'string':
+        texto = serie.str.strip()
+        datas = pd.to_datetime(texto, format='%d/%m/%Y', errors='coerce')
+        restantes = datas.isna() & texto.notna()
+        if restantes.any():
+            datas = datas.where(~restantes, pd.to_datetime(texto[restantes], dayfirst=True, errors='coerce'))
+        return datas
+    if tipo in ('datetime', 'datetime64', 'date', 'empty'):
+        return pd.to_datetime(serie, errors='coerce')
+
+    texto = serie.map(lambda valor: isinstance(valor, str))
+    datas = pd.to_datetime(serie.where(~texto), errors='coerce')
+    return datas.where(~texto, _para_data(serie[texto].astype(object)))
+
+
+def _para_valor(serie: pd.Series) -> pd.Series:
+    """Aceita números já tipados pela planilha ou texto no formato brasileiro (1.234,56)."""
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipo == 'string':
+        valores = pd.to_numeric(
+            serie.str.replace('.', '', regex=False).str.replace(',', '.', regex=False).str.strip(),
+            errors='coerce'
+        )
+        return valores.fillna(0).astype(float)
+    if tipo in ('floating', 'integer', 'mixed-integer-float', 'decimal', 'empty'):
+        return pd.to_numeric(serie, errors='coerce').fillna(0).astype(float)
+
+    texto = serie.map(lambda valor: isinstance(valor, str))
+    valores = pd.to_numeric(serie.where(~texto), errors='coerce').fillna(0).astype(float)
+    return valores.where(~texto, _para_valor(serie[texto].astype(object)))
+
+
+# -------------------------------------------------------------------
+# Registro de loaders
+# Cada formato de extrato registra sua classe; escolher_loader() decide
+# pelo conteúdo (magic bytes), depois pelo content type e pela extensão.
+# -------------------------------------------------------------------
+LOADERS = []
+
+
+def registrar_loader(loader_cls):
+    """Decorator que adiciona a classe ao registro, na ordem de detecção."""
+    LOADERS.append(loader_cls)
+    return loader_cls
+
+
+def escolher_loader(arquivo):
+    """Retorna a classe de loader adequada ao arquivo (caminho ou FileStorage)."""
+    inicio = _ler_inicio(arquivo)
+    for loader_cls in LOADERS:
+        if loader_cls.reconhece(inicio):
+            return loader_cls
+
+    tipo_conteudo = (getattr(arquivo, 'mimetype', None) or '').lower()
+    nome = str(getattr(arquivo, 'filename', None) or arquivo).lower()
+    for loader_cls in LOADERS:
+        if tipo_conteudo in loader_cls.TIPOS_CONTEUDO or nome.endswith(loader_cls.EXTENSOES):
+            return loader_cls
+
+    raise ValueError("Formato de extrato não suportado. Envie um arquivo .xlsx, .csv ou .ofx.")
 
 
+def _ler_inicio(arquivo, tamanho=2048):
+    """Lê os primeiros bytes do arquivo sem consumir o stream."""
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, 'rb') as f:
+            return f.read(tamanho)
+
+    stream = getattr(arquivo, 'stream', arquivo)
+    posicao = stream.tell()
+    inicio = stream.read(tamanho)
+    stream.seek(posicao)
+    return inicio if isinstance(inicio, bytes) else inicio.encode()
+
+
+def hash_do_arquivo(arquivo, tamanho_bloco=1024 * 1024) -> str:
+    """SHA-256 do conteúdo do arquivo (caminho ou FileStorage), lido em blocos sem consumir o stream."""
+    def calcular(stream):
+        digest = hashlib.sha256()
+        bloco = stream.read(tamanho_bloco)
+        while bloco:
+            digest.update(bloco if isinstance(bloco, bytes) else bloco.encode())
+            bloco = stream.read(tamanho_bloco)
+        return digest.hexdigest()
+
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, 'rb') as f:
+            return calcular(f)
+
+    stream = getattr(arquivo, 'stream', arquivo)
+    posicao = stream.tell()
+    try:
+        return calcular(stream)
+    finally:
+        stream.seek(posicao)
+
+
+def _codificacao(inicio: bytes) -> str:
+    """UTF-8 (com ou sem BOM) quando os primeiros bytes são válidos; senão Latin-1."""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(inicio, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+@contextmanager
+def _abrir_texto(arquivo):
+    """Abre o arquivo como texto para leitura sequencial, sem carregá-lo inteiro."""
+    codificacao = _codificacao(_ler_inicio(arquivo))
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, encoding=codificacao, newline='') as texto:
+            yield texto
+        return
+
+    texto = io.TextIOWrapper(getattr(arquivo, 'stream', arquivo), encoding=codificacao, newline='')
+    try:
+        yield texto
+    finally:
+        texto.detach()  # não fecha o stream do upload
+
+
+def _ler_texto(arquivo):
+    """Lê o arquivo inteiro como texto, em UTF-8 ou, se falhar, em Latin-1."""
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, 'rb') as f:
+            conteudo = f.read()
+    else:
+        conteudo = getattr(arquivo, 'stream', arquivo).read()
+
+    try:
+        return conteudo.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return conteudo.decode('latin-1')
+
+
+@registrar_loader
 class ExcelLoader():
-    def __init__(self, arquivo_excel):
+    FORMATO = 'xlsx'
+    TIPOS_CONTEUDO = ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',)
+    EXTENSOES = ('.xlsx',)
+    COLUNAS = ['Data', 'Descrição', 'Crédito (R$)', 'Débito (R$)']
+
+    @staticmethod
+    def reconhece(inicio: bytes) -> bool:
+        # .xlsx é um arquivo ZIP
+        return inicio.startswith(b'PK\x03\x04')
+
+    def __init__(self, arquivo_excel, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
         self.arquivo_excel = arquivo_excel
+        self.tamanho_bloco = tamanho_bloco
+
+    def carregar(self):
+        """Carrega o extrato inteiro em um único DataFrame normalizado."""
+        blocos = list(self.carregar_em_blocos())
+        if not blocos:
+            return pd.DataFrame(columns=COLUNAS_NORMALIZADAS)
+        return pd.concat(blocos, ignore_index=True)
+
+    def carregar_em_blocos(self):
+        """Lê a planilha em modo read-only e produz DataFrames normalizados de até tamanho_bloco linhas.
+
+        Só o bloco atual fica em memória, independentemente do tamanho do arquivo."""
+        arquivo = getattr(self.arquivo_excel, 'stream', self.arquivo_excel)
+        workbook = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            linhas = workbook.worksheets[0].iter_rows(values_only=True)
+            cabecalho = [str(celula).strip() if celula is not None else '' for celula in next(linhas, ())]
+
+            faltando = [coluna for coluna in self.COLUNAS if coluna not in cabecalho]
+            if faltando:
+                raise ValueError(f"Colunas ausentes no extrato: {', '.join(faltando)}")
+            indices = [cabecalho.index(coluna) for coluna in self.COLUNAS]
+
+            bloco = []
+            for linha in linhas:
+                valores = [linha[i] if i < len(linha) else None for i in indices]
+                if all(valor is None for valor in valores):
+                    continue
+                bloco.append(valores)
+                if len(bloco) == self.tamanho_bloco:
+                    yield normalizar_extrato(*zip(*bloco))
+                    bloco = []
+
+            if bloco:
+                yield normalizar_extrato(*zip(*bloco))
+        finally:
+            workbook.close()
+
+
+@registrar_loader
+class OfxLoader():
+    """Extratos OFX (1.x SGML ou 2.x XML): um lançamento por bloco <STMTTRN>."""
+    FORMATO = 'ofx'
+    TIPOS_CONTEUDO = ('application/x-ofx', 'application/ofx')
+    EXTENSOES = ('.ofx',)
+
+    def __init__(self, arquivo_ofx, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        self.arquivo_ofx = arquivo_ofx
+        self.tamanho_bloco = tamanho_bloco
+
+    @staticmethod
+    def reconhece(inicio: bytes) -> bool:
+        cabecalho = inicio.lstrip(b'\xef\xbb\xbf \t\r\n').upper()
+        return cabecalho.startswith(b'OFXHEADER') or b'<OFX>' in cabecalho or b'<?OFX' in cabecalho
 
     def carregar(self):
-        MAX_ROWS = 100000
-        dados = pd.read_excel(self.arquivo_excel, MAX_ROWS)
-        dados.columns = dados.columns.str.strip()
-
-        dados['Data'] = pd.to_datetime(dados['Data'].astype(str).str.strip(), dayfirst=True)
-
-        dados['Crédito (R$)'] = pd.to_numeric(
-            dados['Crédito (R$)'].astype(str).str.replace('.', '').str.replace(',', '.').str.strip(),
-            errors='coerce').fillna(0)
-
-        dados['Débito (R$)'] = pd.to_numeric(
-            dados['Débito (R$)'].astype(str).str.replace('.', '').str.replace(',', '.').str.strip(),
-            errors='coerce').fillna(0).abs()
-
-        dados[['Tipo', 'Detalhe']] = dados['Descrição'].str.split(r'\s{2,}', n=1, expand=True)
-        dados['Detalhe'] = dados['Detalhe'].fillna('')
-
-        # ✅ ADICIONE ISTO - Normalizar nomes das colunas
-        dados = dados.rename(columns={
-            'Data': 'data',
-            'Crédito (R$)': 'credito',
-            'Débito (R$)': 'debito',
-            'Tipo': 'tipo',
-            'Detalhe': 'detalhe',
-            'Descrição': 'descricao'
-        })
-
-        return dados
+        blocos = list(self.carregar_em_blocos())
+        if not blocos:
+            return pd.DataFrame(columns=COLUNAS_NORMALIZADAS)
+        return pd.concat(blocos, ignore_index=True)
+
+    def carregar_em_blocos(self):
+        lancamentos = pd.Series(
+            re.findall(r'<STMTTRN>(.*?)</STMTTRN>', _ler_texto(self.arquivo_ofx), flags=re.S | re.I),
+            dtype=object
+        )
+
+        for inicio in range(0, len(lancamentos), self.tamanho_bloco):
+            yield self._normalizar(lancamentos.iloc[inicio:inicio + self.tamanho_bloco])
+
+    @staticmethod
+    def _normalizar(lancamentos):
+        def campo(tag):
+            return lancamentos.str.extract(rf'<{tag}>([^<\r\n]*)', flags=re.I)[0].str.strip()
+
+        datas = pd.to_datetime(campo('DTPOSTED').str[:8], format='%Y%m%d', errors='coerce')
+        valores = pd.to_numeric(campo('TRNAMT').str.replace(',', '.', regex=False), errors='coerce').fillna(0)
+        descricoes = campo('MEMO').replace('', None).fillna(campo('NAME'))
+
+        return normalizar_extrato(
+            datas.tolist(),
+            descricoes.tolist(),
+            valores.clip(lower=0).tolist(),
+            (-valores).clip(lower=0).tolist(),
+        )
+
+
+@registrar_loader
+class CsvLoader():
+    """Extratos CSV com as mesmas colunas da planilha (Data, Descrição, Crédito (R$), Débito (R$))."""
+    FORMATO = 'csv'
+    TIPOS_CONTEUDO = ('text/csv', 'application/csv', 'text/plain')
+    EXTENSOES = ('.csv',)
+
+    def __init__(self, arquivo_csv, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        self.arquivo_csv = arquivo_csv
+        self.tamanho_bloco = tamanho_bloco
+
+    @staticmethod
+    def reconhece(inicio: bytes) -> bool:
+        primeira_linha = inicio.split(b'\n', 1)[0]
+        return b'Data' in primeira_linha and (b';' in primeira_linha or b',' in primeira_linha)
+
+    def carregar(self):
+        blocos = list(self.carregar_em_blocos())
+        if not blocos:
+            return pd.DataFrame(columns=COLUNAS_NORMALIZADAS)
+        return pd.concat(blocos, ignore_index=True)
+
+    def carregar_em_blocos(self):
+        with _abrir_texto(self.arquivo_csv) as texto:
+            cabecalho = texto.readline()
+            colunas = [coluna.strip() for coluna in cabecalho.split(';' if ';' in cabecalho else ',')]
+
+            faltando = [coluna for coluna in ExcelLoader.COLUNAS if coluna not in colunas]
+            if faltando:
+                raise ValueError(f"Colunas ausentes no extrato: {', '.join(faltando)}")
+
+            leitor = pd.read_csv(texto, sep=';' if ';' in cabecalho else ',', names=colunas, header=None,
+                                 usecols=ExcelLoader.COLUNAS, dtype=str, keep_default_na=False,
+                                 na_values=[''], chunksize=self.tamanho_bloco)
+            for bloco in leitor:
+                yield normalizar_extrato(*(bloco[coluna].astype(object) for coluna in ExcelLoader.COLUNAS))
+
+
+# -------------------------------------------------------------------
+# Vários extratos por upload
+# Arquivos .zip são expandidos em extratos avulsos, e cada extrato é
+# lido em um processo separado: a leitura do .xlsx (openpyxl) é
+# limitada pela CPU e não se beneficia de threads. O pool de processos
+# é criado no primeiro upload grande e reaproveitado pelos seguintes.
+# -------------------------------------------------------------------
+IMPORTACAO_PROCESSOS = int(os.environ.get("FINANCER_IMPORTACAO_PROCESSOS", "0")) or os.cpu_count() or 1
+IMPORTACAO_MIN_BYTES_PARALELO = int(os.environ.get("FINANCER_IMPORTACAO_MIN_BYTES_PARALELO", str(4 * 1024 * 1024)))
+IMPORTACAO_LEITURAS_PARALELAS = int(os.environ.get("FINANCER_IMPORTACAO_LEITURAS_PARALELAS", "2"))
+MAX_ARQUIVOS_POR_UPLOAD = int(os.environ.get("FINANCER_IMPORTACAO_MAX_ARQUIVOS", "100"))
+MAX_BYTES_DESCOMPACTADOS = int(os.environ.get("FINANCER_IMPORTACAO_MAX_BYTES_ZIP", str(256 * 1024 * 1024)))
+
+
+def eh_arquivo_zip(caminho) -> bool:
+    """True para um .zip de extratos (a planilha .xlsx também é ZIP, mas não conta)."""
+    if not zipfile.is_zipfile(caminho):
+        return False
+    with zipfile.ZipFile(caminho) as arquivo_zip:
+        return '[Content_Types].xml' not in arquivo_zip.namelist()
+
+
+def expandir_arquivos(arquivos, diretorio) -> list:
+    """Grava os arquivos enviados em diretorio e troca cada .zip pelos extratos que ele contém.
+
+    Aceita caminhos ou FileStorage e retorna a lista de caminhos dos extratos. Uploads que já
+    estão no spool em disco (RequisicaoComSpool) são lidos de lá, sem nova cópia."""
+    extratos = []
+    for arquivo in arquivos:
+        if isinstance(arquivo, (str, os.PathLike)):
+            caminho = arquivo
+        else:
+            caminho = caminho_em_disco(arquivo) or _gravar(arquivo, diretorio, len(extratos))
+        if not eh_arquivo_zip(caminho):
+            extratos.append(caminho)
+            continue
+
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            membros = [membro for membro in arquivo_zip.infolist() if not _ignorar_no_zip(membro)]
+            if sum(membro.file_size for membro in membros) > MAX_BYTES_DESCOMPACTADOS:
+                raise ValueError("Arquivo .zip grande demais depois de descompactado.")
+            for membro in membros:
+                # Só o nome do arquivo: caminhos dentro do .zip não escapam de diretorio
+                destino = os.path.join(diretorio, f"{len(extratos)}-{os.path.basename(membro.filename)}")
+                with arquivo_zip.open(membro) as origem, open(destino, 'wb') as saida:
+                    shutil.copyfileobj(origem, saida)
+                extratos.append(destino)
+
+        if len(extratos) > MAX_ARQUIVOS_POR_UPLOAD:
+            break
+
+    if not extratos:
+        raise ValueError("Nenhum extrato encontrado nos arquivos enviados.")
+    if len(extratos) > MAX_ARQUIVOS_POR_UPLOAD:
+        raise ValueError(f"Envie no máximo {MAX_ARQUIVOS_POR_UPLOAD} extratos por vez.")
+    return extratos
+
+
+def _gravar(arquivo, diretorio, indice) -> str:
+    nome = os.path.basename(getattr(arquivo, 'filename', None) or 'extrato')
+    return salvar_upload(arquivo, os.path.join(diretorio, f"{indice}-{nome}"))
+
+
+def _ignorar_no_zip(membro) -> bool:
+    """Pastas e metadados do sistema (__MACOSX/, arquivos ocultos) não são extratos."""
+    nome = os.path.basename(membro.filename)
+    return membro.is_dir() or membro.filename.startswith('__MACOSX/') or not nome or nome.startswith('.')
+
+
+def carregar_arquivo(caminho) -> pd.DataFrame:
+    """Lê um extrato inteiro; fica no nível do módulo para rodar nos processos de leitura."""
+    return escolher_loader(caminho)(caminho).carregar()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# Uploads lendo no pool ao mesmo tempo; os demais esperam a vez em vez de disputar os processos
+_vagas_pool = threading.BoundedSemaphore(IMPORTACAO_LEITURAS_PARALELAS)
+
+
+def _pool_de_leitura():
+    """Pool compartilhado, criado na primeira leitura em paralelo com IMPORTACAO_PROCESSOS processos.
+
+    O tamanho não depende do upload que o cria: o pool dura o processo inteiro e
+    precisa atender também os uploads seguintes, com mais arquivos."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: o processo da API tem threads (importações, servidor), e um fork herdaria locks presos
+            _pool = ProcessPoolExecutor(max_workers=IMPORTACAO_PROCESSOS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def carregar_em_paralelo(caminhos, processos=IMPORTACAO_PROCESSOS, min_bytes=IMPORTACAO_MIN_BYTES_PARALELO) -> list:
+    """Lê os extratos (na ordem de caminhos), um arquivo por processo do pool compartilhado.
+
+    Abaixo de min_bytes no total, os arquivos são lidos em série: cada processo novo
+    importa pandas e openpyxl, o que custa mais do que ler poucos arquivos pequenos."""
+    # processos só decide entre série e paralelo; o pool tem sempre IMPORTACAO_PROCESSOS processos
+    if min(processos, len(caminhos)) <= 1 or sum(os.path.getsize(caminho) for caminho in caminhos) < min_bytes:
+        return [carregar_arquivo(caminho) for caminho in caminhos]
+
+    with _vagas_pool:
+        pool = _pool_de_leitura()
+        try:
+            return list(pool.map(carregar_arquivo, caminhos))
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória): o próximo upload cria outro pool
+            _descartar_pool(pool)
+            raise
@@ -0,0 +1,252 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Métricas
+# Histogramas e contadores em memória, expostos em /metrics no formato
+# de texto do Prometheus. Cada processo tem os seus números: com vários
+# workers, o Prometheus deve coletar de cada um.
+# -------------------------------------------------------------------
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+# Requisições mais lentas que isso são registradas no log com o detalhamento das consultas (0 = desligado)
+LOG_LENTAS_MS = float(os.environ.get("FINANCER_LOG_REQUISICOES_LENTAS_MS", "0"))
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(valores):
+    valores = list(valores)
+    if not valores:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in valores) + "}"
+
+
+class Contador:
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = tuple(rotulos.get(nome, "") for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} counter"]
+        with self._lock:
+            for chave, valor in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_rotulos(zip(self.rotulos, chave))} {valor}")
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome, descricao, rotulos=(), limites=LIMITES_SEGUNDOS):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(limites)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos.get(nome, "") for nome in self.rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][bisect_left(self.limites, valor)] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            for chave, (baldes, soma, total) in sorted(self._series.items()):
+                rotulos = list(zip(self.rotulos, chave))
+                acumulado = 0
+                for limite, quantidade in zip((*self.limites, "+Inf"), baldes):
+                    acumulado += quantidade
+                    linhas.append(f"{self.nome}_bucket{_rotulos(rotulos + [('le', limite)])} {acumulado}")
+                linhas.append(f"{self.nome}_sum{_rotulos(rotulos)} {soma}")
+                linhas.append(f"{self.nome}_count{_rotulos(rotulos)} {total}")
+        return linhas
+
+
+REQUISICAO_SEGUNDOS = Histograma(
+    "financer_requisicao_segundos", "Duração das requisições HTTP.", ("metodo", "rota", "status"))
+REQUISICAO_CONSULTAS = Histograma(
+    "financer_requisicao_consultas_sql", "Consultas SQL por requisição.", ("rota",), LIMITES_CONSULTAS)
+REQUISICAO_SQL_SEGUNDOS = Histograma(
+    "financer_requisicao_sql_segundos", "Tempo total em SQL por requisição.", ("rota",))
+CONSULTAS_SQL = Contador("financer_consultas_sql_total", "Consultas SQL executadas.")
+IMPORTACAO_ETAPA_SEGUNDOS = Histograma(
+    "financer_importacao_etapa_segundos", "Duração de cada etapa da importação de extratos, por bloco.", ("etapa",))
+
+METRICAS = [REQUISICAO_SEGUNDOS, REQUISICAO_CONSULTAS, REQUISICAO_SQL_SEGUNDOS, CONSULTAS_SQL,
+            IMPORTACAO_ETAPA_SEGUNDOS]
+
+
+def exportar_metricas(caches=None):
+    """Todas as métricas no formato de texto do Prometheus (versão 0.0.4).
+
+    :param caches: {nome: objeto com estatisticas()}, exportados como financer_cache_<campo>{cache=nome}.
+    """
+    linhas = []
+    for metrica in METRICAS:
+        linhas.extend(metrica.exportar())
+    linhas.extend(_linhas_caches(caches or {}))
+    return "\n".join(linhas) + "\n"
+
+
+def _linhas_caches(caches):
+    por_campo = {}
+    for nome, cache in caches.items():
+        for campo, valor in cache.estatisticas().items():
+            por_campo.setdefault(campo, []).append((nome, valor))
+
+    linhas = []
+    for campo, valores in por_campo.items():
+        metrica = f"financer_cache_{campo}"
+        linhas += [f"# HELP {metrica} Estatística {campo} dos caches.", f"# TYPE {metrica} gauge"]
+        linhas += [f"{metrica}{_rotulos([('cache', nome)])} {valor}" for nome, valor in valores]
+    return linhas
+
+
+# -------------------------------------------------------------------
+# Etapas da importação
+# -------------------------------------------------------------------
+@contextmanager
+def cronometrar_etapa(etapa):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        IMPORTACAO_ETAPA_SEGUNDOS.observar(time.perf_counter() - inicio, etapa=etapa)
+
+
+def iterar_cronometrado(iteravel, etapa):
+    """Repassa os itens de um gerador, medindo o tempo gasto para produzir cada um."""
+    iterador = iter(iteravel)
+    while True:
+        with cronometrar_etapa(etapa):
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+        yield item
+
+
+# -------------------------------------------------------------------
+# Consultas SQL por requisição (eventos do engine)
+# -------------------------------------------------------------------
+_consultas_atuais = ContextVar("consultas_sql", default=None)
+
+
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metricas_inicio", []).append(time.perf_counter())
+
+
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info["_metricas_inicio"].pop()
+    CONSULTAS_SQL.incrementar()
+    consultas = _consultas_atuais.get()
+    if consultas is not None:
+        consultas.append((statement, duracao))
+
+
+def instrumentar_engine(engine):
+    """Conta as consultas e o tempo em SQL; dentro de uma requisição, guarda cada consulta."""
+    if not event.contains(engine, "before_cursor_execute", _antes_da_consulta):
+        event.listen(engine, "before_cursor_execute", _antes_da_consulta)
+        event.listen(engine, "after_cursor_execute", _depois_da_consulta)
+
+
+def _resumo_consultas(consultas, limite=5):
+    """Agrupa as consultas pelo texto SQL e devolve as que mais tomaram tempo."""
+    grupos = {}
+    for statement, duracao in consultas:
+        texto = " ".join(statement.split())[:200]
+        quantidade, total = grupos.get(texto, (0, 0.0))
+        grupos[texto] = (quantidade + 1, total + duracao)
+    ordenados = sorted(grupos.items(), key=lambda item: item[1][1], reverse=True)[:limite]
+    return "\n".join(f"  {quantidade}x {total * 1000:.1f}ms {texto}" for texto, (quantidade, total) in ordenados)
+
+
+def instrumentar_app(app, engine, caches=None, log_lentas_ms=LOG_LENTAS_MS):
+    """Mede cada requisição (latência, consultas, tempo em SQL) e registra a rota /metrics.
+
+    :param caches: {nome: objeto com estatisticas()} incluídos em /metrics.
+    :param log_lentas_ms: Registra no log as requisições acima desse tempo, com as consultas
+        que mais pesaram (0 desliga; padrão: FINANCER_LOG_REQUISICOES_LENTAS_MS).
+    """
+    from flask import Response, g, request
+
+    instrumentar_engine(engine)
+
+    @app.before_request
+    def _iniciar_medicao():
+        g._metricas_inicio = time.perf_counter()
+        g._metricas_token = _consultas_atuais.set([])
+
+    @app.after_request
+    def _registrar_medicao(resposta):
+        inicio = g.pop("_metricas_inicio", None)
+        token = g.pop("_metricas_token", None)
+        if inicio is None:
+            return resposta
+
+        consultas = _consultas_atuais.get()
+        # A regra (/api/importacoes/<importacao_id>) e não o caminho, para não explodir os rótulos
+        rota = request.url_rule.rule if request.url_rule else "nao_encontrada"
+        metodo, status = request.method, resposta.status_code
+
+        def registrar():
+            duracao = time.perf_counter() - inicio
+            tempo_sql = sum(duracao_sql for _, duracao_sql in consultas)
+            REQUISICAO_SEGUNDOS.observar(duracao, metodo=metodo, rota=rota, status=status)
+            REQUISICAO_CONSULTAS.observar(len(consultas), rota=rota)
+            REQUISICAO_SQL_SEGUNDOS.observar(tempo_sql, rota=rota)
+
+            if log_lentas_ms and duracao * 1000 >= log_lentas_ms:
+                logger.warning(
+                    "Requisição lenta: %s %s %.1fms, %d consulta(s), %.1fms em SQL\n%s",
+                    metodo, rota, duracao * 1000, len(consultas), tempo_sql * 1000,
+                    _resumo_consultas(consultas)
+                )
+
+        if not resposta.is_streamed:
+            _consultas_atuais.reset(token)
+            registrar()
+            return resposta
+
+        # Resposta em fluxo (ex.: /api/sync): as consultas continuam enquanto o corpo é enviado,
+        # então a medição (latência total incluída) só é registrada quando a resposta é fechada
+        def registrar_ao_fechar():
+            try:
+                _consultas_atuais.reset(token)
+            except ValueError:  # fechada em outro contexto: a lista já não recebe consultas dele
+                pass
+            registrar()
+
+        resposta.call_on_close(registrar_ao_fechar)
+        return resposta
+
+    @app.route("/metrics")
+    def metricas():
+        return Response(exportar_metricas(caches), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,168 @@
+import pandas as pd
+from sqlalchemy import Date, inspect, text
+
+from infrastructure.database import engine
+from infrastructure.escrita_em_lote import sql_ano
+from models.main import gerar_hash_transacoes
+
+
+# -------------------------------------------------------------------
+# Migrações do esquema
+# create_all() só cria tabelas novas; colunas e índices adicionados a
+# tabelas que já existem precisam ser aplicados aqui. Cada migração
+# verifica o estado atual do banco e é segura para rodar várias vezes.
+# -------------------------------------------------------------------
+def _colunas(conn, tabela):
+    return {coluna["name"] for coluna in inspect(conn).get_columns(tabela)}
+
+
+def _indices_unicos(conn, tabela):
+    inspetor = inspect(conn)
+    return (
+        {indice["name"] for indice in inspetor.get_indexes(tabela) if indice.get("unique")}
+        | {restricao["name"] for restricao in inspetor.get_unique_constraints(tabela)}
+    )
+
+
+def adicionar_hash_transacoes(conn):
+    """Adiciona transacoes.hash, preenche as linhas existentes e cria o índice único."""
+    if "hash" in _colunas(conn, "transacoes"):
+        return False
+
+    conn.execute(text("ALTER TABLE transacoes ADD COLUMN hash VARCHAR(64)"))
+
+    rows = conn.execute(text("""
+        SELECT id, usuario_id, data, tipo, detalhe, credito, debito
+        FROM transacoes
+        ORDER BY usuario_id, id
+    """)).fetchall()
+
+    if rows:
+        df = pd.DataFrame(rows, columns=["id", "usuario_id", "data", "tipo", "detalhe", "credito", "debito"])
+        df["hash"] = pd.concat([
+            gerar_hash_transacoes(grupo, usuario_id)
+            for usuario_id, grupo in df.groupby("usuario_id")
+        ])
+        conn.execute(
+            text("UPDATE transacoes SET hash = :hash WHERE id = :id"),
+            df[["hash", "id"]].to_dict("records")
+        )
+
+    conn.execute(text("CREATE UNIQUE INDEX uq_transacoes_hash ON transacoes (hash)"))
+    return True
+
+
+def adicionar_unique_saldos_mensais(conn):
+    """Garante um único saldo por (usuario_id, mes), exigido pelo upsert incremental."""
+    if "uq_saldos_mensais_usuario_mes" in _indices_unicos(conn, "saldos_mensais"):
+        return False
+
+    # Mantém o registro mais recente de cada mês antes de criar o índice
+    conn.execute(text("""
+        DELETE FROM saldos_mensais
+        WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT MAX(id) AS id FROM saldos_mensais GROUP BY usuario_id, mes
+            ) AS manter
+        )
+    """))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_saldos_mensais_usuario_mes ON saldos_mensais (usuario_id, mes)"
+    ))
+    return True
+
+
+def converter_data_transacoes(conn):
+    """Converte transacoes.data de texto (AAAA-MM-DD) para DATE.
+
+    No SQLite a coluna já guarda datas ISO, que é o formato usado pelo tipo Date
+    do SQLAlchemy, então não há o que converter."""
+    if conn.dialect.name == "sqlite":
+        return False
+
+    tipo = next(c["type"] for c in inspect(conn).get_columns("transacoes") if c["name"] == "data")
+    if isinstance(tipo, Date):
+        return False
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE transacoes ALTER COLUMN data TYPE DATE USING data::date"))
+    else:
+        conn.execute(text("ALTER TABLE transacoes MODIFY data DATE"))
+    return True
+
+
+def adicionar_versao_transacoes(conn):
+    """Adiciona transacoes.versao; as linhas existentes ficam na versão 0 e vêm na primeira sincronização."""
+    if "versao" in _colunas(conn, "transacoes"):
+        return False
+
+    conn.execute(text("ALTER TABLE transacoes ADD COLUMN versao INTEGER NOT NULL DEFAULT 0"))
+    return True
+
+
+INDICES_TRANSACOES = {
+    "ix_transacoes_usuario_data": "usuario_id, data",
+    "ix_transacoes_usuario_tipo_detalhe": "usuario_id, tipo, detalhe",
+    "ix_transacoes_usuario_versao": "usuario_id, versao",
+}
+
+
+def criar_indices_transacoes(conn):
+    """Cria os índices compostos de transacoes que ainda não existem."""
+    existentes = {indice["name"] for indice in inspect(conn).get_indexes("transacoes")}
+    criados = False
+    for nome, colunas in INDICES_TRANSACOES.items():
+        if nome not in existentes:
+            conn.execute(text(f"CREATE INDEX {nome} ON transacoes ({colunas})"))
+            criados = True
+    return criados
+
+
+def preencher_receitas_anuais(conn):
+    """Preenche receitas_anuais (tabela nova) com as receitas que já estão em transacoes."""
+    if conn.execute(text("SELECT 1 FROM receitas_anuais LIMIT 1")).first() is not None:
+        return False
+
+    ano = sql_ano(conn.dialect.name)
+    inseridas = conn.execute(text(f"""
+        INSERT INTO receitas_anuais (usuario_id, ano, total)
+        SELECT usuario_id, {ano}, SUM(credito)
+        FROM transacoes
+        WHERE categoria = 'Receita'
+        GROUP BY usuario_id, {ano}
+    """)).rowcount
+    return inseridas > 0
+
+
+def registrar_importacoes_existentes(conn):
+    """Cria em importacoes (tabela nova) um registro por usuário cobrindo as transações já gravadas.
+
+    Sem ele, o período anterior ao log pareceria nunca importado e a deduplicação
+    por período deixaria de consultar essas datas."""
+    if conn.execute(text("SELECT 1 FROM importacoes LIMIT 1")).first() is not None:
+        return False
+
+    inseridas = conn.execute(text("""
+        INSERT INTO importacoes (usuario_id, hash_arquivo, data_inicio, data_fim, linhas, criada_em)
+        SELECT usuario_id, NULL, MIN(data), MAX(data), COUNT(*), CURRENT_TIMESTAMP
+        FROM transacoes
+        GROUP BY usuario_id
+    """)).rowcount
+    return inseridas > 0
+
+
+MIGRACOES = [
+    adicionar_hash_transacoes,
+    adicionar_unique_saldos_mensais,
+    converter_data_transacoes,
+    adicionar_versao_transacoes,
+    criar_indices_transacoes,
+    preencher_receitas_anuais,
+    registrar_importacoes_existentes,
+]
+
+
+def aplicar_migracoes():
+    """Aplica, em uma única transação, as migrações pendentes."""
+    with engine.begin() as conn:
+        return [migracao.__name__ for migracao in MIGRACOES if migracao(conn)]
@@ -0,0 +1,157 @@
+import base64
+import re
+from datetime import date
+
+import pandas as pd
+
+# -------------------------------------------------------------------
+# Paginação por cursor (keyset)
+# As listagens são ordenadas por (data, id) decrescentes; o cursor guarda
+# a última chave entregue, e a próxima página continua a partir dela.
+# O custo de cada página não depende de quantas páginas vieram antes.
+# -------------------------------------------------------------------
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 500
+
+# Sincronização (/api/sync): a resposta sai em fluxo, então as páginas podem ser bem maiores
+LIMITE_SYNC_PADRAO = 5000
+LIMITE_SYNC_MAXIMO = 50000
+
+# Relatórios: ranking de favorecidos
+LIMITE_FAVORECIDOS_PADRAO = 10
+LIMITE_FAVORECIDOS_MAXIMO = 100
+
+NATUREZAS = ('credito', 'debito')
+
+
+def codificar_cursor(data, id):
+    """Cursor opaco a partir da chave (data, id) da última linha da página."""
+    return base64.urlsafe_b64encode(f"{data}|{id}".encode()).decode()
+
+
+def _decodificar_chave(cursor):
+    """Separa o cursor nas duas partes da chave (texto, id) ou levanta ValueError."""
+    try:
+        chave, id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return chave, int(id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def decodificar_cursor(cursor):
+    """Retorna (data, id) do cursor ou levanta ValueError se ele for inválido."""
+    try:
+        data, id = _decodificar_chave(cursor)
+        # A data vai direto para a consulta (data < :cursor_data): texto que não é data vira 400, não 500
+        return date.fromisoformat(data).isoformat(), id
+    except ValueError as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def codificar_cursor_sync(versao, id):
+    """Cursor opaco de sincronização a partir da chave (versao, id) da última linha recebida."""
+    return codificar_cursor(versao, id)
+
+
+def decodificar_cursor_sync(cursor):
+    """Retorna (versao, id) do cursor de sincronização ou levanta ValueError."""
+    versao, id = _decodificar_chave(cursor)
+    try:
+        return int(versao), id
+    except ValueError as e:
+        raise ValueError("Cursor inválido.") from e
+
+
+def proximo_cursor_sync(ultimo, desde=None):
+    """Cursor a devolver depois de entregar ultimo (linha com versao e id); sem linhas, mantém desde."""
+    if ultimo is not None:
+        return codificar_cursor_sync(ultimo['versao'], ultimo['id'])
+    return codificar_cursor_sync(*desde) if desde else None
+
+
+def ler_parametros_sync(args):
+    """Lê desde e limite da query string de /api/sync para ContaRepository.buscar_alteracoes."""
+    try:
+        limite = int(args.get('limite', LIMITE_SYNC_PADRAO))
+    except ValueError as e:
+        raise ValueError("limite deve ser um número inteiro.") from e
+    if not 1 <= limite <= LIMITE_SYNC_MAXIMO:
+        raise ValueError(f"limite deve estar entre 1 e {LIMITE_SYNC_MAXIMO}.")
+
+    parametros = {'limite': limite}
+    if args.get('desde'):
+        parametros['desde'] = decodificar_cursor_sync(args['desde'])
+    return parametros
+
+
+def ler_periodo(args):
+    """Lê mes (AAAA-MM) ou data_inicio/data_fim (AAAA-MM-DD, inclusivas) de uma query string.
+
+    Retorna {'data_inicio', 'data_fim'} (só os informados), com data_fim já exclusiva,
+    como esperam os repositórios; levanta ValueError se algo for inválido."""
+    periodo = {}
+
+    mes = args.get('mes')
+    if mes and mes != 'todos':
+        if not re.fullmatch(r'\d{4}-\d{2}', mes):
+            raise ValueError("mes deve estar no formato AAAA-MM.")
+        inicio = pd.Period(mes, 'M')
+        periodo['data_inicio'] = inicio.start_time.date().isoformat()
+        periodo['data_fim'] = (inicio + 1).start_time.date().isoformat()
+
+    # Na query string data_fim é inclusiva; no repositório o limite superior é exclusivo
+    for campo, dias in (('data_inicio', 0), ('data_fim', 1)):
+        valor = args.get(campo)
+        if valor:
+            if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', valor):
+                raise ValueError(f"{campo} deve estar no formato AAAA-MM-DD.")
+            periodo[campo] = (pd.Timestamp(valor) + pd.Timedelta(days=dias)).date().isoformat()
+
+    return periodo
+
+
+def ler_natureza(args, padrao=None):
+    natureza = args.get('natureza', padrao)
+    if natureza and natureza not in NATUREZAS:
+        raise ValueError("natureza deve ser 'credito' ou 'debito'.")
+    return natureza
+
+
+def ler_filtros_favorecidos(args):
+    """Período, natureza (padrão 'debito') e limite (1 a LIMITE_FAVORECIDOS_MAXIMO) do ranking de favorecidos."""
+    try:
+        limite = int(args.get('limite', LIMITE_FAVORECIDOS_PADRAO))
+    except ValueError as e:
+        raise ValueError("limite deve ser um número inteiro.") from e
+    if not 1 <= limite <= LIMITE_FAVORECIDOS_MAXIMO:
+        raise ValueError(f"limite deve estar entre 1 e {LIMITE_FAVORECIDOS_MAXIMO}.")
+    return {**ler_periodo(args), 'natureza': ler_natureza(args, 'debito'), 'limite': limite}
+
+
+def ler_filtros_transacoes(args):
+    """Lê e valida os parâmetros de paginação e filtro de uma query string.
+
+    Retorna os argumentos de ContaRepository.buscar_transacoes_paginadas;
+    levanta ValueError com uma mensagem para o usuário se algo for inválido."""
+    try:
+        limite = int(args.get('limite', LIMITE_PADRAO))
+    except ValueError as e:
+        raise ValueError("limite deve ser um número inteiro.") from e
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        raise ValueError(f"limite deve estar entre 1 e {LIMITE_MAXIMO}.")
+
+    filtros = {'limite': limite}
+
+    if args.get('cursor'):
+        filtros['cursor'] = decodificar_cursor(args['cursor'])
+
+    filtros.update(ler_periodo(args))
+
+    if args.get('categoria'):
+        filtros['categoria'] = args['categoria']
+
+    natureza = ler_natureza(args)
+    if natureza:
+        filtros['natureza'] = natureza
+
+    return filtros
@@ -0,0 +1,76 @@
+import json
+from datetime import date
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Sem orjson: json da biblioteca padrão, mais lento
+    orjson = None
+
+# -------------------------------------------------------------------
+# Serialização JSON
+# Com orjson instalado, datas e floats são serializados em C, direto
+# para bytes. Listagens grandes saem em fluxo: os itens são lidos de
+# um cursor no servidor e enviados em blocos, sem montar a resposta
+# inteira na memória.
+# -------------------------------------------------------------------
+ITENS_POR_BLOCO = 500
+
+
+def _padrao(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    # Decimal, UUID, dataclasses: mesmo tratamento do jsonify
+    return DefaultJSONProvider.default(o)
+
+
+def para_json(obj) -> bytes:
+    """Serializa obj em bytes UTF-8 (datas como AAAA-MM-DD)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_padrao, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_padrao, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """JSON da API: datas saem como AAAA-MM-DD em vez do formato HTTP padrão do Flask."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        # jsonify sempre pede separadores compactos; indent (modo debug) fica com o json padrão
+        if orjson is None or set(kwargs) - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        return para_json(obj).decode("utf-8")
+
+
+def gerar_json_em_fluxo(itens, rodape=None, chave="itens", itens_por_bloco=ITENS_POR_BLOCO):
+    """Gera, em blocos de bytes, o objeto {chave: [itens...], **rodape(ultimo)}.
+
+    rodape é chamado depois do último item, com ele (ou None se não houver itens),
+    e devolve os demais campos do objeto, como o cursor da próxima página."""
+    yield b'{"' + chave.encode("utf-8") + b'":['
+    ultimo = None
+    bloco = []
+    separador = b""
+    for item in itens:
+        bloco.append(para_json(item))
+        ultimo = item
+        if len(bloco) >= itens_por_bloco:
+            yield separador + b",".join(bloco)
+            separador, bloco = b",", []
+    if bloco:
+        yield separador + b",".join(bloco)
+
+    campos = para_json(rodape(ultimo) if rodape else {})
+    yield b"]" + (b"," + campos[1:] if campos != b"{}" else b"}")
+
+
+def resposta_json_em_fluxo(itens, rodape=None, chave="itens"):
+    """Response do Flask enviada em partes (chunked) a partir de gerar_json_em_fluxo."""
+    return Response(gerar_json_em_fluxo(itens, rodape, chave), mimetype="application/json")
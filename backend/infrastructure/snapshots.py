@@ -0,0 +1,200 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import Date, text
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads do processo
+    fcntl = None
+
+# -------------------------------------------------------------------
+# Snapshots colunares das transações
+# Cópia, por usuário, das transações já confirmadas no banco, em arquivos
+# Arrow IPC (um segmento por atualização) lidos por memory-map. Análises
+# carregam colunas tipadas (data já como data, valores como float64) sem
+# passar por linhas do banco. Opcional: requer pyarrow e FINANCER_SNAPSHOT_DIR.
+# -------------------------------------------------------------------
+SNAPSHOT_DIR = os.environ.get("FINANCER_SNAPSHOT_DIR")
+SNAPSHOT_MAX_SEGMENTOS = int(os.environ.get("FINANCER_SNAPSHOT_MAX_SEGMENTOS", "8"))
+LINHAS_POR_LOTE = 50000
+
+COLUNAS = ['id', 'data', 'tipo', 'detalhe', 'credito', 'debito', 'categoria']
+
+
+class SnapshotTransacoes:
+    """Segmentos seg-<primeiro_id>-<ultimo_id>.arrow em <diretorio>/<usuario_id>/.
+
+    As transações só recebem linhas novas (ids crescentes), então atualizar() grava
+    apenas as linhas com id acima do último segmento. Mudanças de categoria não são
+    acompanhadas: quem altera linhas existentes chama descartar().
+    """
+
+    def __init__(self, diretorio, engine, max_segmentos=SNAPSHOT_MAX_SEGMENTOS):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise RuntimeError("FINANCER_SNAPSHOT_DIR exige o pacote pyarrow (pip install pyarrow).") from e
+
+        self._pa = pa
+        self.diretorio = diretorio
+        self.engine = engine
+        self.max_segmentos = max_segmentos
+        self.esquema = pa.schema([
+            ('id', pa.int64()),
+            ('data', pa.date32()),
+            ('tipo', pa.string()),
+            ('detalhe', pa.string()),
+            ('credito', pa.float64()),
+            ('debito', pa.float64()),
+            ('categoria', pa.string()),
+        ])
+        self._locks = {}
+        self._lock_locks = threading.Lock()
+
+    def carregar(self, usuario_id, colunas=None) -> pd.DataFrame:
+        """DataFrame das transações confirmadas do usuário, atualizando o snapshot se estiver atrás."""
+        tabela = self.carregar_tabela(usuario_id, colunas)
+        return tabela.to_pandas(date_as_object=False)
+
+    def carregar_tabela(self, usuario_id, colunas=None):
+        """pyarrow.Table das transações, lida por memory-map (sem cópia das colunas numéricas)."""
+        with self._travar(usuario_id):
+            total_no_banco, ultimo_no_banco = self._resumo_no_banco(usuario_id)
+            if self._ultimo_id(usuario_id) < ultimo_no_banco:
+                self._atualizar(usuario_id)
+            tabela = self._ler_segmentos(usuario_id)
+
+            if tabela.num_rows < total_no_banco:
+                # Uma transação concorrente confirmou ids menores que o último já copiado: refaz do zero
+                self._remover_segmentos(usuario_id)
+                self._atualizar(usuario_id)
+                tabela = self._ler_segmentos(usuario_id)
+        return tabela.select(colunas) if colunas else tabela
+
+    def atualizar(self, usuario_id) -> int:
+        """Grava um segmento com as transações ainda fora do snapshot; retorna quantas linhas entraram."""
+        with self._travar(usuario_id):
+            return self._atualizar(usuario_id)
+
+    def descartar(self, usuario_id) -> None:
+        """Apaga o snapshot do usuário; o próximo carregar() o reconstrói do zero."""
+        with self._travar(usuario_id):
+            self._remover_segmentos(usuario_id)
+
+    # ---------------------------------------------------------------
+    def _atualizar(self, usuario_id):
+        novas = self._gravar_segmento(usuario_id, self._ultimo_id(usuario_id))
+        if len(self._segmentos(usuario_id)) > self.max_segmentos:
+            self._compactar(usuario_id)
+        return novas
+
+    def _remover_segmentos(self, usuario_id):
+        for caminho in self._segmentos(usuario_id):
+            os.remove(caminho)
+
+    def _ler_segmentos(self, usuario_id):
+        tabelas = [
+            self._pa.ipc.open_file(self._pa.memory_map(caminho)).read_all()
+            for caminho in self._segmentos(usuario_id)
+        ]
+        return self._pa.concat_tables(tabelas) if tabelas else self.esquema.empty_table()
+
+    def _gravar_segmento(self, usuario_id, apos_id):
+        sql = text("""
+            SELECT id, data, tipo, detalhe, credito, debito, categoria
+            FROM transacoes
+            WHERE usuario_id = :usuario_id AND id > :apos_id
+            ORDER BY id
+        """).columns(data=Date)
+
+        temporario = os.path.join(self._diretorio_usuario(usuario_id), f".seg-{apos_id}.tmp")
+        primeiro = ultimo = None
+        total = 0
+        # Conexão própria: o snapshot só enxerga o que já foi confirmado
+        with self.engine.connect() as conn, self._pa.OSFile(temporario, 'wb') as destino:
+            resultado = conn.execute(sql, {"usuario_id": usuario_id, "apos_id": apos_id})
+            with self._pa.ipc.new_file(destino, self.esquema) as escritor:
+                while True:
+                    linhas = resultado.fetchmany(LINHAS_POR_LOTE)
+                    if not linhas:
+                        break
+                    lote = pd.DataFrame(linhas, columns=COLUNAS)
+                    escritor.write_table(self._pa.Table.from_pandas(lote, schema=self.esquema, preserve_index=False))
+                    primeiro = primeiro if primeiro is not None else int(lote['id'].iloc[0])
+                    ultimo = int(lote['id'].iloc[-1])
+                    total += len(lote)
+
+        if not total:
+            os.remove(temporario)
+            return 0
+        os.replace(temporario, self._caminho_segmento(usuario_id, primeiro, ultimo))
+        return total
+
+    def _compactar(self, usuario_id):
+        """Junta todos os segmentos em um só, para a leitura não abrir arquivos demais."""
+        segmentos = self._segmentos(usuario_id)
+        tabela = self._ler_segmentos(usuario_id)
+        primeiro, ultimo = _intervalo(segmentos[0])[0], _intervalo(segmentos[-1])[1]
+        temporario = os.path.join(self._diretorio_usuario(usuario_id), ".compactado.tmp")
+        with self._pa.OSFile(temporario, 'wb') as destino, self._pa.ipc.new_file(destino, self.esquema) as escritor:
+            escritor.write_table(tabela)
+        os.replace(temporario, self._caminho_segmento(usuario_id, primeiro, ultimo))
+        for caminho in segmentos:
+            if _intervalo(caminho) != (primeiro, ultimo):
+                os.remove(caminho)
+
+    def _ultimo_id(self, usuario_id):
+        segmentos = self._segmentos(usuario_id)
+        return _intervalo(segmentos[-1])[1] if segmentos else 0
+
+    def _resumo_no_banco(self, usuario_id):
+        """(quantidade, maior id) das transações confirmadas do usuário."""
+        with self.engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT COUNT(*) AS total, COALESCE(MAX(id), 0) AS ultimo
+                FROM transacoes
+                WHERE usuario_id = :usuario_id
+            """), {"usuario_id": usuario_id}).fetchone()
+        return row.total, row.ultimo
+
+    def _segmentos(self, usuario_id):
+        diretorio = self._diretorio_usuario(usuario_id)
+        nomes = [nome for nome in os.listdir(diretorio) if nome.startswith("seg-") and nome.endswith(".arrow")]
+        return sorted((os.path.join(diretorio, nome) for nome in nomes), key=_intervalo)
+
+    def _diretorio_usuario(self, usuario_id):
+        diretorio = os.path.join(self.diretorio, str(int(usuario_id)))
+        os.makedirs(diretorio, exist_ok=True)
+        return diretorio
+
+    def _caminho_segmento(self, usuario_id, primeiro, ultimo):
+        return os.path.join(self._diretorio_usuario(usuario_id), f"seg-{primeiro:012d}-{ultimo:012d}.arrow")
+
+    @contextmanager
+    def _travar(self, usuario_id):
+        """Um escritor por usuário: threads deste processo e, onde há fcntl, outros processos."""
+        with self._lock_locks:
+            lock = self._locks.setdefault(usuario_id, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self._diretorio_usuario(usuario_id), ".lock"), "w") as arquivo:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def _intervalo(caminho):
+    _, primeiro, ultimo = os.path.basename(caminho)[:-len(".arrow")].split("-")
+    return int(primeiro), int(ultimo)
+
+
+def criar_snapshots(engine):
+    """Snapshots em FINANCER_SNAPSHOT_DIR, ou None quando a variável não está definida."""
+    return SnapshotTransacoes(SNAPSHOT_DIR, engine) if SNAPSHOT_DIR else None
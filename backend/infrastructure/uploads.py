@@ -0,0 +1,79 @@
+import os
+import re
+import shutil
+import tempfile
+
+from flask import Request, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# -------------------------------------------------------------------
+# Uploads em disco
+# Cada arquivo enviado vai direto para um temporário no disco (spool),
+# bloco a bloco, em vez de ficar no corpo da requisição em memória; os
+# loaders recebem o caminho desse arquivo. Requisições acima de
+# FINANCER_UPLOAD_MAX_BYTES são recusadas com 413 antes de serem lidas.
+# -------------------------------------------------------------------
+UPLOAD_MAX_BYTES = int(os.environ.get("FINANCER_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_DIRETORIO = os.environ.get("FINANCER_UPLOAD_DIR") or None  # None: diretório temporário do sistema
+
+
+class RequisicaoComSpool(Request):
+    """Request do Flask que grava todo arquivo de formulário num temporário nomeado."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # A extensão ajuda escolher_loader quando o conteúdo não basta para reconhecer o formato
+        sufixo = os.path.splitext(filename or "")[1]
+        if not re.fullmatch(r"\.[A-Za-z0-9]{1,8}", sufixo):
+            sufixo = ""
+        # Apagado quando a requisição termina (Request.close fecha os arquivos)
+        return tempfile.NamedTemporaryFile("w+b", prefix="financer-upload-", suffix=sufixo, dir=UPLOAD_DIRETORIO)
+
+
+def caminho_em_disco(arquivo):
+    """Caminho do arquivo enviado no spool em disco, ou None se ele não está num arquivo nomeado."""
+    stream = getattr(arquivo, "stream", None)
+    nome = getattr(stream, "name", None)
+    if not isinstance(nome, str) or not os.path.isfile(nome):
+        return None
+    stream.flush()
+    return nome
+
+
+def salvar_upload(arquivo, destino) -> str:
+    """Grava o arquivo enviado em destino, que sobrevive ao fim da requisição.
+
+    Se o arquivo já está no spool em disco, cria um link para ele (sem copiar os bytes);
+    em outro sistema de arquivos, ou para streams em memória, copia em blocos."""
+    origem = caminho_em_disco(arquivo)
+    if origem is not None:
+        try:
+            os.link(origem, destino)
+            return destino
+        except OSError:
+            pass
+
+    stream = getattr(arquivo, "stream", arquivo)
+    if origem is not None:
+        stream.seek(0)
+    with open(destino, "wb") as saida:
+        shutil.copyfileobj(stream, saida)
+    return destino
+
+
+def registrar_uploads(app, max_bytes=UPLOAD_MAX_BYTES, ao_exceder=None):
+    """Configura o spool em disco e o limite de tamanho das requisições do app.
+
+    ao_exceder(erro) monta a resposta 413; sem ela, vale a página de erro padrão."""
+    app.request_class = RequisicaoComSpool
+    app.config["MAX_CONTENT_LENGTH"] = max_bytes
+
+    @app.before_request
+    def _recusar_requisicao_grande():
+        # Com Content-Length declarado, a recusa acontece antes de autenticar ou ler o corpo;
+        # sem ele (chunked), o Werkzeug interrompe a leitura ao passar do limite
+        limite = request.max_content_length
+        if limite is not None and request.content_length is not None and request.content_length > limite:
+            raise RequestEntityTooLarge()
+
+    if ao_exceder is not None:
+        app.register_error_handler(RequestEntityTooLarge, ao_exceder)
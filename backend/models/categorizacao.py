@@ -0,0 +1,102 @@
+import re
+import pandas as pd
+
+TIPOS_REGRA = ('palavra', 'regex', 'exato')
+CAMPOS = ('descricao', 'tipo', 'detalhe')
+
+
+def validar_regra(tipo_regra: str, campo: str, padrao: str, categoria: str) -> None:
+    """Levanta ValueError com a mensagem para o usuário se a regra for inválida."""
+    if tipo_regra not in TIPOS_REGRA:
+        raise ValueError(f"tipo_regra deve ser um de: {', '.join(TIPOS_REGRA)}")
+    if campo not in CAMPOS:
+        raise ValueError(f"campo deve ser um de: {', '.join(CAMPOS)}")
+    if not padrao or not padrao.strip():
+        raise ValueError("Informe o padrão da regra.")
+    if not categoria or not categoria.strip():
+        raise ValueError("Informe a categoria da regra.")
+    if tipo_regra == 'regex':
+        try:
+            re.compile(padrao)
+        except re.error as e:
+            raise ValueError(f"Expressão regular inválida: {e}") from e
+
+
+class ClassificadorCategorias:
+    """Aplica as regras de categorização de um usuário a um DataFrame de transações.
+
+    Regras (dicts com tipo_regra, campo, padrao, categoria) chegam já em ordem de
+    prioridade; a primeira que casa define a categoria.
+    - palavra: o campo contém o texto (sem diferenciar maiúsculas);
+    - regex: re.search no campo (sem diferenciar maiúsculas);
+    - exato: o campo é igual ao texto (ignorando espaços nas pontas e maiúsculas).
+    O campo 'descricao' é "tipo detalhe".
+
+    As regras são compiladas uma vez; cada campo tem ainda uma expressão única com
+    os padrões de palavra e exato, que descarta de uma só vez os valores que nenhuma
+    delas casa. Regras regex ficam fora dela: flags globais como (?i), grupos nomeados
+    e referências como \\1 não sobrevivem à junção, então cada uma usa o próprio padrão.
+    Como descrições se repetem muito num extrato, cada par (tipo, detalhe) distinto
+    é avaliado uma única vez e o resultado é distribuído para as linhas.
+    """
+
+    def __init__(self, regras):
+        self._regras = []
+        padroes_por_campo = {campo: [] for campo in CAMPOS}
+        self._campos_com_regex = set()
+
+        for regra in regras:
+            padrao = regra['padrao'].strip()
+            if regra['tipo_regra'] == 'palavra':
+                expressao = re.escape(padrao)
+            elif regra['tipo_regra'] == 'regex':
+                self._regras.append((regra['campo'], re.compile(regra['padrao'], re.IGNORECASE), regra['categoria']))
+                self._campos_com_regex.add(regra['campo'])
+                continue
+            else:
+                expressao = r'\A\s*' + re.escape(padrao) + r'\s*\Z'
+            self._regras.append((regra['campo'], re.compile(expressao, re.IGNORECASE), regra['categoria']))
+            padroes_por_campo[regra['campo']].append(f'(?:{expressao})')
+
+        self._filtros = {
+            campo: re.compile('|'.join(padroes), re.IGNORECASE)
+            for campo, padroes in padroes_por_campo.items() if padroes
+        }
+
+    def __bool__(self):
+        return bool(self._regras)
+
+    def classificar_par(self, tipo: str, detalhe: str) -> str | None:
+        """Categoria da primeira regra que casa com (tipo, detalhe), ou None."""
+        valores = {'tipo': tipo, 'detalhe': detalhe, 'descricao': f'{tipo} {detalhe}'}
+        candidatos = {campo for campo, filtro in self._filtros.items() if filtro.search(valores[campo])}
+        candidatos |= self._campos_com_regex
+        if not candidatos:
+            return None
+        for campo, expressao, categoria in self._regras:
+            if campo in candidatos and expressao.search(valores[campo]):
+                return categoria
+        return None
+
+    def classificar_pares(self, pares) -> dict:
+        """{(tipo, detalhe): categoria} apenas para os pares que alguma regra casa."""
+        resultado = {}
+        for tipo, detalhe in pares:
+            categoria = self.classificar_par(tipo, detalhe)
+            if categoria is not None:
+                resultado[(tipo, detalhe)] = categoria
+        return resultado
+
+    def classificar(self, dados: pd.DataFrame) -> pd.Series:
+        """Série de categorias alinhada a dados (None onde nenhuma regra casa)."""
+        if dados.empty or not self._regras:
+            return pd.Series(None, index=dados.index, dtype=object)
+
+        tipos = dados['tipo'].fillna('').astype(str).str.strip()
+        detalhes = dados['detalhe'].fillna('').astype(str).str.strip()
+        pares = pd.MultiIndex.from_arrays([tipos, detalhes])
+        categorias = self.classificar_pares(pares.unique())
+        if not categorias:
+            return pd.Series(None, index=dados.index, dtype=object)
+        resultado = pd.Series(pd.Series(categorias, dtype=object).reindex(pares).to_numpy(), index=dados.index, dtype=object)
+        return resultado.where(resultado.notna(), None)
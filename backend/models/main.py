@@ -1,7 +1,99 @@
+import hashlib
+from collections import Counter
 import pandas as pd
 import re
 
+
+def para_centavos(valores) -> pd.Series:
+    """Valores em reais (números ou texto numérico) como int64 de centavos, arredondados ao centavo."""
+    return pd.to_numeric(valores).fillna(0).mul(100).round().astype('int64')
+
+
+def em_centavos(dados: pd.DataFrame, coluna: str) -> pd.Series:
+    """credito ou debito em centavos, seja de Conta.dados (coluna_centavos) ou de um DataFrame em reais."""
+    if f'{coluna}_centavos' in dados.columns:
+        return dados[f'{coluna}_centavos']
+    return para_centavos(dados[coluna])
+
+
+def em_reais(dados: pd.DataFrame, coluna: str) -> pd.Series:
+    """credito ou debito em reais (float64), seja de Conta.dados ou de um DataFrame em reais."""
+    if f'{coluna}_centavos' in dados.columns:
+        return dados[f'{coluna}_centavos'] / 100
+    return pd.to_numeric(dados[coluna]).fillna(0).astype(float)
+
+
+def _categorica(valores: pd.Series) -> pd.Series:
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        return valores
+    return valores.fillna('').astype(str).str.strip().astype('category')
+
+
+def gerar_hash_transacoes(dados: pd.DataFrame, usuario_id: int, ocorrencias: Counter = None) -> pd.Series:
+    """Gera o hash da chave natural (usuario_id, data, tipo, detalhe, credito, debito).
+
+    Lançamentos idênticos no mesmo extrato (ex.: dois cafés no mesmo dia) recebem
+    um número de ocorrência na chave, para não serem descartados como duplicados.
+    Ao processar um extrato em blocos, passe o mesmo Counter em ocorrencias para
+    que a numeração continue de um bloco para o outro.
+    """
+    if dados.empty:
+        return pd.Series([], index=dados.index, dtype=object)
+
+    datas = pd.to_datetime(dados['data']).dt.strftime('%Y-%m-%d')
+    tipos = dados['tipo'].fillna('').astype(str).str.strip()
+    detalhes = dados['detalhe'].fillna('').astype(str).str.strip()
+    # Mesmo texto para valores em reais ou centavos: 12.5 e 1250 geram "12.50"
+    creditos = (em_centavos(dados, 'credito') / 100).map('{:.2f}'.format)
+    debitos = (em_centavos(dados, 'debito') / 100).map('{:.2f}'.format)
+
+    chaves = f'{usuario_id}|' + datas + '|' + tipos + '|' + detalhes + '|' + creditos + '|' + debitos
+    ordem = chaves.groupby(chaves, sort=False).cumcount()
+    if ocorrencias is not None:
+        ordem = ordem + chaves.map(ocorrencias).astype(int)
+        ocorrencias.update(chaves.value_counts().to_dict())
+    chaves = chaves + '|' + ordem.astype(str)
+
+    return chaves.map(lambda chave: hashlib.sha256(chave.encode('utf-8')).hexdigest())
+
+
+def unir_extratos(extratos: list, usuario_id: int) -> pd.DataFrame:
+    """Junta vários extratos da mesma conta num só, sem repetir o que aparece em mais de um.
+
+    Exportações de períodos sobrepostos trazem os mesmos lançamentos: cada arquivo é
+    numerado por gerar_hash_transacoes como um extrato próprio, e um lançamento repetido
+    n vezes num arquivo e m vezes em outro fica max(n, m) vezes no resultado."""
+    extratos = [dados for dados in extratos if not dados.empty]
+    if not extratos:
+        return pd.DataFrame(columns=['data', 'tipo', 'detalhe', 'credito', 'debito'])
+
+    unidos = pd.concat(
+        [dados.assign(hash=gerar_hash_transacoes(dados, usuario_id)) for dados in extratos],
+        ignore_index=True
+    )
+    return unidos.drop_duplicates('hash').drop(columns='hash').reset_index(drop=True)
+
+
 class Conta:
+    """Transações de um extrato e seus saldos mensais.
+
+    dados guarda as transações numa representação compacta, montada por alimentar():
+
+    ================  ==============  ============================================
+    coluna            dtype           conteúdo
+    ================  ==============  ============================================
+    data              datetime64      data do lançamento
+    tipo, detalhe     category        texto sem espaços nas pontas ('' se vazio)
+    credito_centavos  int64           valor em centavos (R$ 12,50 -> 1250)
+    debito_centavos   int64           valor em centavos
+    categoria         category        opcional; NaN onde não há categoria
+    hash              object          opcional; ver gerar_hash_transacoes
+    ================  ==============  ============================================
+
+    Somas em centavos são exatas; em_reais() converte na saída. saldos_mensais fica
+    em reais (mes, total_credito, total_debito, saldo), como na tabela saldos_mensais.
+    """
+
     def __init__(self, dados: pd.DataFrame = None, nome: str = None, numero: str = None):
         self.dados = dados if dados is not None else pd.DataFrame()
         self.nome = nome
@@ -16,31 +108,53 @@ class Conta:
         return bool(re.fullmatch(r'\d{7}-\d', numero))
 
     def recalcular_saldo_do_banco(self, todas_transacoes: pd.DataFrame):
-        """Calcula o saldo mensal a partir das transações (DataFrame)."""
+        """Calcula o saldo mensal a partir das transações (Conta.dados ou DataFrame em reais).
+
+        Os totais são somados em centavos; todas_transacoes não é alterado."""
         if todas_transacoes.empty:
             self.saldos_mensais = pd.DataFrame(columns=['mes', 'total_credito', 'total_debito', 'saldo'])
             return
 
-        todas_transacoes['mes'] = pd.to_datetime(todas_transacoes['data']).dt.to_period('M')
-        saldos = todas_transacoes.groupby('mes').agg(
-            total_credito=pd.NamedAgg(column='credito', aggfunc='sum'),
-            total_debito=pd.NamedAgg(column='debito', aggfunc='sum')
-        ).reset_index()
-        saldos['saldo'] = saldos['total_credito'] - saldos['total_debito']
+        meses = pd.to_datetime(todas_transacoes['data']).dt.to_period('M').rename('mes')
+        totais = pd.DataFrame({
+            'total_credito': em_centavos(todas_transacoes, 'credito'),
+            'total_debito': em_centavos(todas_transacoes, 'debito'),
+        }).groupby(meses).sum()
+        totais['saldo'] = totais['total_credito'] - totais['total_debito']
+
+        saldos = (totais / 100).reset_index()
         saldos['mes'] = saldos['mes'].astype(str)
         self.saldos_mensais = saldos
 
     def alimentar(self, dados: pd.DataFrame):
-        """Recebe dados de qualquer fonte (Excel, CSV, DB...)."""
-        self.dados = dados[['data', 'tipo', 'detalhe', 'credito', 'debito']]
+        """Recebe dados de qualquer fonte (Excel, CSV, DB...) e os guarda na representação compacta.
+
+        Aceita valores em reais (credito/debito) ou já em centavos; as colunas hash e
+        categoria, quando presentes, são mantidas. dados não é alterado."""
+        compacto = pd.DataFrame({
+            'data': pd.to_datetime(dados['data']),
+            'tipo': _categorica(dados['tipo']),
+            'detalhe': _categorica(dados['detalhe']),
+            'credito_centavos': em_centavos(dados, 'credito'),
+            'debito_centavos': em_centavos(dados, 'debito'),
+        }, index=dados.index)
+        if 'categoria' in dados.columns:
+            compacto['categoria'] = dados['categoria'].astype('category')
+        if 'hash' in dados.columns:
+            compacto['hash'] = dados['hash']
+        self.dados = compacto
+
+    def categorizar(self, categorias: pd.Series):
+        """Define a coluna categoria a partir de uma série alinhada a dados (None = sem categoria)."""
+        self.dados = self.dados.assign(categoria=categorias.astype('category'))
 
     def exibir_transacoes(self):
         print(f"{'Data':<15} {'Tipo':<30} {'Detalhe':<35} {'Crédito':>12} {'Débito':>12}")
         print("-" * 110)
-        for _, row in self.dados.iterrows():
+        for row in self.dados.itertuples(index=False):
             print(
-                f"{str(row['Data'].date()):<15} {row['Tipo']:<30} {row['Detalhe']:<35} "
-                f"R$ {row['Crédito (R$)']:>8.2f} R$ {row['Débito (R$)']:>8.2f}"
+                f"{str(row.data.date()):<15} {row.tipo:<30} {row.detalhe:<35} "
+                f"R$ {row.credito_centavos / 100:>8.2f} R$ {row.debito_centavos / 100:>8.2f}"
             )
 
     def exibir_saldos(self):
@@ -12,3 +12,14 @@ class Usuario(UserMixin):
 
     def checar_senha(self, senha):
         return check_password_hash(self.senha_hash, senha)
+
+    def claims(self):
+        """Campos do usuário levados no token JWT (assinado), para dispensar a leitura do banco."""
+        return {"nome": self.nome, "numero": self.numero, "tipo": self.tipo}
+
+    @classmethod
+    def de_claims(cls, id, claims):
+        """Monta o usuário a partir dos claims do token; None se o token não os traz (tokens antigos)."""
+        if "nome" not in claims or "numero" not in claims:
+            return None
+        return cls(id, claims["nome"], claims["numero"], None, claims.get("tipo", "pessoal"))
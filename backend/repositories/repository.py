@@ -1,11 +1,133 @@
-from infrastructure.database import get_connection
+from infrastructure.cache import USUARIO_CACHE_MAX_ITENS, USUARIO_CACHE_TTL, MemoriaCache, criar_cache, em_cache
+from infrastructure.database import ao_encerrar_unidade, engine, get_connection, unidade_ativa
+from infrastructure.escrita_em_lote import (
+    TAMANHO_LOTE_PADRAO, em_lotes, inserir_transacoes, ler_versao, reservar_versao, sql_ano, sql_mes, sql_registrar_importacao,
+    upsert_receitas_anuais, upsert_saldos_mensais
+)
+from infrastructure.paginacao import LIMITE_PADRAO, LIMITE_SYNC_PADRAO, codificar_cursor, proximo_cursor_sync
+from infrastructure.snapshots import criar_snapshots
 from werkzeug.security import generate_password_hash
 from models.usuario import Usuario
-from sqlalchemy import text
+from models.main import Conta, em_reais, gerar_hash_transacoes
+from models.categorizacao import ClassificadorCategorias, validar_regra
+from sqlalchemy import Date, bindparam, text
+from datetime import date
+import itertools
 import pandas as pd
+import threading
+
+
+def _preparar_transacoes(dados, usuario_id, versao=0):
+    """Monta, coluna a coluna, o DataFrame no formato da tabela transacoes (valores em reais)."""
+    return pd.DataFrame({
+        'usuario_id': usuario_id,
+        'data': pd.to_datetime(dados['data']).dt.date,
+        'tipo': dados['tipo'].fillna('').astype(str).str.strip(),
+        'detalhe': dados['detalhe'].fillna('').astype(str).str.strip(),
+        'credito': em_reais(dados, 'credito'),
+        'debito': em_reais(dados, 'debito'),
+        'categoria': (
+            dados['categoria'].astype(object).fillna('Sem categoria') if 'categoria' in dados.columns else 'Sem categoria'
+        ),
+        'hash': dados['hash'] if 'hash' in dados.columns else gerar_hash_transacoes(dados, usuario_id),
+        'versao': versao,
+    }, index=dados.index)
+
+
+def _registros_saldos(saldos, usuario_id):
+    registros = saldos[['mes', 'total_credito', 'total_debito', 'saldo']].assign(
+        usuario_id=usuario_id,
+        mes=saldos['mes'].astype(str)
+    )
+    return registros.to_dict('records')
+
+
+def _invalidar_versao(cache, usuario_id):
+    """Troca a versão dos dados do usuário após uma escrita.
+
+    Dentro de uma unidade de trabalho a escrita só fica visível no commit, então
+    invalida de novo ao final: descarta o que foi calculado no meio da transação."""
+    cache.invalidar(usuario_id)
+    ao_encerrar_unidade(lambda: cache.invalidar(usuario_id))
+
+
+CATEGORIA_RECEITA = 'Receita'
+
+
+def _somar_receitas(conn, usuario_id, condicao, params, sinal=1, expandir=()):
+    """Soma (sinal 1) ou subtrai (sinal -1) em receitas_anuais o crédito, por ano, das transações de condicao.
+
+    Não faz commit: roda na transação da escrita que provocou a mudança."""
+    sql = text(f"""
+        SELECT {sql_ano(conn.dialect.name)} AS ano, SUM(credito) AS total
+        FROM transacoes
+        WHERE usuario_id = :usuario_id AND {condicao}
+        GROUP BY 1
+    """).bindparams(*(bindparam(nome, expanding=True) for nome in expandir))
+    rows = conn.execute(sql, {**params, "usuario_id": usuario_id}).fetchall()
+    upsert_receitas_anuais(conn, [
+        {"usuario_id": usuario_id, "ano": int(row.ano), "total": sinal * float(row.total or 0)} for row in rows
+    ])
+
+
+def _ajustar_receitas(conn, usuario_id, categoria, condicao, params, expandir=()):
+    """Leva para receitas_anuais a troca de categoria das transações de condicao; chame antes do UPDATE.
+
+    As que passam a ser 'Receita' somam o crédito ao ano delas; as que deixam de ser, subtraem.
+    A versão de sincronização deve ter sido reservada antes: ela trava as escritas concorrentes
+    do mesmo usuário, e a categoria lida aqui não muda até o commit."""
+    if categoria == CATEGORIA_RECEITA:
+        condicao, sinal = f"({condicao}) AND (categoria IS NULL OR categoria <> :receita)", 1
+    else:
+        condicao, sinal = f"({condicao}) AND categoria = :receita", -1
+    _somar_receitas(conn, usuario_id, condicao, {**params, "receita": CATEGORIA_RECEITA}, sinal, expandir)
+
+
+def _dentro_das_janelas(datas, janelas):
+    """Máscara das datas que caem em algum período (inicio, fim), com janelas disjuntas e ordenadas."""
+    if not janelas:
+        return pd.Series(False, index=datas.index)
+    inicios = pd.to_datetime([inicio for inicio, _ in janelas])
+    fins = pd.to_datetime([fim for _, fim in janelas])
+    dias = pd.to_datetime(datas).dt.normalize()
+    # Última janela que começa até a data; a data está dentro se não passou do fim dela
+    posicao = inicios.searchsorted(dias, side='right') - 1
+    dentro = (posicao >= 0) & (dias.to_numpy() <= fins.to_numpy()[posicao.clip(0)])
+    return pd.Series(dentro, index=datas.index)
+
+
+def _sql_alteracoes(usuario_id, desde=None, limite=None):
+    """SELECT (e parâmetros) das transações alteradas depois de desde = (versao, id)."""
+    condicoes = ["usuario_id = :usuario_id"]
+    params = {"usuario_id": usuario_id}
+    if desde:
+        condicoes.append("(versao > :desde_versao OR (versao = :desde_versao AND id > :desde_id))")
+        params["desde_versao"], params["desde_id"] = desde
+    if limite is not None:
+        params["limite"] = limite
+
+    sql = text(f"""
+        SELECT id, data, tipo, detalhe, credito, debito, categoria, versao
+        FROM transacoes
+        WHERE {' AND '.join(condicoes)}
+        ORDER BY versao, id
+        {'LIMIT :limite' if limite is not None else ''}
+    """).columns(data=Date)
+    return sql, params
 
 
 class UsuarioRepository:
+    def __init__(self, cache=None):
+        """
+        :param cache: Backend (MemoriaCache) dos usuários lidos por id. Fica na memória do
+            processo: o objeto guardado traz o hash da senha e não deve ir para o Redis.
+        """
+        self.cache = cache if cache is not None else MemoriaCache(USUARIO_CACHE_MAX_ITENS, USUARIO_CACHE_TTL)
+        self.acertos = 0
+        self.falhas = 0
+        self.leituras_evitadas_por_token = 0
+        self._lock = threading.Lock()
+
     def criar(self, nome, numero, senha, tipo='pessoal'):
         with get_connection() as conn:
             conn.execute(
@@ -25,80 +147,243 @@ class UsuarioRepository:
         return None
 
     def buscar_por_id(self, id):
+        """Usuário pelo id, servido do cache enquanto não expira; roda em toda requisição autenticada."""
+        usuario = self.cache.obter(f"usuario:{id}")
+        self._contar(acerto=usuario is not None)
+        if usuario is not None:
+            return usuario
+
         with get_connection() as conn:
             row = conn.execute(
                 text("SELECT * FROM usuarios WHERE id = :id"),
                 {"id": id}
             ).fetchone()
         if row:
-            return Usuario(row.id, row.nome, row.numero, row.senha_hash, row.tipo)
+            usuario = Usuario(row.id, row.nome, row.numero, row.senha_hash, row.tipo)
+            self.cache.definir(f"usuario:{id}", usuario)
+            return usuario
         return None
 
+    def invalidar(self, id):
+        """Descarta o usuário do cache; chame após alterar nome, número, senha ou tipo."""
+        self.cache.remover(f"usuario:{id}")
+
+    def registrar_leitura_por_token(self):
+        """Conta uma leitura dispensada porque os dados do usuário vieram do token JWT."""
+        with self._lock:
+            self.leituras_evitadas_por_token += 1
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "leituras_evitadas": self.acertos + self.leituras_evitadas_por_token,
+        }
+
+    def _contar(self, acerto):
+        with self._lock:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
 
 class ContaRepository:
-    def salvar_transacoes(self, conta, usuario_id):
+    def __init__(self, tamanho_lote=TAMANHO_LOTE_PADRAO, cache=None, snapshots=None):
+        """
+        :param tamanho_lote: Linhas por lote nas escritas em massa.
+        :param cache: CacheVersionado das leituras de saldos e total anual (padrão: criar_cache()).
+        :param snapshots: SnapshotTransacoes para leituras analíticas (padrão: criar_snapshots(),
+            que só existe com FINANCER_SNAPSHOT_DIR definida).
+        """
+        self.tamanho_lote = tamanho_lote
+        self.cache = cache if cache is not None else criar_cache()
+        self.snapshots = snapshots if snapshots is not None else criar_snapshots(engine)
+
+    def _invalidar_cache(self, usuario_id):
+        _invalidar_versao(self.cache, usuario_id)
+
+    def versao_dados(self, usuario_id):
+        """Versão dos dados do usuário no banco, usada nos ETags.
+
+        Toda escrita reserva uma versão nova (reservar_versao) na mesma transação, então
+        o valor é o mesmo em todos os processos, ao contrário de CacheVersionado.versao."""
         with get_connection() as conn:
-            for _, row in conta.dados.iterrows():
-                data = row['Data'].date().isoformat()
-                tipo = row['Tipo'].strip()
-                detalhe = row['Detalhe'].strip()
-                credito = float(row['Crédito (R$)'])
-                debito = float(row['Débito (R$)'])
+            return ler_versao(conn, usuario_id)
 
-                # INSERT ... ON CONFLICT DO NOTHING substitui o INSERT OR IGNORE do SQLite
-                conn.execute(text("""
-                    INSERT INTO transacoes (usuario_id, data, tipo, detalhe, credito, debito, categoria)
-                    VALUES (:usuario_id, :data, :tipo, :detalhe, :credito, :debito, 'Sem categoria')
-                    ON CONFLICT DO NOTHING
-                """), {
-                    "usuario_id": usuario_id,
-                    "data": data,
-                    "tipo": tipo,
-                    "detalhe": detalhe,
-                    "credito": credito,
-                    "debito": debito
-                })
+    def _descartar_snapshot(self, usuario_id):
+        """Linhas existentes mudaram (categoria): o snapshot do usuário é refeito na próxima leitura."""
+        if self.snapshots is not None:
+            self.snapshots.descartar(usuario_id)
+            ao_encerrar_unidade(lambda: self.snapshots.descartar(usuario_id))
+
+    def atualizar_snapshot(self, usuario_id):
+        """Acrescenta ao snapshot as transações novas, depois que a escrita for confirmada."""
+        if self.snapshots is not None:
+            ao_encerrar_unidade(lambda: self.snapshots.atualizar(usuario_id), imediato=True)
+
+    def buscar_transacoes_colunar(self, usuario_id, colunas=None):
+        """Transações do usuário como DataFrame tipado (data em datetime64, valores em float64).
+
+        Usa o snapshot colunar quando configurado; senão, lê do banco."""
+        if self.snapshots is not None and not unidade_ativa():
+            return self.snapshots.carregar(usuario_id, colunas)
+
+        with get_connection() as conn:
+            rows = conn.execute(text("""
+                SELECT id, data, tipo, detalhe, credito, debito, categoria
+                FROM transacoes
+                WHERE usuario_id = :usuario_id
+                ORDER BY id
+            """).columns(data=Date), {"usuario_id": usuario_id}).fetchall()
+        dados = pd.DataFrame(rows, columns=['id', 'data', 'tipo', 'detalhe', 'credito', 'debito', 'categoria'])
+        dados['data'] = pd.to_datetime(dados['data'])
+        return dados[colunas] if colunas else dados
+
+    def salvar_transacoes(self, conta, usuario_id):
+        """Insere as transações da conta ignorando as que já existem (mesmo hash).
+
+        Todas as linhas vão em lotes de tamanho_lote, numa única transação.
+        Todas recebem a mesma versão de sincronização, reservada na mesma transação.
+        Retorna a quantidade de linhas efetivamente inseridas."""
+        if conta.dados.empty:
+            return 0
+
+        with get_connection() as conn:
+            versao = reservar_versao(conn, usuario_id)
+            dados = _preparar_transacoes(conta.dados, usuario_id, versao)
+            inseridas = inserir_transacoes(conn, dados, self.tamanho_lote)
+            # As linhas inseridas agora são exatamente as da versão reservada
+            if inseridas and (dados['categoria'] == CATEGORIA_RECEITA).any():
+                _somar_receitas(conn, usuario_id, "versao = :versao AND categoria = :receita",
+                                {"versao": versao, "receita": CATEGORIA_RECEITA})
             conn.commit()
+        self._invalidar_cache(usuario_id)
+        return inseridas
 
-    def salvar_saldos_mensais(self, conta, usuario_id):
+    def filtrar_transacoes_novas(self, conta, usuario_id, ocorrencias=None, janelas=None):
+        """Retorna as linhas da conta que ainda não estão no banco, já com a coluna hash.
+
+        A consulta usa apenas os hashes do próprio extrato (índice único),
+        então o custo acompanha o tamanho do arquivo, não o do histórico.
+        ocorrencias é repassado a gerar_hash_transacoes ao processar em blocos.
+        Com janelas (períodos já importados, de ImportacaoRepository.janelas), só as
+        linhas com data dentro delas são consultadas; as demais são novas."""
+        dados = conta.dados.assign(hash=gerar_hash_transacoes(conta.dados, usuario_id, ocorrencias))
+        consultar = dados['hash'] if janelas is None else dados.loc[_dentro_das_janelas(dados['data'], janelas), 'hash']
+
+        sql = text("SELECT hash FROM transacoes WHERE hash IN :hashes").bindparams(
+            bindparam('hashes', expanding=True)
+        )
+        existentes = set()
         with get_connection() as conn:
-            rows = conn.execute(
-                text("SELECT data, credito, debito FROM transacoes WHERE usuario_id = :usuario_id"),
-                {"usuario_id": usuario_id}
-            ).fetchall()
+            for lote in em_lotes(consultar.tolist(), self.tamanho_lote):
+                existentes.update(row.hash for row in conn.execute(sql, {"hashes": lote}))
 
-            if not rows:
-                return
+        return dados[~dados['hash'].isin(existentes)]
 
-            df = pd.DataFrame(rows, columns=['data', 'credito', 'debito'])
-            df['data'] = pd.to_datetime(df['data'])
-            df['mes'] = df['data'].dt.to_period('M')
+    def salvar_saldos_mensais(self, conta, usuario_id, incremental=True):
+        """Atualiza saldos_mensais a partir de conta.saldos_mensais.
 
-            saldos = df.groupby('mes').agg(
-                total_credito=('credito', 'sum'),
-                total_debito=('debito', 'sum')
-            ).reset_index()
-            saldos['saldo'] = saldos['total_credito'] - saldos['total_debito']
+        No modo incremental, conta.saldos_mensais traz só os totais das transações
+        recém-inseridas, que são somados aos meses já gravados (upsert); os demais
+        meses não são tocados. Com incremental=False, todos os saldos do usuário
+        são reconstruídos a partir de transacoes."""
+        if not incremental:
+            self.reconstruir_saldos_mensais(usuario_id)
+            return
 
-            conn.execute(
-                text("DELETE FROM saldos_mensais WHERE usuario_id = :usuario_id"),
-                {"usuario_id": usuario_id}
-            )
+        if conta.saldos_mensais.empty:
+            return
+
+        with get_connection() as conn:
+            upsert_saldos_mensais(conn, _registros_saldos(conta.saldos_mensais, usuario_id),
+                                  acumular=True, tamanho_lote=self.tamanho_lote)
+            reservar_versao(conn, usuario_id)
+            conn.commit()
+        self._invalidar_cache(usuario_id)
+
+    def reconstruir_saldos_mensais(self, usuario_id, meses=None):
+        """Recalcula saldos_mensais do zero a partir de transacoes.
 
-            for _, row in saldos.iterrows():
+        Com meses (lista de 'YYYY-MM'), só esses meses são recalculados.
+        Retorna o DataFrame de saldos gravado."""
+        saldos = self._calcular_saldos_mensais(usuario_id, meses)
+
+        with get_connection() as conn:
+            if meses:
                 conn.execute(text("""
-                    INSERT INTO saldos_mensais (usuario_id, mes, total_credito, total_debito, saldo)
-                    VALUES (:usuario_id, :mes, :total_credito, :total_debito, :saldo)
-                """), {
-                    "usuario_id": usuario_id,
-                    "mes": str(row['mes']),
-                    "total_credito": row['total_credito'],
-                    "total_debito": row['total_debito'],
-                    "saldo": row['saldo']
-                })
+                    DELETE FROM saldos_mensais
+                    WHERE usuario_id = :usuario_id AND mes IN :meses
+                """).bindparams(bindparam('meses', expanding=True)),
+                    {"usuario_id": usuario_id, "meses": list(meses)})
+            else:
+                conn.execute(
+                    text("DELETE FROM saldos_mensais WHERE usuario_id = :usuario_id"),
+                    {"usuario_id": usuario_id}
+                )
+
+            upsert_saldos_mensais(conn, _registros_saldos(saldos, usuario_id),
+                                  acumular=False, tamanho_lote=self.tamanho_lote)
+            reservar_versao(conn, usuario_id)
             conn.commit()
+        self._invalidar_cache(usuario_id)
+        return saldos
+
+    def verificar_saldos_mensais(self, usuario_id):
+        """Compara saldos_mensais com o recálculo a partir de transacoes.
+
+        Retorna a lista de meses divergentes (vazia quando está consistente)."""
+        esperado = self._calcular_saldos_mensais(usuario_id).set_index('mes')
+        gravado = pd.DataFrame(
+            self._ler_saldos_mensais(usuario_id),
+            columns=['mes', 'total_credito', 'total_debito', 'saldo']
+        ).set_index('mes')
+
+        colunas = ['total_credito', 'total_debito', 'saldo']
+        comparacao = esperado[colunas].join(gravado[colunas], how='outer', lsuffix='_esperado').fillna(0)
+        divergente = pd.Series(False, index=comparacao.index)
+        for coluna in colunas:
+            divergente |= (comparacao[f'{coluna}_esperado'] - comparacao[coluna]).abs() > 0.005
+        return sorted(comparacao.index[divergente])
+
+    def _calcular_saldos_mensais(self, usuario_id, meses=None):
+        if self.snapshots is not None and not unidade_ativa():
+            # Recálculo completo fora de uma importação: colunas tipadas do snapshot
+            dados = self.snapshots.carregar(usuario_id, ['data', 'credito', 'debito'])
+            if meses:
+                dados = dados[dados['data'].dt.strftime('%Y-%m').isin(meses)]
+            conta = Conta()
+            conta.recalcular_saldo_do_banco(dados)
+            return conta.saldos_mensais.reset_index(drop=True)
+
+        sql = text("SELECT data, credito, debito FROM transacoes WHERE usuario_id = :usuario_id")
+        params = {"usuario_id": usuario_id}
+        if meses:
+            sql = text("""
+                SELECT data, credito, debito FROM transacoes
+                WHERE usuario_id = :usuario_id AND data >= :inicio AND data < :fim
+            """).bindparams(bindparam('inicio', type_=Date), bindparam('fim', type_=Date))
+            params["inicio"] = pd.Period(min(meses), 'M').start_time.date()
+            params["fim"] = (pd.Period(max(meses), 'M') + 1).start_time.date()
+
+        with get_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
 
+        conta = Conta()
+        conta.recalcular_saldo_do_banco(pd.DataFrame(rows, columns=['data', 'credito', 'debito']))
+        saldos = conta.saldos_mensais
+        if meses:
+            saldos = saldos[saldos['mes'].isin(meses)]
+        return saldos.reset_index(drop=True)
+
+    @em_cache('saldos_mensais')
     def buscar_saldos_mensais(self, usuario_id):
+        return self._ler_saldos_mensais(usuario_id)
+
+    def _ler_saldos_mensais(self, usuario_id):
         with get_connection() as conn:
             rows = conn.execute(text("""
                 SELECT mes, total_credito, total_debito, saldo
@@ -112,16 +397,32 @@ class ContaRepository:
             for r in rows
         ]
 
-    def buscar_total_anual(self, usuario_id):
+    def buscar_total_anual(self, usuario_id, ano=None):
+        """Soma dos créditos categorizados como 'Receita' no ano (padrão: ano atual).
+
+        Lê uma linha de receitas_anuais, mantida a cada importação e categorização."""
+        return self._buscar_total_anual(usuario_id, ano or date.today().year)
+
+    @em_cache('total_anual')
+    def _buscar_total_anual(self, usuario_id, ano):
         with get_connection() as conn:
-            row = conn.execute(text("""
-                SELECT COALESCE(SUM(credito), 0) AS total
-                FROM transacoes
-                WHERE usuario_id = :usuario_id
-                  AND EXTRACT(YEAR FROM data::date) = EXTRACT(YEAR FROM CURRENT_DATE)
-                  AND categoria = 'Receita'
-            """), {"usuario_id": usuario_id}).fetchone()
-        return row.total
+            total = conn.execute(text("""
+                SELECT total FROM receitas_anuais WHERE usuario_id = :usuario_id AND ano = :ano
+            """), {"usuario_id": usuario_id, "ano": ano}).scalar()
+        return total or 0.0
+
+    def reconstruir_receitas_anuais(self, usuario_id):
+        """Recalcula receitas_anuais do usuário a partir de transacoes. Retorna {ano: total}."""
+        with get_connection() as conn:
+            conn.execute(text("DELETE FROM receitas_anuais WHERE usuario_id = :usuario_id"), {"usuario_id": usuario_id})
+            _somar_receitas(conn, usuario_id, "categoria = :receita", {"receita": CATEGORIA_RECEITA})
+            rows = conn.execute(text("""
+                SELECT ano, total FROM receitas_anuais WHERE usuario_id = :usuario_id ORDER BY ano
+            """), {"usuario_id": usuario_id}).fetchall()
+            reservar_versao(conn, usuario_id)
+            conn.commit()
+        self._invalidar_cache(usuario_id)
+        return {row.ano: row.total for row in rows}
 
     def buscar_transacoes(self, usuario_id):
         with get_connection() as conn:
@@ -130,9 +431,82 @@ class ContaRepository:
                 FROM transacoes
                 WHERE usuario_id = :usuario_id
                 ORDER BY data DESC
-            """), {"usuario_id": usuario_id}).fetchall()
+            """).columns(data=Date), {"usuario_id": usuario_id}).fetchall()
         return [row._mapping for row in rows]
 
+    def buscar_transacoes_paginadas(self, usuario_id, limite=LIMITE_PADRAO, cursor=None, data_inicio=None,
+                                    data_fim=None, categoria=None, natureza=None):
+        """Retorna uma página de transações, da mais recente para a mais antiga.
+
+        cursor é a chave (data, id) da última linha da página anterior; data_inicio é
+        inclusiva e data_fim exclusiva (AAAA-MM-DD); natureza é 'credito' ou 'debito'.
+        Resultado: {"itens": [...], "proximo_cursor": str | None}."""
+        condicoes = ["usuario_id = :usuario_id"]
+        params = {"usuario_id": usuario_id, "limite": limite + 1}
+
+        if cursor:
+            condicoes.append("(data < :cursor_data OR (data = :cursor_data AND id < :cursor_id))")
+            params["cursor_data"], params["cursor_id"] = cursor
+        if data_inicio:
+            condicoes.append("data >= :data_inicio")
+            params["data_inicio"] = data_inicio
+        if data_fim:
+            condicoes.append("data < :data_fim")
+            params["data_fim"] = data_fim
+        if categoria:
+            condicoes.append("categoria = :categoria")
+            params["categoria"] = categoria
+        if natureza == 'credito':
+            condicoes.append("credito > 0")
+        elif natureza == 'debito':
+            condicoes.append("debito > 0")
+
+        with get_connection() as conn:
+            rows = conn.execute(text(f"""
+                SELECT id, data, tipo, detalhe, credito, debito, categoria
+                FROM transacoes
+                WHERE {' AND '.join(condicoes)}
+                ORDER BY data DESC, id DESC
+                LIMIT :limite
+            """).columns(data=Date), params).fetchall()
+
+        itens = [dict(row._mapping) for row in rows[:limite]]
+        proximo_cursor = None
+        if len(rows) > limite:
+            ultimo = itens[-1]
+            proximo_cursor = codificar_cursor(ultimo['data'], ultimo['id'])
+        return {"itens": itens, "proximo_cursor": proximo_cursor}
+
+    def buscar_alteracoes(self, usuario_id, desde=None, limite=LIMITE_SYNC_PADRAO):
+        """Transações inseridas ou alteradas depois do cursor, em ordem de (versao, id).
+
+        desde é a chave (versao, id) da última linha já recebida; sem ele, vem o
+        histórico inteiro. Uma linha alterada de novo reaparece com a versão nova,
+        então o cliente substitui pelo id o que já tem.
+        Resultado: {"itens": [...], "cursor": str | None, "tem_mais": bool}; com
+        tem_mais, repita a chamada com o cursor recebido."""
+        with get_connection() as conn:
+            rows = conn.execute(*_sql_alteracoes(usuario_id, desde, limite + 1)).fetchall()
+
+        itens = [dict(row._mapping) for row in rows[:limite]]
+        return {
+            "itens": itens,
+            "cursor": proximo_cursor_sync(itens[-1] if itens else None, desde),
+            "tem_mais": len(rows) > limite,
+        }
+
+    def iterar_alteracoes(self, usuario_id, desde=None, limite=None):
+        """Gera as linhas de buscar_alteracoes uma a uma, lidas por um cursor no servidor.
+
+        Usa uma conexão própria, fora da unidade de trabalho: o gerador é consumido
+        enquanto a resposta é enviada, depois que a requisição já terminou."""
+        with engine.connect() as conn:
+            resultado = conn.execution_options(stream_results=True, yield_per=self.tamanho_lote).execute(
+                *_sql_alteracoes(usuario_id, desde, limite)
+            )
+            for row in resultado:
+                yield dict(row._mapping)
+
     def buscar_transacao_por_id(self, transacao_id, usuario_id):
         with get_connection() as conn:
             row = conn.execute(text("""
@@ -144,26 +518,362 @@ class ContaRepository:
 
     def atualizar_categoria(self, transacao_id, categoria, usuario_id):
         with get_connection() as conn:
+            versao = reservar_versao(conn, usuario_id)
+            _ajustar_receitas(conn, usuario_id, categoria, "id = :id", {"id": transacao_id})
             conn.execute(text("""
-                UPDATE transacoes SET categoria = :categoria
+                UPDATE transacoes SET categoria = :categoria, versao = :versao
                 WHERE id = :id AND usuario_id = :usuario_id
-            """), {"categoria": categoria, "id": transacao_id, "usuario_id": usuario_id})
+            """), {"categoria": categoria, "id": transacao_id, "usuario_id": usuario_id, "versao": versao})
             conn.commit()
+        self._invalidar_cache(usuario_id)
+        self._descartar_snapshot(usuario_id)
 
     def atualizar_categoria_em_lote(self, tipo, detalhe, categoria, usuario_id):
         with get_connection() as conn:
+            versao = reservar_versao(conn, usuario_id)
+            _ajustar_receitas(conn, usuario_id, categoria, "tipo = :tipo AND detalhe = :detalhe",
+                              {"tipo": tipo, "detalhe": detalhe})
             result = conn.execute(text("""
                 UPDATE transacoes
-                SET categoria = :categoria
+                SET categoria = :categoria, versao = :versao
                 WHERE usuario_id = :usuario_id
                   AND tipo = :tipo
                   AND detalhe = :detalhe
-            """), {"categoria": categoria, "usuario_id": usuario_id, "tipo": tipo, "detalhe": detalhe})
+            """), {"categoria": categoria, "usuario_id": usuario_id, "tipo": tipo, "detalhe": detalhe,
+                   "versao": versao})
             conn.commit()
+        self._invalidar_cache(usuario_id)
+        self._descartar_snapshot(usuario_id)
         return result.rowcount
 
+    def categorizar_em_lote(self, itens, usuario_id):
+        """Aplica várias categorizações numa única transação, com poucas instruções.
+
+        Cada item é {"transacao_id", "categoria"} ou {"tipo", "detalhe", "categoria"}.
+        Os itens valem na ordem enviada; cada sequência de itens do mesmo tipo é agrupada
+        por categoria: um UPDATE ... id IN (...) ou UPDATE ... (tipo, detalhe) IN (...) por
+        categoria, em lotes de tamanho_lote.
+        Retorna, na ordem dos itens, {"status": "ok" | "nao_encontrada" | "invalido",
+        "atualizadas": n} (com "erro" nos inválidos)."""
+        resultados = [None] * len(itens)
+        por_id, por_par = {}, {}
+
+        for indice, item in enumerate(itens):
+            categoria = item.get("categoria") if isinstance(item, dict) else None
+            if not isinstance(categoria, str) or not categoria.strip():
+                resultados[indice] = {"status": "invalido", "atualizadas": 0, "erro": "Informe a categoria."}
+            elif item.get("transacao_id") is not None:
+                try:
+                    por_id[indice] = (int(item["transacao_id"]), categoria)
+                except (TypeError, ValueError):
+                    resultados[indice] = {"status": "invalido", "atualizadas": 0, "erro": "transacao_id inválido."}
+            elif item.get("tipo") is not None and item.get("detalhe") is not None:
+                por_par[indice] = ((str(item["tipo"]), str(item["detalhe"])), categoria)
+            else:
+                resultados[indice] = {
+                    "status": "invalido", "atualizadas": 0,
+                    "erro": "Informe transacao_id ou tipo e detalhe."
+                }
+
+        sql_existentes = text("""
+            SELECT id FROM transacoes WHERE usuario_id = :usuario_id AND id IN :ids
+        """).bindparams(bindparam('ids', expanding=True))
+        sql_contagem = text("""
+            SELECT tipo, detalhe, COUNT(*) AS total FROM transacoes
+            WHERE usuario_id = :usuario_id AND (tipo, detalhe) IN :pares
+            GROUP BY tipo, detalhe
+        """).bindparams(bindparam('pares', expanding=True))
+        sql_ids = text("""
+            UPDATE transacoes SET categoria = :categoria, versao = :versao
+            WHERE usuario_id = :usuario_id AND id IN :ids
+        """).bindparams(bindparam('ids', expanding=True))
+        sql_pares = text("""
+            UPDATE transacoes SET categoria = :categoria, versao = :versao
+            WHERE usuario_id = :usuario_id AND (tipo, detalhe) IN :pares
+        """).bindparams(bindparam('pares', expanding=True))
+
+        with get_connection() as conn:
+            # Quantas linhas cada item alcança: uma consulta para os ids, outra para os pares
+            existentes = set()
+            for lote in em_lotes(sorted({transacao_id for transacao_id, _ in por_id.values()}), self.tamanho_lote):
+                existentes.update(row.id for row in conn.execute(sql_existentes, {"usuario_id": usuario_id, "ids": lote}))
+
+            contagem_pares = {}
+            for lote in em_lotes(sorted({par for par, _ in por_par.values()}), self.tamanho_lote):
+                rows = conn.execute(sql_contagem, {"usuario_id": usuario_id, "pares": lote})
+                contagem_pares.update(((row.tipo, row.detalhe), row.total) for row in rows)
+
+            versao = reservar_versao(conn, usuario_id) if existentes or contagem_pares else None
+
+            # Na ordem dos itens, como se tivessem sido enviados um a um: um item por id e outro por
+            # par podem alcançar a mesma linha, então cada sequência de itens do mesmo tipo é gravada
+            # antes da seguinte; dentro de uma sequência, um alvo repetido vale pelo último item
+            sequencias = itertools.groupby(sorted([*por_id, *por_par]), key=lambda indice: indice in por_id)
+            for sequencia_por_id, indices in sequencias:
+                if sequencia_por_id:
+                    sql, chave, condicao = sql_ids, "ids", "id IN :ids"
+                    alvos = {por_id[i][0]: por_id[i][1] for i in indices if por_id[i][0] in existentes}
+                else:
+                    sql, chave, condicao = sql_pares, "pares", "(tipo, detalhe) IN :pares"
+                    alvos = {por_par[i][0]: por_par[i][1] for i in indices if por_par[i][0] in contagem_pares}
+                agrupados = {}
+                for alvo, categoria in alvos.items():
+                    agrupados.setdefault(categoria, []).append(alvo)
+                for categoria, lista in agrupados.items():
+                    for lote in em_lotes(lista, self.tamanho_lote):
+                        _ajustar_receitas(conn, usuario_id, categoria, condicao, {chave: lote}, expandir=(chave,))
+                        conn.execute(sql, {"categoria": categoria, "usuario_id": usuario_id, "versao": versao,
+                                           chave: lote})
+            conn.commit()
+
+        for indice, (transacao_id, _) in por_id.items():
+            encontrada = transacao_id in existentes
+            resultados[indice] = {"status": "ok" if encontrada else "nao_encontrada", "atualizadas": int(encontrada)}
+        for indice, (par, _) in por_par.items():
+            total = contagem_pares.get(par, 0)
+            resultados[indice] = {"status": "ok" if total else "nao_encontrada", "atualizadas": total}
+
+        if por_id or por_par:
+            self._invalidar_cache(usuario_id)
+            self._descartar_snapshot(usuario_id)
+        return resultados
+
+    def reaplicar_regras(self, classificador, usuario_id):
+        """Recategoriza todo o histórico do usuário com as regras.
+
+        As regras são avaliadas uma vez por par (tipo, detalhe) distinto e cada categoria
+        resultante vira um único UPDATE com (tipo, detalhe) IN (...), em lotes de
+        tamanho_lote pares. Transações que nenhuma regra casa não são alteradas.
+        Retorna a quantidade de transações que mudaram de categoria."""
+        if not classificador:
+            return 0
+
+        sql = text("""
+            UPDATE transacoes
+            SET categoria = :categoria, versao = :versao
+            WHERE usuario_id = :usuario_id
+              AND (categoria IS NULL OR categoria <> :categoria)
+              AND (tipo, detalhe) IN :pares
+        """).bindparams(bindparam('pares', expanding=True))
+
+        with get_connection() as conn:
+            pares = conn.execute(text("""
+                SELECT DISTINCT tipo, detalhe FROM transacoes
+                WHERE usuario_id = :usuario_id AND tipo IS NOT NULL AND detalhe IS NOT NULL
+            """), {"usuario_id": usuario_id}).fetchall()
+
+            por_categoria = {}
+            for par, categoria in classificador.classificar_pares((row.tipo, row.detalhe) for row in pares).items():
+                por_categoria.setdefault(categoria, []).append(par)
+
+            versao = reservar_versao(conn, usuario_id) if por_categoria else None
+            atualizadas = 0
+            for categoria, pares_categoria in por_categoria.items():
+                for lote in em_lotes(pares_categoria, self.tamanho_lote):
+                    _ajustar_receitas(conn, usuario_id, categoria, "(tipo, detalhe) IN :pares", {"pares": lote},
+                                      expandir=("pares",))
+                    atualizadas += conn.execute(
+                        sql, {"categoria": categoria, "usuario_id": usuario_id, "versao": versao, "pares": lote}
+                    ).rowcount
+            conn.commit()
+
+        self._invalidar_cache(usuario_id)
+        self._descartar_snapshot(usuario_id)
+        return atualizadas
+
+
+def _condicoes_periodo(data_inicio=None, data_fim=None):
+    """Filtro por usuário e intervalo de datas (data_fim exclusiva), atendido pelo índice (usuario_id, data)."""
+    condicoes, params = ["usuario_id = :usuario_id"], {}
+    if data_inicio:
+        condicoes.append("data >= :data_inicio")
+        params["data_inicio"] = data_inicio
+    if data_fim:
+        condicoes.append("data < :data_fim")
+        params["data_fim"] = data_fim
+    return " AND ".join(condicoes), params
+
+
+def _variacao(atual, anterior):
+    """Variação percentual entre dois totais, ou None sem base de comparação."""
+    return round((atual - anterior) / anterior * 100, 2) if anterior else None
+
+
+class RelatorioRepository:
+    def __init__(self, cache=None):
+        """
+        :param cache: CacheVersionado dos relatórios (padrão: criar_cache()); compartilhe o do
+            ContaRepository para que importações e categorizações os invalidem.
+        """
+        self.cache = cache if cache is not None else criar_cache()
+
+    @em_cache('relatorio_categorias')
+    def categorias_por_mes(self, usuario_id, data_inicio=None, data_fim=None):
+        """Créditos, débitos e quantidade de transações por mês e categoria, do mês mais antigo ao mais recente."""
+        condicoes, params = _condicoes_periodo(data_inicio, data_fim)
+        with get_connection() as conn:
+            mes = sql_mes(conn.dialect.name)
+            rows = conn.execute(text(f"""
+                SELECT {mes} AS mes, COALESCE(categoria, 'Sem categoria') AS categoria,
+                       SUM(credito) AS total_credito, SUM(debito) AS total_debito, COUNT(*) AS quantidade
+                FROM transacoes
+                WHERE {condicoes}
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+            """), {**params, "usuario_id": usuario_id}).fetchall()
+        return [
+            {"mes": row.mes, "categoria": row.categoria, "total_credito": round(row.total_credito or 0, 2),
+             "total_debito": round(row.total_debito or 0, 2), "quantidade": row.quantidade}
+            for row in rows
+        ]
+
+    @em_cache('relatorio_favorecidos')
+    def maiores_favorecidos(self, usuario_id, data_inicio=None, data_fim=None, natureza='debito', limite=10):
+        """Os pares (tipo, detalhe) com maior soma de débitos (ou de créditos, com natureza='credito')."""
+        coluna = 'credito' if natureza == 'credito' else 'debito'
+        condicoes, params = _condicoes_periodo(data_inicio, data_fim)
+        with get_connection() as conn:
+            rows = conn.execute(text(f"""
+                SELECT tipo, detalhe, SUM({coluna}) AS total, COUNT(*) AS quantidade
+                FROM transacoes
+                WHERE {condicoes} AND {coluna} > 0
+                GROUP BY tipo, detalhe
+                ORDER BY total DESC, tipo, detalhe
+                LIMIT :limite
+            """), {**params, "usuario_id": usuario_id, "limite": limite}).fetchall()
+        return [
+            {"tipo": row.tipo, "detalhe": row.detalhe, "total": round(row.total, 2), "quantidade": row.quantidade}
+            for row in rows
+        ]
+
+    @em_cache('relatorio_anual')
+    def comparativo_anual(self, usuario_id, data_inicio=None, data_fim=None):
+        """Totais por ano, somados de saldos_mensais, com a variação percentual sobre o ano anterior.
+
+        O período é aplicado por mês: os meses que tocam [data_inicio, data_fim) entram inteiros."""
+        condicoes, params = ["usuario_id = :usuario_id"], {"usuario_id": usuario_id}
+        if data_inicio:
+            condicoes.append("mes >= :mes_inicio")
+            params["mes_inicio"] = data_inicio[:7]
+        if data_fim:
+            condicoes.append("mes <= :mes_fim")
+            params["mes_fim"] = (pd.Timestamp(data_fim) - pd.Timedelta(days=1)).strftime('%Y-%m')
+
+        with get_connection() as conn:
+            rows = conn.execute(text(f"""
+                SELECT SUBSTR(mes, 1, 4) AS ano, SUM(total_credito) AS total_credito,
+                       SUM(total_debito) AS total_debito, SUM(saldo) AS saldo
+                FROM saldos_mensais
+                WHERE {' AND '.join(condicoes)}
+                GROUP BY 1
+                ORDER BY 1
+            """), params).fetchall()
+
+        resultado, anterior = [], None
+        for row in rows:
+            ano = {"ano": int(row.ano), "total_credito": round(row.total_credito, 2),
+                   "total_debito": round(row.total_debito, 2), "saldo": round(row.saldo, 2)}
+            if anterior and anterior["ano"] == ano["ano"] - 1:
+                ano["variacao_credito"] = _variacao(ano["total_credito"], anterior["total_credito"])
+                ano["variacao_debito"] = _variacao(ano["total_debito"], anterior["total_debito"])
+            else:
+                ano["variacao_credito"] = ano["variacao_debito"] = None
+            resultado.append(ano)
+            anterior = ano
+        return resultado
+
+
+class RegraCategorizacaoRepository:
+    def listar(self, usuario_id):
+        """Regras do usuário em ordem de aplicação (maior prioridade primeiro, depois a mais antiga)."""
+        with get_connection() as conn:
+            rows = conn.execute(text("""
+                SELECT id, tipo_regra, campo, padrao, categoria, prioridade
+                FROM regras_categorizacao
+                WHERE usuario_id = :usuario_id
+                ORDER BY prioridade DESC, id
+            """), {"usuario_id": usuario_id}).fetchall()
+        return [dict(row._mapping) for row in rows]
+
+    def criar(self, usuario_id, tipo_regra, padrao, categoria, campo='descricao', prioridade=0):
+        """Grava a regra (levanta ValueError se for inválida) e retorna o id."""
+        validar_regra(tipo_regra, campo, padrao, categoria)
+        with get_connection() as conn:
+            result = conn.execute(text("""
+                INSERT INTO regras_categorizacao (usuario_id, tipo_regra, campo, padrao, categoria, prioridade)
+                VALUES (:usuario_id, :tipo_regra, :campo, :padrao, :categoria, :prioridade)
+            """), {"usuario_id": usuario_id, "tipo_regra": tipo_regra, "campo": campo,
+                   "padrao": padrao, "categoria": categoria, "prioridade": int(prioridade)})
+            conn.commit()
+        return result.lastrowid
+
+    def remover(self, regra_id, usuario_id):
+        with get_connection() as conn:
+            result = conn.execute(text("""
+                DELETE FROM regras_categorizacao
+                WHERE id = :id AND usuario_id = :usuario_id
+            """), {"id": regra_id, "usuario_id": usuario_id})
+            conn.commit()
+        return result.rowcount
+
+    def classificador(self, usuario_id):
+        """ClassificadorCategorias com as regras atuais do usuário."""
+        return ClassificadorCategorias(self.listar(usuario_id))
+
+
+class ImportacaoRepository:
+    """Log dos arquivos de extrato importados: conteúdo (SHA-256), período coberto e linhas."""
+
+    def buscar_por_hash(self, usuario_id, hash_arquivo):
+        """Importação anterior do mesmo arquivo pelo usuário, ou None."""
+        with get_connection() as conn:
+            row = conn.execute(text("""
+                SELECT id, data_inicio, data_fim, linhas
+                FROM importacoes
+                WHERE usuario_id = :usuario_id AND hash_arquivo = :hash_arquivo
+            """).columns(data_inicio=Date, data_fim=Date),
+                {"usuario_id": usuario_id, "hash_arquivo": hash_arquivo}).first()
+        return dict(row._mapping) if row else None
+
+    def registrar(self, usuario_id, hash_arquivo, data_inicio, data_fim, linhas):
+        """Grava o arquivo no log; se ele já está registrado para o usuário, nada muda."""
+        with get_connection() as conn:
+            conn.execute(text(sql_registrar_importacao(conn.dialect.name)), {
+                "usuario_id": usuario_id, "hash_arquivo": hash_arquivo, "linhas": int(linhas),
+                "data_inicio": _para_date(data_inicio), "data_fim": _para_date(data_fim),
+            })
+            conn.commit()
+
+    def janelas(self, usuario_id):
+        """Períodos (inicio, fim) já cobertos por importações do usuário, unidos e em ordem."""
+        with get_connection() as conn:
+            rows = conn.execute(text("""
+                SELECT data_inicio, data_fim
+                FROM importacoes
+                WHERE usuario_id = :usuario_id AND data_inicio IS NOT NULL
+                ORDER BY data_inicio
+            """).columns(data_inicio=Date, data_fim=Date), {"usuario_id": usuario_id}).fetchall()
+
+        janelas = []
+        for inicio, fim in rows:
+            if janelas and inicio <= janelas[-1][1]:
+                janelas[-1] = (janelas[-1][0], max(janelas[-1][1], fim))
+            else:
+                janelas.append((inicio, fim))
+        return janelas
+
+
+def _para_date(valor):
+    return None if valor is None or pd.isna(valor) else pd.Timestamp(valor).date()
+
 
 class InvestimentoRepository:
+    def __init__(self, cache=None):
+        """
+        :param cache: CacheVersionado cuja versão é trocada a cada escrita;
+            compartilhe o mesmo do ContaRepository.
+        """
+        self.cache = cache if cache is not None else criar_cache()
 
     def buscar_por_usuario(self, usuario_id):
         with get_connection() as conn:
@@ -180,7 +890,10 @@ class InvestimentoRepository:
                 INSERT INTO investimentos (usuario_id, saldo, papel, descricao)
                 VALUES (:usuario_id, :saldo, :papel, :descricao)
             """), {"usuario_id": usuario_id, "saldo": saldo, "papel": papel, "descricao": descricao})
+            # Investimentos não entram no /api/sync, mas a versão também muda os ETags
+            reservar_versao(conn, usuario_id)
             conn.commit()
+        _invalidar_versao(self.cache, usuario_id)
 
     def remover(self, investimento_id, usuario_id):
         with get_connection() as conn:
@@ -188,4 +901,6 @@ class InvestimentoRepository:
                 DELETE FROM investimentos
                 WHERE id = :id AND usuario_id = :usuario_id
             """), {"id": investimento_id, "usuario_id": usuario_id})
-            conn.commit()
\ No newline at end of file
+            reservar_versao(conn, usuario_id)
+            conn.commit()
+        _invalidar_versao(self.cache, usuario_id)
\ No newline at end of file
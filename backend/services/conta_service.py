@@ -1,78 +1,222 @@
 import pandas as pd
-from infrastructure.loader import ExcelLoader
-from models.main import Conta
+import tempfile
+from collections import Counter
+from infrastructure.database import unidade_de_trabalho
+from infrastructure.loader import (
+    IMPORTACAO_PROCESSOS, carregar_em_paralelo, escolher_loader, expandir_arquivos, hash_do_arquivo
+)
+from infrastructure.metricas import cronometrar_etapa, iterar_cronometrado
+from models.categorizacao import ClassificadorCategorias
+from models.main import Conta, unir_extratos
 from typing import Protocol
 
 
 class ContaRepositoryProtocol(Protocol):
-    def salvar_transacoes(self, conta: Conta, usuario_id: int) -> None: ...
-    def buscar_transacoes(self, usuario_id: int) -> list: ...
-    def salvar_saldos_mensais(self, conta: Conta, usuario_id: int) -> None: ...
+    def filtrar_transacoes_novas(self, conta: Conta, usuario_id: int, ocorrencias: Counter = None,
+                                 janelas: list | None = None) -> pd.DataFrame: ...
+    def salvar_transacoes(self, conta: Conta, usuario_id: int) -> int: ...
+    def salvar_saldos_mensais(self, conta: Conta, usuario_id: int, incremental: bool = True) -> None: ...
+    def reconstruir_saldos_mensais(self, usuario_id: int, meses: list | None = None) -> pd.DataFrame: ...
+    def buscar_saldos_mensais(self, usuario_id: int) -> list: ...
+    def atualizar_snapshot(self, usuario_id: int) -> None: ...
+
+
+class RegraCategorizacaoRepositoryProtocol(Protocol):
+    def classificador(self, usuario_id: int) -> ClassificadorCategorias: ...
+
+
+class ImportacaoRepositoryProtocol(Protocol):
+    def buscar_por_hash(self, usuario_id: int, hash_arquivo: str) -> dict | None: ...
+    def registrar(self, usuario_id: int, hash_arquivo: str, data_inicio, data_fim, linhas: int) -> None: ...
+    def janelas(self, usuario_id: int) -> list: ...
 
 
 class ContaService:
     """Serviço responsável por processar uploads de extratos e persistir transações e saldos."""
 
-    def __init__(self, conta_repo: ContaRepositoryProtocol, loader_cls=ExcelLoader) -> None:
+    def __init__(self, conta_repo: ContaRepositoryProtocol, loader_cls=None,
+                 regra_repo: RegraCategorizacaoRepositoryProtocol = None,
+                 processos: int = IMPORTACAO_PROCESSOS,
+                 importacao_repo: ImportacaoRepositoryProtocol = None) -> None:
         """
         Inicializa o serviço com o repositório de contas e o loader de arquivos.
 
         :param conta_repo: Repositório que implementa ContaRepositoryProtocol.
-        :param loader_cls: Classe responsável por carregar o arquivo (padrão: ExcelLoader).
+        :param loader_cls: Classe responsável por carregar o arquivo. Se omitida, o loader
+            é escolhido por arquivo pelo registro de formatos (Excel, CSV ou OFX).
+        :param regra_repo: Repositório das regras de categorização; com ele, as transações
+            novas já são gravadas com a categoria das regras do usuário.
+        :param processos: Processos usados para ler vários extratos de um mesmo upload.
+        :param importacao_repo: Log dos arquivos importados; com ele, um arquivo já importado
+            volta sem ser lido, e a deduplicação só consulta as datas de períodos já importados.
         """
         self._conta_repo = conta_repo
         self._loader_cls = loader_cls
+        self._regra_repo = regra_repo
+        self._processos = processos
+        self._importacao_repo = importacao_repo
 
-    def processar_upload(self, arquivo, usuario) -> Conta:
-        loader = self._loader_cls(arquivo)
-        dados = loader.carregar()
+    def processar_upload(self, arquivo, usuario, progresso=None) -> Conta:
+        """Importa o extrato bloco a bloco e devolve a conta com os saldos mensais atualizados.
 
-        conta = Conta(nome=usuario.nome, numero=usuario.numero)
-        conta.alimentar(dados)
+        Quando o loader oferece carregar_em_blocos(), cada bloco é filtrado, gravado e
+        somado aos saldos antes do próximo ser lido, e o extrato nunca fica inteiro em memória.
 
+        :param progresso: Função opcional chamada após cada bloco com os totais acumulados
+            (linhas_lidas, linhas_inseridas, duplicadas).
+        """
         usuario_id = usuario.id
+        hash_arquivo = janelas = None
+        if self._importacao_repo:
+            hash_arquivo = hash_do_arquivo(arquivo)
+            anterior = self._importacao_repo.buscar_por_hash(usuario_id, hash_arquivo)
+            if anterior is not None:
+                # Mesmo conteúdo já importado: nada a ler, deduplicar ou somar
+                if progresso:
+                    progresso(anterior['linhas'], 0, anterior['linhas'])
+                return self._conta_com_saldos(usuario)
+            janelas = self._importacao_repo.janelas(usuario_id)
+
+        loader = (self._loader_cls or escolher_loader(arquivo))(arquivo)
+        blocos = loader.carregar_em_blocos() if hasattr(loader, 'carregar_em_blocos') else [loader.carregar()]
+
+        ocorrencias = Counter()
+        lidas = inseridas = 0
+        inicio = fim = None
+        classificador = self._regra_repo.classificador(usuario_id) if self._regra_repo else None
+
+        # Etapas medidas em financer_importacao_etapa_segundos: leitura, deduplicacao, insercao, agregacao
+        for dados in iterar_cronometrado(blocos, "leitura"):
+            bloco = Conta(nome=usuario.nome, numero=usuario.numero)
+            bloco.alimentar(dados)
+            lidas += len(bloco.dados)
+            if not bloco.dados.empty:
+                menor, maior = bloco.dados['data'].min(), bloco.dados['data'].max()
+                inicio = menor if inicio is None else min(inicio, menor)
+                fim = maior if fim is None else max(fim, maior)
+            # Transações e saldos do bloco são gravados juntos ou nenhum deles
+            with unidade_de_trabalho():
+                inseridas += self._salvar_bloco(bloco, usuario_id, ocorrencias, classificador, janelas)
+            if progresso:
+                progresso(lidas, inseridas, lidas - inseridas)
+
+        # Registrado só no fim: um upload interrompido é lido de novo ao ser reenviado
+        if self._importacao_repo:
+            self._importacao_repo.registrar(usuario_id, hash_arquivo, inicio, fim, lidas)
+
+        if inseridas:
+            self._conta_repo.atualizar_snapshot(usuario_id)
+
+        return self._conta_com_saldos(usuario)
+
+    def processar_uploads(self, arquivos, usuario, progresso=None) -> Conta:
+        """Importa vários extratos (ou arquivos .zip com extratos) como um único upload.
+
+        Cada arquivo é lido em um processo do pool; as linhas são unidas sem repetir
+        lançamentos de períodos sobrepostos (unir_extratos) e gravadas de uma vez, com
+        os saldos mensais atualizados uma única vez no fim. Um único extrato segue o
+        caminho em blocos de processar_upload.
+
+        :param arquivos: Caminhos ou FileStorage; cada .zip é expandido nos extratos que contém.
+        :param progresso: Como em processar_upload, chamada após a leitura e após a gravação.
+        """
+        with tempfile.TemporaryDirectory(prefix="financer-") as diretorio:
+            caminhos = expandir_arquivos(arquivos, diretorio)
+            hashes = ja_lidas = janelas = None
+            if self._importacao_repo and len(caminhos) > 1:
+                caminhos, hashes, ja_lidas = self._descartar_ja_importados(caminhos, usuario.id)
+                if not caminhos:
+                    if progresso:
+                        progresso(ja_lidas, 0, ja_lidas)
+                    return self._conta_com_saldos(usuario)
+                janelas = self._importacao_repo.janelas(usuario.id)
+            if len(caminhos) == 1:
+                return self.processar_upload(caminhos[0], usuario, progresso=progresso)
+
+            with cronometrar_etapa("leitura"):
+                if self._loader_cls:
+                    extratos = [self._loader_cls(caminho).carregar() for caminho in caminhos]
+                else:
+                    extratos = carregar_em_paralelo(caminhos, self._processos)
+
+        lidas = sum(len(dados) for dados in extratos) + (ja_lidas or 0)
+        if progresso:
+            progresso(lidas, 0, 0)
 
-        existentes = self._conta_repo.buscar_transacoes(usuario_id)
-
-        if existentes:
-            existentes = pd.DataFrame(existentes)
-            if 'data' in existentes.columns:
-                existentes['data'] = pd.to_datetime(existentes['data'], errors='coerce')
+        conta = Conta(nome=usuario.nome, numero=usuario.numero)
+        conta.alimentar(unir_extratos(extratos, usuario.id))
+        classificador = self._regra_repo.classificador(usuario.id) if self._regra_repo else None
+
+        with unidade_de_trabalho():
+            inseridas = self._salvar_bloco(conta, usuario.id, Counter(), classificador, janelas)
+            if hashes:
+                for hash_arquivo, dados in zip(hashes, extratos):
+                    # Extrato sem lançamentos: registrado com período nulo, que janelas() ignora
+                    inicio, fim = (None, None) if dados.empty else (dados['data'].min(), dados['data'].max())
+                    self._importacao_repo.registrar(usuario.id, hash_arquivo, inicio, fim, len(dados))
+        del extratos
+        if progresso:
+            progresso(lidas, inseridas, lidas - inseridas)
+
+        if inseridas:
+            self._conta_repo.atualizar_snapshot(usuario.id)
+
+        return self._conta_com_saldos(usuario)
+
+    def _descartar_ja_importados(self, caminhos, usuario_id):
+        """Tira da lista os arquivos já importados (e os repetidos no próprio upload).
+
+        Retorna (caminhos restantes, hashes deles, linhas dos arquivos descartados)."""
+        restantes, hashes, ja_lidas = [], [], 0
+        for caminho in caminhos:
+            hash_arquivo = hash_do_arquivo(caminho)
+            if hash_arquivo in hashes:
+                continue
+            anterior = self._importacao_repo.buscar_por_hash(usuario_id, hash_arquivo)
+            if anterior is not None:
+                ja_lidas += anterior['linhas']
+                continue
+            restantes.append(caminho)
+            hashes.append(hash_arquivo)
+        return restantes, hashes, ja_lidas
+
+    def _conta_com_saldos(self, usuario) -> Conta:
+        conta = Conta(nome=usuario.nome, numero=usuario.numero)
+        conta.saldos_mensais = pd.DataFrame(
+            self._conta_repo.buscar_saldos_mensais(usuario.id),
+            columns=['mes', 'total_credito', 'total_debito', 'saldo']
+        )
+        return conta
+
+    def _salvar_bloco(self, bloco: Conta, usuario_id: int, ocorrencias: Counter,
+                      classificador: ClassificadorCategorias = None, janelas: list | None = None) -> int:
+        """Grava as linhas novas do bloco, atualiza os saldos e retorna quantas foram inseridas."""
+        # Só as linhas ainda não gravadas (consulta pelos hashes do próprio extrato, nos períodos já importados)
+        conta_novas = Conta(nome=bloco.nome, numero=bloco.numero)
+        with cronometrar_etapa("deduplicacao"):
+            conta_novas.alimentar(self._conta_repo.filtrar_transacoes_novas(bloco, usuario_id, ocorrencias, janelas))
+
+        if conta_novas.dados.empty:
+            return 0
+
+        if classificador:
+            with cronometrar_etapa("categorizacao"):
+                conta_novas.categorizar(classificador.classificar(conta_novas.dados))
+
+        with cronometrar_etapa("insercao"):
+            inseridas = self._conta_repo.salvar_transacoes(conta_novas, usuario_id)
+
+        with cronometrar_etapa("agregacao"):
+            # Totais por mês apenas das linhas novas, somados aos saldos já gravados
+            conta_novas.recalcular_saldo_do_banco(conta_novas.dados)
+
+            if inseridas == len(conta_novas.dados):
+                self._conta_repo.salvar_saldos_mensais(conta_novas, usuario_id)
             else:
-                existentes['data'] = pd.NaT
-        else:
-            existentes = pd.DataFrame(columns=['data', 'tipo', 'detalhe', 'credito', 'debito'])
-
-        novas = []
-        for _, row in conta.dados.iterrows():
-            row_data = pd.to_datetime(row['data'], errors='coerce')
-
-            existente_mes = existentes[
-                (existentes['data'].dt.month == row_data.month) &
-                (existentes['data'].dt.year == row_data.year)
-                ]
-
-            if not ((existente_mes['tipo'] == row['tipo']) &
-                    (existente_mes['detalhe'] == row['detalhe']) &
-                    (existente_mes['credito'] == row['credito']) &
-                    (existente_mes['debito'] == row['debito'])).any():
-                novas.append(row)
-
-        if novas:
-            conta_novas = Conta(nome=conta.nome, numero=conta.numero)
-            conta_novas.alimentar(pd.DataFrame(novas))
-            self._conta_repo.salvar_transacoes(conta_novas, usuario_id)
-
-        # ✅ FIX: Buscar TODAS as transações (antigas + novas) e recalcular
-        todas_as_transacoes = self._conta_repo.buscar_transacoes(usuario_id)
-
-        if todas_as_transacoes:
-            todas_as_transacoes = pd.DataFrame(todas_as_transacoes)
-            todas_as_transacoes['data'] = pd.to_datetime(todas_as_transacoes['data'], errors='coerce')
-            conta.recalcular_saldo_do_banco(todas_as_transacoes)
-        else:
-            conta.recalcular_saldo_do_banco(pd.DataFrame(columns=['data', 'tipo', 'detalhe', 'credito', 'debito']))
-
-        self._conta_repo.salvar_saldos_mensais(conta, usuario_id)
-
-        return conta
\ No newline at end of file
+                # Outro upload gravou parte das linhas entre a filtragem e o INSERT:
+                # os deltas não são confiáveis, então os meses tocados são recalculados.
+                self._conta_repo.reconstruir_saldos_mensais(
+                    usuario_id, meses=conta_novas.saldos_mensais['mes'].tolist()
+                )
+
+        return inseridas
@@ -0,0 +1,122 @@
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from infrastructure.cache import MemoriaCache, RedisCache
+from infrastructure.uploads import salvar_upload
+
+logger = logging.getLogger(__name__)
+
+IMPORTACAO_WORKERS = int(os.environ.get("FINANCER_IMPORTACAO_WORKERS", "2"))
+IMPORTACAO_MAX_PENDENTES = int(os.environ.get("FINANCER_IMPORTACAO_MAX_PENDENTES", "16"))
+IMPORTACAO_RETENCAO = 24 * 60 * 60  # segundos que o status fica disponível para consulta
+
+
+class FilaCheia(Exception):
+    """Há importações demais aguardando processamento; o cliente deve tentar mais tarde."""
+
+
+class ImportacaoService:
+    """Executa uploads de extrato em segundo plano e acompanha o progresso de cada um.
+
+    Os arquivos vão para temporários antes de a requisição terminar (um link para o spool
+    do upload, quando possível, em vez de uma cópia); um pool limitado de threads
+    processa as importações, e no máximo max_pendentes ficam na fila.
+    O status vive em um backend de cache: com RedisCache, qualquer processo da API
+    consegue responder à consulta, não só o que recebeu o upload.
+    """
+
+    def __init__(self, conta_service, max_workers=IMPORTACAO_WORKERS,
+                 max_pendentes=IMPORTACAO_MAX_PENDENTES, backend=None) -> None:
+        self._conta_service = conta_service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="importacao")
+        self._vagas = threading.BoundedSemaphore(max_pendentes)
+        self._status = backend if backend is not None else _backend_status()
+
+    def enviar(self, arquivos, usuario) -> dict:
+        """Enfileira um arquivo (ou uma lista deles) para importação e retorna o status inicial (com o id).
+
+        Vários arquivos, ou um .zip, viram uma única importação (ContaService.processar_uploads)."""
+        if not isinstance(arquivos, (list, tuple)):
+            arquivos = [arquivos]
+        if not self._vagas.acquire(blocking=False):
+            raise FilaCheia("Muitas importações em andamento. Tente novamente em instantes.")
+
+        caminhos = []
+        try:
+            for arquivo in arquivos:
+                caminhos.append(self._copiar_para_temporario(arquivo))
+        except Exception:
+            _remover(caminhos)
+            self._vagas.release()
+            raise
+
+        importacao = {
+            "id": uuid.uuid4().hex,
+            "usuario_id": usuario.id,
+            "status": "na_fila",
+            "linhas_lidas": 0,
+            "linhas_inseridas": 0,
+            "duplicadas": 0,
+            "erro": None,
+            "criada_em": _agora(),
+            "concluida_em": None,
+        }
+        self._salvar(importacao)
+        self._executor.submit(self._processar, importacao, caminhos, usuario)
+        return importacao
+
+    def buscar(self, importacao_id, usuario_id) -> dict | None:
+        """Retorna o status da importação, se ela pertence ao usuário."""
+        importacao = self._status.obter(f"importacao:{importacao_id}")
+        if importacao is None or importacao["usuario_id"] != usuario_id:
+            return None
+        return importacao
+
+    def _processar(self, importacao, caminhos, usuario) -> None:
+        def progresso(lidas, inseridas, duplicadas):
+            importacao.update(linhas_lidas=lidas, linhas_inseridas=inseridas, duplicadas=duplicadas)
+            self._salvar(importacao)
+
+        try:
+            importacao["status"] = "processando"
+            self._salvar(importacao)
+            self._conta_service.processar_uploads(caminhos, usuario, progresso=progresso)
+            importacao["status"] = "concluida"
+        except Exception as e:
+            logger.exception("Falha na importação %s", importacao["id"])
+            importacao.update(status="erro", erro=str(e))
+        finally:
+            importacao["concluida_em"] = _agora()
+            self._salvar(importacao)
+            _remover(caminhos)
+            self._vagas.release()
+
+    def _salvar(self, importacao) -> None:
+        self._status.definir(f"importacao:{importacao['id']}", dict(importacao))
+
+    @staticmethod
+    def _copiar_para_temporario(arquivo) -> str:
+        sufixo = os.path.splitext(getattr(arquivo, "filename", None) or "")[1]
+        return salvar_upload(arquivo, os.path.join(tempfile.gettempdir(), f"financer-{uuid.uuid4().hex}{sufixo}"))
+
+
+def _backend_status():
+    """Redis se FINANCER_CACHE_URL estiver definida (status visível a todos os workers), senão memória."""
+    url = os.environ.get("FINANCER_CACHE_URL")
+    if url:
+        return RedisCache.de_url(url, ttl=IMPORTACAO_RETENCAO)
+    return MemoriaCache(max_itens=10000, ttl=IMPORTACAO_RETENCAO)
+
+
+def _remover(caminhos) -> None:
+    for caminho in caminhos:
+        os.remove(caminho)
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,70 @@
+"""Benchmark da representação de Conta: DataFrame genérico x colunas compactas.
+
+Compara, para um extrato sintético, a memória (memory_usage deep) do DataFrame
+como sai dos loaders (float64 em reais, texto em object) com Conta.dados
+(int64 em centavos, tipo/detalhe categóricos), e o tempo de recalcular_saldo_do_banco
+sobre cada um.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_conta.py --linhas 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from gerador import gerar_linhas
+
+
+def normalizar(brutas):
+    """Extrato no formato dos loaders: data, tipo, detalhe, credito, debito (reais)."""
+    import numpy as np
+
+    partes = brutas['descricao'].str.split('  ', n=1, expand=True)
+    return brutas[['data']].assign(
+        tipo=partes[0].astype(object),
+        detalhe=partes[1].astype(object),
+        credito=np.where(brutas['valor'] > 0, brutas['valor'], 0.0),
+        debito=np.where(brutas['valor'] < 0, -brutas['valor'], 0.0),
+    )
+
+
+def medir(nome, funcao, repeticoes=3):
+    melhor = min(_cronometrar(funcao) for _ in range(repeticoes))
+    print(f"{nome:<34} {melhor:>8.3f}s")
+
+
+def _cronometrar(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=500000)
+    args = parser.parse_args()
+
+    from models.main import Conta
+
+    dados = normalizar(gerar_linhas(args.linhas))
+    conta = Conta(nome="Benchmark", numero="0000000-0")
+    inicio = time.perf_counter()
+    conta.alimentar(dados)
+    duracao_alimentar = time.perf_counter() - inicio
+
+    antes = dados.memory_usage(deep=True).sum() / 1024 / 1024
+    depois = conta.dados.memory_usage(deep=True).sum() / 1024 / 1024
+    print(f"{args.linhas} linhas")
+    print(f"{'memória, DataFrame dos loaders':<34} {antes:>8.1f} MB")
+    print(f"{'memória, Conta.dados':<34} {depois:>8.1f} MB ({depois / antes:.0%})")
+    print(f"{'alimentar':<34} {duracao_alimentar:>8.3f}s")
+
+    medir("recalcular_saldo (reais, float)", lambda: Conta().recalcular_saldo_do_banco(dados))
+    medir("recalcular_saldo (centavos)", lambda: Conta().recalcular_saldo_do_banco(conta.dados))
+
+
+if __name__ == "__main__":
+    main()
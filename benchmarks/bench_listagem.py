@@ -0,0 +1,97 @@
+"""Benchmark da listagem completa (/api/sync): resposta montada na memória x em fluxo.
+
+Para uma conta sintética (padrão: 200 mil transações) compara:
+- "lista + json (antes)": fetchall, lista de dicts e json da biblioteca padrão numa única string;
+- "fluxo": cursor no servidor e blocos serializados por para_json (orjson, se instalado);
+- "fluxo + gzip" / "fluxo + br": o mesmo fluxo comprimido bloco a bloco.
+
+Para cada um: tempo até o primeiro byte, tempo total, tamanho e pico de memória (tracemalloc,
+medido numa segunda passada para não distorcer os tempos).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_listagem.py --linhas 200000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from gerador import gerar_conta
+
+
+def lista_em_memoria(repo, usuario_id, linhas):
+    """Caminho anterior: todas as linhas numa lista e um único json.dumps."""
+    from infrastructure.serializacao import ProvedorJSON
+
+    pagina = repo.buscar_alteracoes(usuario_id, limite=linhas)
+    yield json.dumps(pagina, default=ProvedorJSON.default).encode("utf-8")
+
+
+def em_fluxo(repo, usuario_id, codificacao=None):
+    from infrastructure.compressao import comprimir_blocos
+    from infrastructure.serializacao import gerar_json_em_fluxo
+
+    blocos = gerar_json_em_fluxo(repo.iterar_alteracoes(usuario_id), lambda ultimo: {"tem_mais": False})
+    return blocos if codificacao is None else comprimir_blocos(blocos, codificacao)
+
+
+def consumir(gerar):
+    """Consome os blocos e retorna (segundos até o primeiro byte, segundos no total, bytes)."""
+    inicio = time.perf_counter()
+    primeiro = None
+    tamanho = 0
+    for bloco in gerar():
+        if primeiro is None and bloco:
+            primeiro = time.perf_counter() - inicio
+        tamanho += len(bloco)
+    return primeiro, time.perf_counter() - inicio, tamanho
+
+
+def pico_de_memoria(gerar):
+    tracemalloc.start()
+    try:
+        for _ in gerar():
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(diretorio, 'bench_listagem.db')}"
+        from infrastructure.compressao import COMPRESSORES
+        from infrastructure.database import Base, engine
+        from infrastructure.serializacao import orjson
+        from repositories.repository import ContaRepository
+
+        Base.metadata.create_all(bind=engine)
+        repo = ContaRepository()
+        repo.salvar_transacoes(gerar_conta(args.linhas), 1)
+
+        cenarios = [("lista + json (antes)", lambda: lista_em_memoria(repo, 1, args.linhas))]
+        cenarios.append(("fluxo", lambda: em_fluxo(repo, 1)))
+        for codificacao in COMPRESSORES:
+            cenarios.append((f"fluxo + {codificacao}", lambda c=codificacao: em_fluxo(repo, 1, c)))
+
+        print(f"{engine.dialect.name}: {args.linhas} linhas, serializador {'orjson' if orjson else 'json'}")
+        print(f"{'cenário':<24} {'1º byte':>9} {'total':>9} {'tamanho':>10} {'pico mem.':>10}")
+        for nome, gerar in cenarios:
+            primeiro, total, tamanho = consumir(gerar)
+            pico = pico_de_memoria(gerar)
+            print(f"{nome:<24} {primeiro:>8.3f}s {total:>8.3f}s {tamanho / 1024 / 1024:>7.1f} MB "
+                  f"{pico / 1024 / 1024:>7.1f} MB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
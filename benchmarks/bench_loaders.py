@@ -0,0 +1,47 @@
+"""Benchmark de leitura: o mesmo extrato em XLSX, CSV e OFX.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_loaders.py --linhas 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from gerador import escrever_csv, escrever_ofx, escrever_xlsx, gerar_linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=50000)
+    args = parser.parse_args()
+
+    from infrastructure.loader import CsvLoader, ExcelLoader, OfxLoader
+
+    dados = gerar_linhas(args.linhas)
+    formatos = [
+        ('xlsx', escrever_xlsx, ExcelLoader),
+        ('csv', escrever_csv, CsvLoader),
+        ('ofx', escrever_ofx, OfxLoader),
+    ]
+
+    print(f"{args.linhas} linhas")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for formato, escrever, loader_cls in formatos:
+            caminho = os.path.join(diretorio, f'extrato.{formato}')
+            escrever(dados, caminho)
+
+            inicio = time.perf_counter()
+            carregado = loader_cls(caminho).carregar()
+            duracao = time.perf_counter() - inicio
+
+            assert len(carregado) == args.linhas
+            tamanho = os.path.getsize(caminho) / 1024 / 1024
+            print(f"{formato:<6} {tamanho:>7.1f} MB {duracao:>8.2f}s {args.linhas / duracao:>12,.0f} linhas/s")
+
+
+if __name__ == "__main__":
+    main()
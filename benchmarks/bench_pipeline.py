@@ -0,0 +1,146 @@
+"""Benchmark do pipeline de importação e relatórios sobre SQLite.
+
+Mede, para cada tamanho de extrato sintético (ver gerador.py):
+ExcelLoader.carregar, Conta.recalcular_saldo_do_banco, a deduplicação
+(filtrar_transacoes_novas), salvar_transacoes, salvar_saldos_mensais e o
+reupload completo por ContaService.processar_upload (todas as linhas já
+existem, então só o laço de deduplicação trabalha).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_pipeline.py --linhas 1000 10000 100000
+    python benchmarks/bench_pipeline.py --linhas 10000 --comparar benchmarks/resultados/abc1234.json
+
+Os resultados vão para benchmarks/resultados/<commit>.json (ou --saida).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from gerador import LINHAS_MAXIMO, LINHAS_MINIMO, SEMENTE_PADRAO, arquivo_extrato
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+class UsuarioBenchmark:
+    id = 1
+    nome = "Benchmark"
+    numero = "0000000-0"
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def medir(resultados, etapa, linhas, funcao):
+    inicio = time.perf_counter()
+    retorno = funcao()
+    duracao = time.perf_counter() - inicio
+    resultados.append({
+        "etapa": etapa,
+        "linhas": linhas,
+        "segundos": round(duracao, 4),
+        "linhas_por_segundo": round(linhas / duracao) if duracao else None,
+    })
+    print(f"{etapa:<24} {linhas:>9} {duracao:>9.3f}s {linhas / duracao:>12,.0f} linhas/s")
+    return retorno
+
+
+def executar(linhas, semente, resultados):
+    from infrastructure.database import Base, engine
+    from infrastructure.loader import ExcelLoader
+    from models.main import Conta
+    from repositories.repository import ContaRepository
+    from services.conta_service import ContaService
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    caminho = arquivo_extrato(linhas, 'xlsx', semente)
+    repo = ContaRepository()
+    usuario_id = UsuarioBenchmark.id
+
+    dados = medir(resultados, "excel_carregar", linhas, lambda: ExcelLoader(caminho).carregar())
+    conta = Conta(nome=UsuarioBenchmark.nome, numero=UsuarioBenchmark.numero)
+    conta.alimentar(dados)
+
+    medir(resultados, "recalcular_saldo", linhas, lambda: conta.recalcular_saldo_do_banco(conta.dados))
+    novas = medir(resultados, "deduplicar", linhas, lambda: repo.filtrar_transacoes_novas(conta, usuario_id))
+    conta.alimentar(novas)
+    medir(resultados, "salvar_transacoes", linhas, lambda: repo.salvar_transacoes(conta, usuario_id))
+    medir(resultados, "salvar_saldos_mensais", linhas, lambda: repo.salvar_saldos_mensais(conta, usuario_id))
+
+    service = ContaService(repo)
+    medir(resultados, "reupload", linhas, lambda: service.processar_upload(caminho, UsuarioBenchmark()))
+
+
+def comparar(resultados, caminho_anterior):
+    """Imprime a variação de tempo por etapa e tamanho em relação a um JSON anterior."""
+    with open(caminho_anterior, encoding='utf-8') as f:
+        anterior = json.load(f)
+    base = {(r["etapa"], r["linhas"]): r["segundos"] for r in anterior["resultados"]}
+
+    print(f"\nComparado a {anterior['commit']} ({caminho_anterior}):")
+    for r in resultados:
+        antes = base.get((r["etapa"], r["linhas"]))
+        if antes:
+            variacao = (r["segundos"] - antes) / antes * 100
+            print(f"{r['etapa']:<24} {r['linhas']:>9} {antes:>9.3f}s -> {r['segundos']:>9.3f}s {variacao:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help=f"tamanhos dos extratos ({LINHAS_MINIMO} a {LINHAS_MAXIMO})")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    for linhas in args.linhas:
+        if not LINHAS_MINIMO <= linhas <= LINHAS_MAXIMO:
+            parser.error(f"--linhas deve estar entre {LINHAS_MINIMO} e {LINHAS_MAXIMO}")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # O engine é criado na importação de infrastructure.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(diretorio, 'bench.db')}"
+        resultados = []
+        print(f"{'etapa':<24} {'linhas':>9} {'tempo':>10} {'vazão':>20}")
+        for linhas in args.linhas:
+            executar(linhas, args.semente, resultados)
+
+        from infrastructure.database import engine
+        engine.dispose()
+
+    commit = commit_atual()
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({
+            "commit": commit,
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "semente": args.semente,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {saida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
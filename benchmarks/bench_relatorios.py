@@ -0,0 +1,96 @@
+"""Benchmark dos relatórios: GROUP BY no banco (RelatorioRepository) x pandas sobre buscar_transacoes.
+
+O lado pandas reproduz o caminho que existiria sem o módulo de relatórios: trazer
+todas as transações do usuário com buscar_transacoes e agrupar no DataFrame.
+O cache dos relatórios é ignorado (cada medição vai ao banco).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/bench_relatorios.py --linhas 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+from gerador import gerar_conta
+
+
+def melhor_tempo(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def pandas_categorias(conta_repo, usuario_id):
+    import pandas as pd
+
+    dados = pd.DataFrame(conta_repo.buscar_transacoes(usuario_id))
+    dados['mes'] = pd.to_datetime(dados['data']).dt.strftime('%Y-%m')
+    return dados.groupby(['mes', 'categoria']).agg(
+        total_credito=('credito', 'sum'), total_debito=('debito', 'sum'), quantidade=('id', 'count')
+    ).reset_index().to_dict('records')
+
+
+def pandas_favorecidos(conta_repo, usuario_id, limite=10):
+    import pandas as pd
+
+    dados = pd.DataFrame(conta_repo.buscar_transacoes(usuario_id))
+    debitos = dados[dados['debito'] > 0]
+    return debitos.groupby(['tipo', 'detalhe']).agg(
+        total=('debito', 'sum'), quantidade=('id', 'count')
+    ).nlargest(limite, 'total').reset_index().to_dict('records')
+
+
+def pandas_anual(conta_repo, usuario_id):
+    import pandas as pd
+
+    dados = pd.DataFrame(conta_repo.buscar_transacoes(usuario_id))
+    dados['ano'] = pd.to_datetime(dados['data']).dt.year
+    anual = dados.groupby('ano')[['credito', 'debito']].sum()
+    anual['variacao_credito'] = anual['credito'].pct_change() * 100
+    return anual.reset_index().to_dict('records')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=200000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(diretorio, 'bench_relatorios.db')}"
+        from infrastructure.database import Base, engine
+        from repositories.repository import ContaRepository, RelatorioRepository
+
+        Base.metadata.create_all(bind=engine)
+        conta_repo = ContaRepository()
+        conta_repo.salvar_transacoes(gerar_conta(args.linhas), 1)
+        conta_repo.reconstruir_saldos_mensais(1)
+        relatorios = RelatorioRepository()
+
+        cenarios = [
+            ("categorias por mês", lambda: RelatorioRepository.categorias_por_mes.__wrapped__(relatorios, 1),
+             lambda: pandas_categorias(conta_repo, 1)),
+            ("maiores favorecidos", lambda: RelatorioRepository.maiores_favorecidos.__wrapped__(relatorios, 1),
+             lambda: pandas_favorecidos(conta_repo, 1)),
+            ("comparativo anual", lambda: RelatorioRepository.comparativo_anual.__wrapped__(relatorios, 1),
+             lambda: pandas_anual(conta_repo, 1)),
+        ]
+
+        print(f"{engine.dialect.name}: {args.linhas} linhas")
+        print(f"{'relatório':<22} {'SQL':>9} {'pandas':>9} {'linhas':>8}")
+        for nome, sql, em_pandas in cenarios:
+            tempo_sql, resultado = melhor_tempo(sql, args.repeticoes)
+            tempo_pandas, _ = melhor_tempo(em_pandas, args.repeticoes)
+            print(f"{nome:<22} {tempo_sql:>8.3f}s {tempo_pandas:>8.3f}s {len(resultado):>8}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
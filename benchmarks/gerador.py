@@ -0,0 +1,112 @@
+"""Gerador determinístico de extratos sintéticos para os benchmarks.
+
+A mesma semente e o mesmo número de linhas produzem sempre o mesmo extrato,
+então os tempos de commits diferentes são comparáveis. As linhas seguem o
+layout do ExcelLoader (Data, Descrição, Crédito (R$), Débito (R$)), com a
+descrição "Tipo  Detalhe" separada por dois espaços.
+"""
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+
+SEMENTE_PADRAO = 42
+LINHAS_MINIMO = 1_000
+LINHAS_MAXIMO = 1_000_000
+DIRETORIO_DADOS = os.path.join(os.path.dirname(__file__), ".dados")
+
+TIPOS = ['Pix', 'Boleto', 'Cartão', 'TED', 'Tarifa']
+
+
+def gerar_linhas(linhas, semente=SEMENTE_PADRAO):
+    """DataFrame bruto (data, descricao, valor); valor > 0 é crédito, < 0 é débito."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(semente)
+    valores = rng.integers(100, 500000, size=linhas) / 100
+    eh_credito = rng.random(linhas) < 0.3
+    return pd.DataFrame({
+        'data': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365 * 5, size=linhas), unit='D'),
+        'descricao': [f'{tipo}  Favorecido {n}' for tipo, n in zip(
+            rng.choice(TIPOS, size=linhas),
+            rng.integers(0, 2000, size=linhas)
+        )],
+        'valor': np.where(eh_credito, valores, -valores),
+    })
+
+
+def gerar_conta(linhas, semente=SEMENTE_PADRAO):
+    """Conta alimentada com o extrato normalizado (data, tipo, detalhe, credito, debito) dos loaders."""
+    import numpy as np
+    from models.main import Conta
+
+    brutas = gerar_linhas(linhas, semente)
+    partes = brutas['descricao'].str.split('  ', n=1, expand=True)
+    dados = brutas[['data']].assign(
+        tipo=partes[0],
+        detalhe=partes[1],
+        credito=np.where(brutas['valor'] > 0, brutas['valor'], 0.0),
+        debito=np.where(brutas['valor'] < 0, -brutas['valor'], 0.0),
+    )
+    conta = Conta(nome="Benchmark", numero="0000000-0")
+    conta.alimentar(dados)
+    return conta
+
+
+def _valor_br(valor):
+    return f'{abs(valor):,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def escrever_xlsx(dados, caminho):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet()
+    planilha.append(['Data', 'Descrição', 'Crédito (R$)', 'Débito (R$)'])
+    for data, descricao, valor in dados.itertuples(index=False):
+        planilha.append([
+            data.strftime('%d/%m/%Y'), descricao,
+            _valor_br(valor) if valor > 0 else None,
+            _valor_br(valor) if valor < 0 else None,
+        ])
+    workbook.save(caminho)
+
+
+def escrever_csv(dados, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write('Data;Descrição;Crédito (R$);Débito (R$)\n')
+        for data, descricao, valor in dados.itertuples(index=False):
+            credito = _valor_br(valor) if valor > 0 else ''
+            debito = _valor_br(valor) if valor < 0 else ''
+            f.write(f'{data:%d/%m/%Y};{descricao};{credito};{debito}\n')
+
+
+def escrever_ofx(dados, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write('OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n')
+        for numero, (data, descricao, valor) in enumerate(dados.itertuples(index=False)):
+            f.write(
+                f'<STMTTRN>\n<TRNTYPE>{"CREDIT" if valor > 0 else "DEBIT"}\n<DTPOSTED>{data:%Y%m%d}\n'
+                f'<TRNAMT>{valor:.2f}\n<FITID>{numero}\n<MEMO>{descricao}\n</STMTTRN>\n'
+            )
+        f.write('</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n')
+
+
+ESCRITORES = {'xlsx': escrever_xlsx, 'csv': escrever_csv, 'ofx': escrever_ofx}
+
+
+def arquivo_extrato(linhas, formato='xlsx', semente=SEMENTE_PADRAO, diretorio=DIRETORIO_DADOS):
+    """Caminho de um extrato sintético no formato pedido, gerado uma única vez e reaproveitado.
+
+    Gerar uma planilha de 1M de linhas leva minutos; o arquivo fica em benchmarks/.dados."""
+    if not LINHAS_MINIMO <= linhas <= LINHAS_MAXIMO:
+        raise ValueError(f"linhas deve estar entre {LINHAS_MINIMO} e {LINHAS_MAXIMO}")
+
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f'extrato-{linhas}-{semente}.{formato}')
+    if not os.path.exists(caminho):
+        temporario = caminho + '.tmp'
+        ESCRITORES[formato](gerar_linhas(linhas, semente), temporario)
+        os.replace(temporario, caminho)
+    return caminho
@@ -1,9 +1,9 @@
 // screens/ImportarScreen.js
 import React, { useState } from 'react';
-import { View, StyleSheet, Alert } from 'react-native';
+import { View, Text, StyleSheet, Alert } from 'react-native';
 import * as DocumentPicker from 'expo-document-picker';
 
-import { enviarExtrato } from '../services/importarService';
+import { enviarExtrato, aguardarImportacao } from '../services/importarService';
 import ArquivoSelecionador from '../components/ArquivoSelecionador';
 import BotaoUpload from '../components/BotaoUpload';
 import InfoUpload from '../components/InfoUpload';
@@ -11,6 +11,7 @@ import InfoUpload from '../components/InfoUpload';
 export default function ImportarScreen({ token }) {
   const [arquivo, setArquivo] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [progresso, setProgresso] = useState(null);
 
   async function selecionarArquivo() {
     try {
@@ -33,12 +34,18 @@ export default function ImportarScreen({ token }) {
 
     try {
       setLoading(true);
-      await enviarExtrato(arquivo, token);
+      const { importacao_id } = await enviarExtrato(arquivo, token);
+      const importacao = await aguardarImportacao(importacao_id, token, setProgresso);
       setLoading(false);
-      Alert.alert('✅ Sucesso', 'Extrato importado com sucesso!');
+      setProgresso(null);
+      Alert.alert(
+        '✅ Sucesso',
+        `Extrato importado com sucesso!\n${importacao.linhas_inseridas} nova(s), ${importacao.duplicadas} já existente(s).`
+      );
       setArquivo(null);
     } catch (error) {
       setLoading(false);
+      setProgresso(null);
 
       if (error.message.includes('Timeout')) {
         Alert.alert(
@@ -70,6 +77,12 @@ export default function ImportarScreen({ token }) {
         onPress={handleEnviar}
       />
 
+      {progresso && (
+        <Text style={styles.progresso}>
+          {progresso.linhas_lidas} linha(s) lida(s), {progresso.linhas_inseridas} nova(s)
+        </Text>
+      )}
+
       <InfoUpload />
     </View>
   );
@@ -80,5 +93,10 @@ const styles = StyleSheet.create({
     flex: 1,
     padding: 20,
     backgroundColor: '#f4f6f8'
+  },
+  progresso: {
+    textAlign: 'center',
+    color: '#555',
+    marginVertical: 10
   }
 });
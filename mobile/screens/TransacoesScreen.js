@@ -1,5 +1,5 @@
 // screens/TransacoesScreen.js
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState, useMemo, useRef } from 'react';
 import {
   View,
   FlatList,
@@ -10,7 +10,9 @@ import {
 } from 'react-native';
 import { Ionicons } from '@expo/vector-icons';
 
-import { carregarTransacoes, categorizarTransacao } from '../services/transacoesService';
+import { categorizarEmLote } from '../services/transacoesService';
+import { sincronizarTransacoes } from '../services/sincronizacaoService';
+import { carregarDashboard } from '../services/dashboardService';
 import ResumoTransacoes from '../components/ResumoTransacoes';
 import FiltroMes from '../components/FiltroMes';
 import TransacaoCard from '../components/TransacaoCard';
@@ -18,22 +20,42 @@ import ErroConexao from '../components/ErroConexao';
 import EstadoVazio from '../components/EstadoVazio';
 
 export default function TransacoesScreen({ token }) {
-  const [registros, setRegistros] = useState([]);
+  // Todas as transações do usuário, mantidas em dia por /api/sync
+  const [transacoes, setTransacoes] = useState([]);
+  const [saldosMensais, setSaldosMensais] = useState([]);
   const [loading, setLoading] = useState(true);
   const [erro, setErro] = useState(null);
   const [mesSelecionado, setMesSelecionado] = useState("todos");
-  const [atualizando, setAtualizando] = useState(null);
+  const [atualizando, setAtualizando] = useState(false);
+  // Categorizações feitas em sequência são enviadas juntas, numa só requisição
+  const pendentes = useRef([]);
+  const temporizador = useRef(null);
+
+  useEffect(() => () => clearTimeout(temporizador.current), []);
+
+  useEffect(() => {
+    fetchMeses();
+  }, [token]);
 
   useEffect(() => {
     fetchTransacoes();
   }, [token]);
 
+  // Os meses e totais vêm dos saldos mensais, sem baixar o histórico inteiro
+  async function fetchMeses() {
+    try {
+      setSaldosMensais(await carregarDashboard(token));
+    } catch (error) {
+      setErro(error.message);
+    }
+  }
+
+  // Só a primeira sincronização baixa o histórico; depois vêm apenas as linhas novas ou alteradas
   async function fetchTransacoes() {
     try {
-      setLoading(true);
+      setLoading(transacoes.length === 0);
       setErro(null);
-      const data = await carregarTransacoes(token);
-      setRegistros(data);
+      setTransacoes(await sincronizarTransacoes(token));
       setLoading(false);
     } catch (error) {
       setLoading(false);
@@ -41,45 +63,68 @@ export default function TransacoesScreen({ token }) {
     }
   }
 
-  const meses = useMemo(() => {
-    const lista = registros.map(r => r.data.slice(0, 7));
-    return ["todos", ...new Set(lista)];
-  }, [registros]);
+  const registros = useMemo(() => (
+    mesSelecionado === "todos"
+      ? transacoes
+      : transacoes.filter(t => String(t.data).startsWith(mesSelecionado))
+  ), [transacoes, mesSelecionado]);
 
-  const registrosFiltrados = useMemo(() => {
-    if (mesSelecionado === "todos") return registros;
-    return registros.filter(r => r.data.startsWith(mesSelecionado));
-  }, [registros, mesSelecionado]);
+  const meses = useMemo(() => {
+    const lista = saldosMensais.map(s => s.mes).reverse();
+    return ["todos", ...lista];
+  }, [saldosMensais]);
 
   const totaisFiltrados = useMemo(() => {
-    return registrosFiltrados.reduce(
-      (acc, item) => ({
-        credito: acc.credito + Number(item.credito || 0),
-        debito: acc.debito + Number(item.debito || 0)
-      }),
-      { credito: 0, debito: 0 }
+    return saldosMensais
+      .filter(s => mesSelecionado === "todos" || s.mes === mesSelecionado)
+      .reduce(
+        (acc, s) => ({
+          credito: acc.credito + Number(s.total_credito || 0),
+          debito: acc.debito + Number(s.total_debito || 0)
+        }),
+        { credito: 0, debito: 0 }
+      );
+  }, [saldosMensais, mesSelecionado]);
+
+  function handleCategorizar(id, categoria, aplicarTodas = false) {
+    const transacao = registros.find(r => r.id === id);
+    pendentes.current.push(
+      aplicarTodas && transacao
+        ? { tipo: transacao.tipo, detalhe: transacao.detalhe, categoria }
+        : { transacao_id: id, categoria }
     );
-  }, [registrosFiltrados]);
 
-  async function handleCategorizar(id, categoria, aplicarTodas = false) {
-    try {
-      setAtualizando(id);
-      setErro(null);
-      
-      await categorizarTransacao(token, {
-        transacao_id: id,
-        categoria,
-        aplicar_todas: aplicarTodas
-      });
-
-      setAtualizando(null);
-      await fetchTransacoes();
+    // Atualiza a tela na hora; a API recebe o lote logo depois
+    setTransacoes(atuais => atuais.map(r => (
+      r.id === id || (aplicarTodas && transacao && r.tipo === transacao.tipo && r.detalhe === transacao.detalhe)
+        ? { ...r, categoria }
+        : r
+    )));
 
-      if (aplicarTodas) {
+    clearTimeout(temporizador.current);
+    temporizador.current = setTimeout(enviarPendentes, 800);
+  }
+
+  async function enviarPendentes() {
+    const itens = pendentes.current;
+    pendentes.current = [];
+    if (itens.length === 0) return;
+
+    try {
+      setAtualizando(true);
+      const { resultados } = await categorizarEmLote(token, itens);
+      setAtualizando(false);
+
+      const falhas = resultados.filter(r => r.status !== 'ok');
+      if (falhas.length > 0) {
+        await fetchTransacoes();
+        Alert.alert("⚠️ Atenção", `${falhas.length} categorização(ões) não foram aplicadas.`);
+      } else if (itens.some(item => item.tipo !== undefined)) {
         Alert.alert("✅ Sucesso", "Categoria aplicada em todas as transações iguais!");
       }
     } catch (err) {
-      setAtualizando(null);
+      setAtualizando(false);
+      await fetchTransacoes();
 
       if (err.message.includes('Timeout')) {
         Alert.alert("⏱️ Timeout", "A requisição demorou muito. Tente novamente.");
@@ -113,16 +158,16 @@ export default function TransacoesScreen({ token }) {
             onMesChange={setMesSelecionado}
           />
         </View>
-        <TouchableOpacity onPress={fetchTransacoes} style={styles.botaoReload}>
+        <TouchableOpacity onPress={() => { fetchMeses(); fetchTransacoes(); }} style={styles.botaoReload}>
           <Ionicons name="refresh" size={24} color="#6366F1" />
         </TouchableOpacity>
       </View>
 
-      {registrosFiltrados.length > 0 && (
+      {registros.length > 0 && (
         <ResumoTransacoes totais={totaisFiltrados} />
       )}
 
-      {registrosFiltrados.length === 0 ? (
+      {registros.length === 0 ? (
         <EstadoVazio
           titulo="Nenhuma transação encontrada."
           subtitulo="Importe um extrato para visualizar"
@@ -130,13 +175,13 @@ export default function TransacoesScreen({ token }) {
         />
       ) : (
         <FlatList
-          data={registrosFiltrados}
+          data={registros}
           keyExtractor={(item) => String(item.id)}
           showsVerticalScrollIndicator={false}
           renderItem={({ item }) => (
             <TransacaoCard
               item={item}
-              atualizando={atualizando === item.id}
+              atualizando={atualizando}
               onCategorizar={handleCategorizar}
             />
           )}
@@ -11,11 +11,20 @@ const fetchWithTimeout = (url, options = {}, timeout = 15000) => {
   ]);
 };
 
+// Última resposta por token: { etag, lista }. Sem mudanças, a API responde 304 sem corpo.
+const ultimas = new Map();
+
 export async function carregarDashboard(token) {
   try {
-    const res = await fetchWithTimeout(`${API}/api/dashboard`, {
-      headers: { Authorization: `Bearer ${token}` }
-    }, 15000);
+    const ultima = ultimas.get(token);
+    const headers = { Authorization: `Bearer ${token}` };
+    if (ultima?.etag) headers['If-None-Match'] = ultima.etag;
+
+    const res = await fetchWithTimeout(`${API}/api/dashboard`, { headers }, 15000);
+
+    if (res.status === 304 && ultima) {
+      return ultima.lista;
+    }
 
     if (!res.ok) {
       throw new Error('Erro ao carregar dashboard');
@@ -35,6 +44,7 @@ export async function carregarDashboard(token) {
       }));
     }
 
+    ultimas.set(token, { etag: res.headers.get('ETag'), lista });
     return lista;
   } catch (error) {
     console.log("ERRO DASHBOARD:", error.message);
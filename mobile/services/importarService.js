@@ -35,6 +35,7 @@ export async function enviarExtrato(arquivo, token) {
       throw new Error(data.erro || 'Falha ao enviar o arquivo.');
     }
 
+    // 202: a API devolve o id da importação, que segue em segundo plano
     return await response.json();
   } catch (error) {
     console.log("ERRO ao enviar extrato:", error.message);
@@ -49,3 +50,31 @@ export async function enviarExtrato(arquivo, token) {
     }
   }
 }
+
+
+export async function buscarImportacao(importacaoId, token) {
+  const response = await fetchWithTimeout(`${API}/api/importacoes/${importacaoId}`, {
+    headers: { Authorization: `Bearer ${token}` }
+  }, 10000);
+
+  const data = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    throw new Error(data.erro || 'Falha ao consultar a importação.');
+  }
+  return data;
+}
+
+// Consulta o status até a importação terminar; onProgresso recebe cada status intermediário
+export async function aguardarImportacao(importacaoId, token, onProgresso, intervalo = 1500) {
+  while (true) {
+    const importacao = await buscarImportacao(importacaoId, token);
+    if (onProgresso) onProgresso(importacao);
+
+    if (importacao.status === 'concluida') return importacao;
+    if (importacao.status === 'erro') {
+      throw new Error(importacao.erro || 'Falha ao importar o extrato.');
+    }
+
+    await new Promise(resolve => setTimeout(resolve, intervalo));
+  }
+}
@@ -0,0 +1,66 @@
+// services/sincronizacaoService.js
+import API from './api';
+
+// ✅ Função com timeout
+const fetchWithTimeout = (url, options = {}, timeout = 15000) => {
+  return Promise.race([
+    fetch(url, options),
+    new Promise((_, reject) =>
+      setTimeout(() => reject(new Error('Timeout: Requisição excedeu 15s')), timeout)
+    )
+  ]);
+};
+
+// Cópia local das transações, por token: { cursor, porId: Map(id -> transação) }.
+// A primeira sincronização baixa o histórico; as seguintes, só o que mudou.
+const copias = new Map();
+
+function copiaDe(token) {
+  if (!copias.has(token)) {
+    copias.set(token, { cursor: null, porId: new Map() });
+  }
+  return copias.get(token);
+}
+
+function ordenar(transacoes) {
+  // Mesma ordem de /api/transacoes: mais recente primeiro
+  return transacoes.sort((a, b) => (a.data < b.data ? 1 : a.data > b.data ? -1 : b.id - a.id));
+}
+
+// Busca em /api/sync o que mudou desde o último cursor e devolve todas as transações locais
+export async function sincronizarTransacoes(token) {
+  const copia = copiaDe(token);
+
+  try {
+    let temMais = true;
+    while (temMais) {
+      const params = new URLSearchParams();
+      if (copia.cursor) params.append('desde', copia.cursor);
+
+      const res = await fetchWithTimeout(`${API}/api/sync?${params.toString()}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      }, 15000);
+
+      if (!res.ok) {
+        throw new Error('Erro ao sincronizar transações');
+      }
+
+      const data = await res.json();
+      (data?.itens || []).forEach(item => copia.porId.set(item.id, item));
+      copia.cursor = data?.cursor || copia.cursor;
+      temMais = Boolean(data?.tem_mais);
+    }
+
+    return ordenar([...copia.porId.values()]);
+  } catch (error) {
+    console.log("ERRO ao sincronizar:", error.message);
+
+    if (error.message.includes('Timeout')) {
+      throw new Error('⏱️ Tempo limite excedido. Tente novamente.');
+    } else if (error.message.includes('Failed to fetch') || error.message.includes('Network')) {
+      throw new Error('❌ Não foi possível conectar. Verifique sua conexão.');
+    } else {
+      throw new Error('❌ Erro ao carregar transações');
+    }
+  }
+}
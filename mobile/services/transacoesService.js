@@ -11,9 +11,15 @@ const fetchWithTimeout = (url, options = {}, timeout = 15000) => {
   ]);
 };
 
-export async function carregarTransacoes(token) {
+// Retorna uma página: { itens, proximo_cursor }.
+// Para a próxima página, repita a chamada com o proximo_cursor recebido.
+export async function carregarTransacoes(token, { mes, cursor, limite = 100 } = {}) {
   try {
-    const res = await fetchWithTimeout(`${API}/api/transacoes`, {
+    const params = new URLSearchParams({ limite: String(limite) });
+    if (mes && mes !== 'todos') params.append('mes', mes);
+    if (cursor) params.append('cursor', cursor);
+
+    const res = await fetchWithTimeout(`${API}/api/transacoes?${params.toString()}`, {
       headers: { Authorization: `Bearer ${token}` }
     }, 15000);
 
@@ -22,7 +28,10 @@ export async function carregarTransacoes(token) {
     }
 
     const data = await res.json();
-    return data || [];
+    return {
+      itens: data?.itens || [],
+      proximo_cursor: data?.proximo_cursor || null
+    };
   } catch (error) {
     console.log("ERRO ao carregar transações:", error.message);
 
@@ -64,3 +73,34 @@ export async function categorizarTransacao(token, dados) {
     }
   }
 }
+
+// Várias categorizações em uma requisição: itens {transacao_id, categoria} ou {tipo, detalhe, categoria}
+export async function categorizarEmLote(token, itens) {
+  try {
+    const res = await fetchWithTimeout(`${API}/api/categorizar/lote`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Authorization: `Bearer ${token}`
+      },
+      body: JSON.stringify({ itens })
+    }, 15000);
+
+    const data = await res.json().catch(() => ({}));
+    if (!res.ok) {
+      throw new Error(data.erro || 'Erro ao categorizar transações');
+    }
+
+    return data;
+  } catch (error) {
+    console.log("ERRO ao categorizar em lote:", error.message);
+
+    if (error.message.includes('Timeout')) {
+      throw new Error('Timeout: Requisição excedeu 15s');
+    } else if (error.message.includes('Failed to fetch')) {
+      throw new Error('Failed to fetch: Verifique sua conexão de internet');
+    } else {
+      throw error;
+    }
+  }
+}